@@ -1,12 +1,10 @@
-from utils.file_handler import read_json, write_json
+from utils.storage import get_storage
 from models.customer import Customer
 
-USER_FILE = "data/users.json"
-
 def register_customer():
-    users = read_json(USER_FILE)
+    storage = get_storage()
     username = input("Enter username: ")
-    if any(u['username'] == username for u in users):
+    if storage.username_exists(username):
         print(" Username already exists.")
         return
 
@@ -16,18 +14,16 @@ def register_customer():
     phone = input("Enter phone number: ")
 
     new_customer = Customer(username, password, email, address, phone)
-    users.append(new_customer.to_dict())
-    write_json(USER_FILE, users)
+    storage.add_user(new_customer.to_dict())
     print(" Customer registered successfully!")
 
 def login():
-    users = read_json(USER_FILE)
     username = input("Enter username: ")
     password = input("Enter password: ")
 
-    for user in users:
-        if user['username'] == username and user['password'] == password:
-            print(f" Welcome, {username}!")
-            return user
+    user = get_storage().authenticate(username, password)
+    if user:
+        print(f" Welcome, {username}!")
+        return user
     print(" Login failed.")
     return None
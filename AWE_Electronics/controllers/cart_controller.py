@@ -1,14 +1,10 @@
-from utils.file_handler import read_json
-from models.catalogue import Catalogue
-
-PRODUCT_FILE = "data/products.json"
+from models.catalogue import get_catalogue
 
 def add_to_cart(user):
-    cat = Catalogue()
     pid = input("Enter product ID to add: ")
     quantity = int(input("Enter quantity: "))
 
-    product = next((p for p in cat.products if p.product_id == pid), None)
+    product = get_catalogue().get_product_by_id(pid)
     if product and product.stock >= quantity:
         user["cart"].append({"product_id": pid, "quantity": quantity})
         print(f" Added {quantity} of '{product.name}' to cart.")
@@ -21,10 +17,10 @@ def view_cart(user):
         return
 
     print("\n Current Cart:")
-    cat = Catalogue()
+    cat = get_catalogue()
     total = 0
     for item in user["cart"]:
-        prod = next((p for p in cat.products if p.product_id == item["product_id"]), None)
+        prod = cat.get_product_by_id(item["product_id"])
         if prod:
             subtotal = prod.price * item["quantity"]
             print(f"{prod.name} x {item['quantity']} = ${subtotal}")
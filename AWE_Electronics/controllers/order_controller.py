@@ -3,10 +3,51 @@ from models.invoice import Invoice
 from models.receipt import Receipt
 from models.shipping import collect_shipping_details
 from models.payment import choose_payment_method
-from utils.file_handler import write_json, read_json
-from models.catalogue import Catalogue
+from utils.storage import get_storage
+from models.catalogue import get_catalogue
+from utils.order_records import pack_record
 
-ORDER_FILE = "data/orders.json"
+def order_quantities(items):
+    """Total quantity per product_id over a list of order lines"""
+    quantities = {}
+    for item in items:
+        product_id = item["product_id"]
+        quantities[product_id] = quantities.get(product_id, 0) + int(item["quantity"])
+    return quantities
+
+def place_order(order, invoice, receipt):
+    """Take stock for every order line and save the order as one transaction
+
+    Returns (True, {}) once the order is saved, or (False, shortages) where
+    shortages maps product_id to the stock actually available. If the order
+    cannot be saved after the stock was taken, the stock is given back.
+    """
+    cat = get_catalogue()
+    quantities = order_quantities(order.items)
+    reserved, shortages = cat.reserve_stock(quantities)
+    if not reserved:
+        return False, shortages
+
+    try:
+        saved = get_storage().save_order(
+            pack_record(order.to_dict(), invoice.to_dict(), receipt.to_dict()))
+    except Exception:
+        cat.release_stock(quantities)
+        raise
+    if not saved:
+        cat.release_stock(quantities)
+        return False, {}
+    return True, {}
+
+def describe_shortages(shortages):
+    """Human readable lines for the products that fell short"""
+    cat = get_catalogue()
+    lines = []
+    for product_id, available in shortages.items():
+        product = cat.get_product_by_id(product_id)
+        name = product.name if product else product_id
+        lines.append(f"{name}: only {available} available")
+    return lines
 
 def checkout(user):
     if not user["cart"]:
@@ -14,10 +55,10 @@ def checkout(user):
         return
 
     # Load all products
-    cat = Catalogue()
+    cat = get_catalogue()
     items = []
     for entry in user["cart"]:
-        prod = next((p for p in cat.products if p.product_id == entry["product_id"]), None)
+        prod = cat.get_product_by_id(entry["product_id"])
         if prod:
             items.append({
                 "product_id": prod.product_id,
@@ -35,14 +76,13 @@ def checkout(user):
     invoice = Invoice(order)
     receipt = Receipt(invoice, payment_method)
 
-    # Save to orders.json
-    orders = read_json(ORDER_FILE)
-    orders.append({
-        "order": order.to_dict(),
-        "invoice": invoice.to_dict(),
-        "receipt": receipt.to_dict()
-    })
-    write_json(ORDER_FILE, orders)
+    # Take the stock and save the order together
+    placed, shortages = place_order(order, invoice, receipt)
+    if not placed:
+        print(" Order could not be placed.")
+        for line in describe_shortages(shortages):
+            print(f"   {line}")
+        return
 
     # Clear cart after successful order
     user["cart"] = []
@@ -1,13 +1,13 @@
-from models.catalogue import Catalogue
+from models.catalogue import get_catalogue
 
 def browse_products():
-    cat = Catalogue()
+    cat = get_catalogue()
     print("\n All Products:")
     for product in cat.list_all_products():
         print(product)
 
 def filter_by_category():
-    cat = Catalogue()
+    cat = get_catalogue()
     category = input("Enter category to filter: ")
     results = cat.list_by_category(category)
     if results:
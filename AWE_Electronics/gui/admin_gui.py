@@ -1,9 +1,22 @@
 import tkinter as tk
 from tkinter import messagebox, ttk, simpledialog
-from utils.file_handler import read_json, write_json
+from utils.storage import get_storage
+from utils.write_behind import flush_writes
+from utils.stats import stock_status_text
+from models.catalogue import get_catalogue
+from models.product import Product
+from utils.sales_aggregates import top_products
+from utils.money import stored_cents, format_money, to_cents, average_cents
+from utils.ids import short_id
+from gui.search_worker import DebouncedSearch
+from gui.virtual_list import VirtualListbox
 
-PRODUCT_FILE = "data/products.json"
-ORDER_FILE = "data/orders.json"
+# Only these parts of each order are read for the orders tab
+ORDER_LIST_FIELDS = ["order.order_id", "order.user_id", "order.items", "order.total_cents",
+                     "order.total", "order.payment_method"]
+
+# Orders shown per page in the orders tab
+ORDER_PAGE_SIZE = 100
 
 def admin_gui(previous_geometry="1000x700"):
     root = tk.Tk()
@@ -50,10 +63,10 @@ def admin_gui(previous_geometry="1000x700"):
     
     # System stats
     try:
-        products = read_json(PRODUCT_FILE)
-        orders = read_json(ORDER_FILE)
+        stats = get_storage().data_stats()
         
-        stats_text = f"📦 {len(products)} Products | 📋 {len(orders)} Orders"
+        stats_text = (f"📦 {stats['products']['total']} Products | "
+                      f"📋 {stats['orders']['total']} Orders")
         stats_label = tk.Label(header_left,
                               text=stats_text,
                               font=('Segoe UI', 10),
@@ -137,6 +150,8 @@ def admin_gui(previous_geometry="1000x700"):
     # Window close handler
     def on_closing():
         if messagebox.askokcancel("Quit", "Do you want to quit the admin panel?"):
+            # Stock edits are written behind, make them durable before leaving
+            flush_writes()
             root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -164,24 +179,28 @@ def create_dashboard_tab(notebook, colors):
     stats_container.pack(fill='x', padx=20, pady=10)
     
     try:
-        products = read_json(PRODUCT_FILE)
-        orders = read_json(ORDER_FILE)
-        
-        # Calculate statistics
-        total_products = len(products)
-        low_stock_count = len([p for p in products if p.get('stock', 0) < 5])
-        out_of_stock = len([p for p in products if p.get('stock', 0) == 0])
-        total_orders = len(orders)
-        total_revenue = sum(order.get('order', {}).get('total', 0) for order in orders)
-        avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
+        # Maintained counters, nothing is rescanned when the tab opens
+        stats = get_storage().data_stats()
+        total_products = stats['products']['total']
+        low_stock_count = stats['products']['low_stock']
+        out_of_stock = stats['products']['out_of_stock']
+        total_orders = stats['orders']['total']
+        total_revenue_cents = stats['orders']['total_revenue_cents']
+        avg_order_cents = stats['orders']['average_order_value_cents']
+        # Inventory math runs over the columnar catalogue's arrays
+        catalogue = get_catalogue()
+        inventory_value = catalogue.get_total_value()
+        category_totals = catalogue.get_category_totals()
         
         stats_data = [
             ("Total Products", total_products, colors['secondary'], "📦"),
             ("Low Stock Items", low_stock_count, colors['warning'], "⚠️"),
             ("Out of Stock", out_of_stock, colors['danger'], "❌"),
             ("Total Orders", total_orders, colors['success'], "📋"),
-            ("Total Revenue", f"${total_revenue:.2f}", colors['info'], "💰"),
-            ("Avg Order Value", f"${avg_order_value:.2f}", colors['primary'], "📊")
+            ("Total Revenue", format_money(total_revenue_cents), colors['info'], "💰"),
+            ("Avg Order Value", format_money(avg_order_cents), colors['primary'], "📊"),
+            ("Inventory Value", format_money(to_cents(inventory_value)), colors['secondary'], "🏷️"),
+            ("Categories", len(category_totals), colors['info'], "🗂️")
         ]
         
         # Create stats grid
@@ -210,6 +229,22 @@ def create_dashboard_tab(notebook, colors):
             title_label = tk.Label(card, text=title, font=('Segoe UI', 10), 
                                   bg=colors['light'], fg=colors['gray'])
             title_label.pack()
+        
+        # Stock by category
+        if category_totals:
+            category_frame = tk.LabelFrame(stats_container,
+                                           text="Inventory by Category",
+                                           font=('Segoe UI', 11, 'bold'),
+                                           bg=colors['white'],
+                                           fg=colors['primary'])
+            category_frame.pack(fill='x', padx=10, pady=(10, 0))
+            
+            for category, (count, units, value) in sorted(category_totals.items()):
+                line = (f"{category}: {count} products | {units} units | "
+                        f"{format_money(to_cents(value))}")
+                tk.Label(category_frame, text=line, font=('Segoe UI', 10),
+                        bg=colors['white'], fg=colors['dark'],
+                        anchor='w').pack(fill='x', padx=10, pady=1)
             
     except Exception as e:
         error_label = tk.Label(stats_container, 
@@ -289,15 +324,11 @@ def create_products_tab(notebook, colors, root):
         dialog = ProductDialog(root, "Add New Product")
         if dialog.result:
             try:
-                products = read_json(PRODUCT_FILE)
-                
-                if any(p['product_id'] == dialog.result['product_id'] for p in products):
+                if not get_catalogue().add_product(Product(**dialog.result)):
                     messagebox.showerror("Product Exists", 
                                        "Product ID already exists! Please use a different ID.")
                     return
                     
-                products.append(dialog.result)
-                write_json(PRODUCT_FILE, products)
                 load_products()
                 messagebox.showinfo("Success", 
                                   f"Product '{dialog.result['name']}' added successfully!")
@@ -311,23 +342,20 @@ def create_products_tab(notebook, colors, root):
             messagebox.showwarning("No Selection", "Please select a product to edit!")
             return
             
-        selected_text = products_listbox.get(selection[0])
-        product_id = selected_text.split(']')[0][1:]
+        product_id = products_listbox.item(selection[0]).product_id
         
         try:
-            products = read_json(PRODUCT_FILE)
-            product_data = next((p for p in products if p['product_id'] == product_id), None)
+            cat = get_catalogue()
+            product = cat.get_product_by_id(product_id)
             
-            if product_data:
-                dialog = ProductDialog(root, "Edit Product", product_data)
+            if product:
+                dialog = ProductDialog(root, "Edit Product", product.to_dict())
                 if dialog.result:
                     # Update the product
-                    for i, p in enumerate(products):
-                        if p['product_id'] == product_id:
-                            products[i] = dialog.result
-                            break
-                    
-                    write_json(PRODUCT_FILE, products)
+                    if not cat.update_product(product_id, Product(**dialog.result)):
+                        messagebox.showerror("Product Exists", 
+                                           "Product ID already exists! Please use a different ID.")
+                        return
                     load_products()
                     messagebox.showinfo("Success", "Product updated successfully!")
             
@@ -341,16 +369,12 @@ def create_products_tab(notebook, colors, root):
                                  "Please select a product to update stock!")
             return
             
-        selected_text = products_listbox.get(selection[0])
-        product_id = selected_text.split(']')[0][1:]
+        product_id = products_listbox.item(selection[0]).product_id
         
         try:
-            products = read_json(PRODUCT_FILE)
-            current_stock = 0
-            for product in products:
-                if product['product_id'] == product_id:
-                    current_stock = product.get('stock', 0)
-                    break
+            cat = get_catalogue()
+            product = cat.get_product_by_id(product_id)
+            current_stock = product.stock if product else 0
             
             new_stock = simpledialog.askinteger("Update Stock", 
                                                f"Product: {product_id}\n"
@@ -360,13 +384,7 @@ def create_products_tab(notebook, colors, root):
                                                initialvalue=current_stock)
             
             if new_stock is not None:
-                for product in products:
-                    if product['product_id'] == product_id:
-                        old_stock = product.get('stock', 0)
-                        product['stock'] = new_stock
-                        break
-                        
-                write_json(PRODUCT_FILE, products)
+                old_stock = cat.update_stock(product_id, new_stock)
                 load_products()
                 messagebox.showinfo("Stock Updated", 
                                   f"Stock updated from {old_stock} to {new_stock}")
@@ -381,19 +399,13 @@ def create_products_tab(notebook, colors, root):
                                  "Please select a product to delete!")
             return
             
-        selected_text = products_listbox.get(selection[0])
-        product_id = selected_text.split(']')[0][1:]
+        product_id = products_listbox.item(selection[0]).product_id
         
         if messagebox.askyesno("Confirm Delete", 
                              f"Are you sure you want to delete product {product_id}?\n\n"
                              "This action cannot be undone!"):
             try:
-                products = read_json(PRODUCT_FILE)
-                original_count = len(products)
-                products = [p for p in products if p['product_id'] != product_id]
-                
-                if len(products) < original_count:
-                    write_json(PRODUCT_FILE, products)
+                if get_catalogue().remove_product(product_id):
                     load_products()
                     messagebox.showinfo("Success", f"Product {product_id} deleted successfully!")
                 else:
@@ -440,9 +452,9 @@ def create_products_tab(notebook, colors, root):
                            font=('Segoe UI', 10), width=25)
     search_entry.pack(side='left', padx=(10, 0))
     
-    def search_products():
+    def search_products(immediate=True):
         search_term = search_var.get().lower()
-        load_products(search_term)
+        product_search.submit(search_term, immediate=immediate)
     
     search_btn = tk.Button(search_frame, text="🔍",
                           font=('Segoe UI', 9),
@@ -452,49 +464,46 @@ def create_products_tab(notebook, colors, root):
                           command=search_products)
     search_btn.pack(side='left', padx=(5, 0))
     
-    search_entry.bind('<KeyRelease>', lambda e: search_products())
+    search_entry.bind('<KeyRelease>', lambda e: search_products(immediate=False))
     
     # Products listbox
     list_frame = tk.Frame(products_display_frame, bg=colors['white'], relief='solid', bd=1)
     list_frame.pack(fill='both', expand=True)
     
-    products_listbox = tk.Listbox(list_frame, 
-                                 font=('Segoe UI', 9),
-                                 selectbackground=colors['secondary'],
-                                 selectforeground='white')
-    products_scrollbar = tk.Scrollbar(list_frame, orient='vertical', 
-                                     command=products_listbox.yview)
-    products_listbox.configure(yscrollcommand=products_scrollbar.set)
+    def format_product(product):
+        status = stock_status_text(product.stock)
+        
+        return (f"[{product.product_id}] {product.name} | "
+                f"${product.price:.2f} | {product.category} | "
+                f"Stock: {product.stock} ({status})")
+    
+    # Only the rows in view are formatted and handed to Tk
+    products_listbox = VirtualListbox(list_frame, 
+                                      format_product,
+                                      bg=colors['white'],
+                                      font=('Segoe UI', 9),
+                                      selectbackground=colors['secondary'],
+                                      selectforeground='white')
+    products_listbox.pack(fill='both', expand=True)
+    
+    def show_products(search_term, products):
+        products_listbox.set_items(products)
     
-    products_listbox.pack(side='left', fill='both', expand=True, padx=10, pady=10)
-    products_scrollbar.pack(side='right', fill='y')
+    def show_search_error(search_term, error):
+        messagebox.showerror("Error", f"Failed to load products:\n{str(error)}")
     
     def load_products(search_term=""):
         try:
-            products_listbox.delete(0, tk.END)
-            products = read_json(PRODUCT_FILE)
-            
-            for product in products:
-                if (not search_term or 
-                    search_term in product.get('name', '').lower() or
-                    search_term in product.get('category', '').lower() or
-                    search_term in product.get('product_id', '').lower()):
-                    
-                    stock = product.get('stock', 0)
-                    if stock == 0:
-                        status = "❌ Out of Stock"
-                    elif stock < 5:
-                        status = "⚠️ Low Stock"
-                    else:
-                        status = "✅ In Stock"
-                    
-                    display_text = (f"[{product['product_id']}] {product['name']} | "
-                                  f"${product['price']:.2f} | {product['category']} | "
-                                  f"Stock: {stock} ({status})")
-                    products_listbox.insert(tk.END, display_text)
-                    
+            show_products(search_term, get_catalogue().search_products(search_term))
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load products:\n{str(e)}")
+            show_search_error(search_term, e)
+    
+    # Searches run on a worker thread, debounced while typing
+    product_search = DebouncedSearch(products_frame,
+                                     lambda term: get_catalogue().search_products(term),
+                                     show_products,
+                                     show_search_error)
+    products_frame.bind('<Destroy>', lambda e: product_search.close() if e.widget is products_frame else None)
     
     # Load initial data
     load_products()
@@ -514,31 +523,52 @@ def create_orders_tab(notebook, colors):
                            fg=colors['primary'])
     orders_title.pack(side='left')
     
+    def order_row(order_data):
+        """The few values a list row shows, so the page does not keep line items"""
+        order = order_data.get('order', {})
+        return (order.get('order_id', ''), order.get('user_id', 'Unknown'),
+                len(order.get('items', [])), stored_cents(order, 'total'),
+                order.get('payment_method', 'Unknown'))
+    
+    def format_order(row):
+        order_id, customer, items_count, total_cents, payment = row
+        
+        return (f"Order {short_id(order_id)}... | Customer: {customer} | "
+                f"{items_count} items | {format_money(total_cents)} | "
+                f"Payment: {payment} | Status: ✅ Completed")
+    
+    page_state = {'page': 0}
+    
     def load_orders():
         try:
-            orders_listbox.delete(0, tk.END)
-            orders = read_json(ORDER_FILE)
-            
-            if not orders:
-                orders_listbox.insert(tk.END, "No orders found.")
-                return
-            
-            for order_data in orders:
-                order = order_data.get('order', {})
-                order_id = order.get('order_id', '')[:8] + '...'
-                customer = order.get('user_id', 'Unknown')
-                items_count = len(order.get('items', []))
-                total = f"${order.get('total', 0):.2f}"
-                payment = order.get('payment_method', 'Unknown')
-                
-                display_text = (f"Order {order_id} | Customer: {customer} | "
-                              f"{items_count} items | {total} | "
-                              f"Payment: {payment} | Status: ✅ Completed")
-                orders_listbox.insert(tk.END, display_text)
+            storage = get_storage()
+            total_orders = storage.count_orders()
+            page_count = max(1, -(-total_orders // ORDER_PAGE_SIZE))
+            page_state['page'] = min(page_state['page'], page_count - 1)
+            page_label.config(text=f"Page {page_state['page'] + 1} of {page_count} "
+                                   f"({total_orders} orders)")
+            newer_btn.config(state='normal' if page_state['page'] > 0 else 'disabled')
+            older_btn.config(state='normal' if page_state['page'] < page_count - 1 else 'disabled')
+            
+            # Only one page of orders is read, newest first
+            orders = storage.get_recent_orders(start=page_state['page'] * ORDER_PAGE_SIZE,
+                                               limit=ORDER_PAGE_SIZE,
+                                               fields=ORDER_LIST_FIELDS)
+            orders_listbox.set_items([order_row(order) for order in orders],
+                                     placeholder="No orders found.")
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load orders:\n{str(e)}")
     
+    def change_page(step):
+        page_state['page'] = max(0, page_state['page'] + step)
+        load_orders()
+    
+    def refresh_orders():
+        # Back to the newest orders, where a new one shows up
+        page_state['page'] = 0
+        load_orders()
+    
     refresh_btn = tk.Button(orders_header,
                            text="🔄 Refresh",
                            font=('Segoe UI', 10, 'bold'),
@@ -549,22 +579,56 @@ def create_orders_tab(notebook, colors):
                            pady=8,
                            cursor='hand2',
                            relief='flat',
-                           command=load_orders)
+                           command=refresh_orders)
     refresh_btn.pack(side='right')
     
+    # Pagination controls, next to the refresh button
+    pager_frame = tk.Frame(orders_header, bg=colors['white'])
+    pager_frame.pack(side='right', padx=(0, 10))
+    
+    newer_btn = tk.Button(pager_frame,
+                         text="◀ Newer",
+                         font=('Segoe UI', 9, 'bold'),
+                         bg=colors['light'],
+                         fg=colors['dark'],
+                         border=0,
+                         padx=12,
+                         pady=4,
+                         cursor='hand2',
+                         relief='flat',
+                         command=lambda: change_page(-1))
+    newer_btn.pack(side='left')
+    
+    page_label = tk.Label(pager_frame,
+                         text="",
+                         font=('Segoe UI', 9),
+                         bg=colors['white'],
+                         fg=colors['gray'])
+    page_label.pack(side='left', padx=8)
+    
+    older_btn = tk.Button(pager_frame,
+                         text="Older ▶",
+                         font=('Segoe UI', 9, 'bold'),
+                         bg=colors['light'],
+                         fg=colors['dark'],
+                         border=0,
+                         padx=12,
+                         pady=4,
+                         cursor='hand2',
+                         relief='flat',
+                         command=lambda: change_page(1))
+    older_btn.pack(side='left')
+    
     orders_list_frame = tk.Frame(orders_frame, bg=colors['white'], relief='solid', bd=1)
     orders_list_frame.pack(fill='both', expand=True, padx=20, pady=(0, 15))
     
-    orders_listbox = tk.Listbox(orders_list_frame, 
-                               font=('Segoe UI', 9),
-                               selectbackground=colors['secondary'],
-                               selectforeground='white')
-    orders_scrollbar = tk.Scrollbar(orders_list_frame, orient='vertical', 
-                                   command=orders_listbox.yview)
-    orders_listbox.configure(yscrollcommand=orders_scrollbar.set)
-    
-    orders_listbox.pack(side='left', fill='both', expand=True, padx=10, pady=10)
-    orders_scrollbar.pack(side='right', fill='y')
+    orders_listbox = VirtualListbox(orders_list_frame, 
+                                    format_order,
+                                    bg=colors['white'],
+                                    font=('Segoe UI', 9),
+                                    selectbackground=colors['secondary'],
+                                    selectforeground='white')
+    orders_listbox.pack(fill='both', expand=True)
     
     # Load initial data
     load_orders()
@@ -590,9 +654,12 @@ def create_reports_tab(notebook, colors):
             for widget in reports_display_frame.winfo_children():
                 widget.destroy()
                 
-            orders = read_json(ORDER_FILE)
+            # Maintained incrementally as orders are saved, so this does not
+            # depend on how many orders there are
+            sales = get_storage().sales_aggregates()
+            order_count = sales['order_count']
             
-            if not orders:
+            if not order_count:
                 no_data_label = tk.Label(reports_display_frame, 
                                        text="📊 No orders found!\n\nStart by processing some orders to see analytics.", 
                                        font=('Segoe UI', 14), 
@@ -602,31 +669,8 @@ def create_reports_tab(notebook, colors):
                 no_data_label.pack(expand=True)
                 return
                 
-            # Calculate statistics
-            total_revenue = 0
-            product_sales = {}
-            
-            for order_data in orders:
-                order = order_data.get('order', {})
-                order_total = order.get('total', 0)
-                total_revenue += order_total
-                
-                # Product analysis
-                for item in order.get('items', []):
-                    pid = item.get('product_id', 'Unknown')
-                    name = item.get('name', 'Unknown')
-                    qty = item.get('quantity', 0)
-                    price = item.get('price', 0)
-                    
-                    if pid in product_sales:
-                        product_sales[pid]['qty'] += qty
-                        product_sales[pid]['revenue'] += price * qty
-                    else:
-                        product_sales[pid] = {
-                            'name': name,
-                            'qty': qty,
-                            'revenue': price * qty
-                        }
+            total_revenue_cents = sales['total_revenue_cents']
+            product_sales = sales['products']
             
             # Create report display
             report_content = tk.Frame(reports_display_frame, bg=colors['white'])
@@ -644,12 +688,12 @@ def create_reports_tab(notebook, colors):
             summary_frame = tk.Frame(report_content, bg=colors['light'])
             summary_frame.pack(fill='x', pady=(0, 15))
             
-            avg_order_value = total_revenue / len(orders) if orders else 0
-            total_items_sold = sum(data['qty'] for data in product_sales.values())
+            avg_order_cents = average_cents(total_revenue_cents, order_count)
+            total_items_sold = sales['items_sold']
             
-            summary_text = (f"Total Orders: {len(orders)} | "
-                           f"Total Revenue: ${total_revenue:.2f} | "
-                           f"Average Order: ${avg_order_value:.2f} | "
+            summary_text = (f"Total Orders: {order_count} | "
+                           f"Total Revenue: {format_money(total_revenue_cents)} | "
+                           f"Average Order: {format_money(avg_order_cents)} | "
                            f"Items Sold: {total_items_sold}")
             
             tk.Label(summary_frame, text=summary_text, 
@@ -666,9 +710,8 @@ def create_reports_tab(notebook, colors):
                                                fg=colors['primary'])
                 products_section.pack(fill='both', expand=True, pady=(10, 0))
                 
-                # Sort products by revenue
-                sorted_products = sorted(product_sales.items(), 
-                                       key=lambda x: x[1]['revenue'], reverse=True)
+                # Best sellers by revenue
+                sorted_products = top_products(sales, limit=10)
                 
                 sales_listbox = tk.Listbox(products_section, 
                                          font=('Segoe UI', 10), 
@@ -678,10 +721,10 @@ def create_reports_tab(notebook, colors):
                 
                 sales_listbox.pack(fill='both', expand=True, padx=10, pady=10)
                 
-                for i, (pid, data) in enumerate(sorted_products[:10], 1):
+                for i, (pid, data) in enumerate(sorted_products, 1):
                     display_text = (f"{i}. {data['name']} | "
                                   f"{data['qty']} units sold | "
-                                  f"${data['revenue']:.2f} revenue")
+                                  f"{format_money(data['revenue_cents'])} revenue")
                     sales_listbox.insert(tk.END, display_text)
                     
         except Exception as e:
@@ -0,0 +1,41 @@
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+
+# How often the Tk loop checks whether background work finished
+RESULT_POLL_MS = 30
+
+# Shared pool for slow work started from the GUI (password hashing etc.)
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gui-worker")
+
+def run_in_background(widget, fn, on_done, on_error=None, poll_ms=RESULT_POLL_MS):
+    """Run fn() on the worker pool and hand its result back to the Tk thread
+
+    fn must not touch Tk widgets. on_done(result) or on_error(exception) is
+    called from widget.after once fn finishes. Nothing is called if the
+    widget was destroyed in the meantime.
+    """
+    future = _executor.submit(fn)
+
+    def poll():
+        if not future.done():
+            schedule()
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            if on_error:
+                on_error(e)
+            else:
+                print(f"Background task failed: {e}")
+            return
+        on_done(result)
+
+    def schedule():
+        try:
+            widget.after(poll_ms, poll)
+        except tk.TclError:
+            # Window closed while the work was running
+            pass
+
+    schedule()
+    return future
@@ -3,16 +3,28 @@ from tkinter import messagebox, ttk
 
 # Import all required modules with error handling
 try:
-    from models.catalogue import Catalogue
+    from models.catalogue import get_catalogue
+    from gui.search_worker import DebouncedSearch
+    from gui.virtual_list import VirtualListbox
     from models.order import Order
     from models.invoice import Invoice
     from models.receipt import Receipt
-    from utils.file_handler import read_json, write_json
+    from utils.storage import get_storage
+    from utils.write_behind import flush_writes
+    from utils.money import stored_cents, format_money
+    from utils.ids import short_id
+    from utils.stats import stock_status_text
+    from controllers.order_controller import place_order, describe_shortages
 except ImportError as e:
     print(f"Import error: {e}")
     print("Please ensure all required modules are available.")
 
-ORDER_FILE = "data/orders.json"
+# Only these parts of each order are read for the order history tab
+ORDER_HISTORY_FIELDS = ["order.order_id", "order.user_id", "order.items", "order.total_cents",
+                        "order.total", "order.order_date"]
+
+# Orders shown per page in the order history tab
+ORDER_PAGE_SIZE = 20
 
 def customer_gui(user, previous_geometry="1000x700"):
     root = tk.Tk()
@@ -165,6 +177,7 @@ def customer_gui(user, previous_geometry="1000x700"):
     # Window close handler
     def on_closing():
         if messagebox.askokcancel("Quit", "Do you want to quit AWE Electronics?"):
+            flush_writes()
             root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -199,9 +212,9 @@ def create_products_tab(notebook, colors, user, update_cart_display):
                            width=40)
     search_entry.pack(side='left', fill='x', expand=True, padx=(0, 10), ipady=6)
     
-    def search_products():
+    def search_products(immediate=True):
         search_term = search_var.get().strip().lower()
-        load_products(search_term)
+        product_search.submit(search_term, immediate=immediate)
     
     search_btn = tk.Button(search_controls, 
                           text="🔍 Search", 
@@ -217,7 +230,7 @@ def create_products_tab(notebook, colors, user, update_cart_display):
     search_btn.pack(side='right')
     
     search_entry.bind('<Return>', lambda e: search_products())
-    search_entry.bind('<KeyRelease>', lambda e: search_products())
+    search_entry.bind('<KeyRelease>', lambda e: search_products(immediate=False))
     
     # Products display
     products_container = tk.Frame(products_frame, bg='white')
@@ -234,36 +247,36 @@ def create_products_tab(notebook, colors, user, update_cart_display):
     products_list_frame = tk.Frame(products_container, bg='white', relief='solid', bd=1)
     products_list_frame.pack(fill='both', expand=True)
     
-    products_listbox = tk.Listbox(products_list_frame, 
-                                 font=('Segoe UI', 9),
-                                 selectbackground=colors['secondary'],
-                                 selectforeground='white',
-                                 bg='white',
-                                 relief='flat')
-    products_scrollbar = tk.Scrollbar(products_list_frame, orient='vertical', 
-                                     command=products_listbox.yview)
-    products_listbox.configure(yscrollcommand=products_scrollbar.set)
+    def format_product(product):
+        stock_status = stock_status_text(product.stock)
+        return f"{product.product_id} | {product.name} | ${product.price:.2f} | {product.category} | {stock_status} ({product.stock})"
+    
+    # Only the rows in view are formatted and handed to Tk
+    products_listbox = VirtualListbox(products_list_frame, 
+                                      format_product,
+                                      font=('Segoe UI', 9),
+                                      selectbackground=colors['secondary'],
+                                      selectforeground='white')
+    products_listbox.pack(fill='both', expand=True)
     
-    products_listbox.pack(side='left', fill='both', expand=True, padx=10, pady=10)
-    products_scrollbar.pack(side='right', fill='y')
+    def show_products(search_term, products):
+        products_listbox.set_items(products)
+    
+    def show_search_error(search_term, error):
+        messagebox.showerror("Error", f"Failed to load products: {str(error)}")
     
     def load_products(search_term=""):
         try:
-            products_listbox.delete(0, tk.END)
-            cat = Catalogue()
-            
-            for product in cat.list_all_products():
-                if (not search_term or 
-                    search_term in product.name.lower() or 
-                    search_term in product.category.lower() or
-                    search_term in product.product_id.lower()):
-                    
-                    stock_status = "✅ In Stock" if product.stock > 5 else "⚠️ Low Stock" if product.stock > 0 else "❌ Out of Stock"
-                    display_text = f"{product.product_id} | {product.name} | ${product.price:.2f} | {product.category} | {stock_status} ({product.stock})"
-                    products_listbox.insert(tk.END, display_text)
-                    
+            show_products(search_term, get_catalogue().search_products(search_term))
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load products: {str(e)}")
+            show_search_error(search_term, e)
+    
+    # Searches run on a worker thread, debounced while typing
+    product_search = DebouncedSearch(products_frame,
+                                     lambda term: get_catalogue().search_products(term),
+                                     show_products,
+                                     show_search_error)
+    products_frame.bind('<Destroy>', lambda e: product_search.close() if e.widget is products_frame else None)
     
     # Add to cart section
     cart_section = tk.Frame(products_frame, bg=colors['light'], relief='solid', bd=1)
@@ -304,8 +317,7 @@ def create_products_tab(notebook, colors, user, update_cart_display):
     def on_product_select(event):
         selection = products_listbox.curselection()
         if selection:
-            selected_text = products_listbox.get(selection[0])
-            product_id = selected_text.split(' | ')[0]
+            product_id = products_listbox.item(selection[0]).product_id
             product_id_entry.delete(0, tk.END)
             product_id_entry.insert(0, product_id)
     
@@ -327,14 +339,8 @@ def create_products_tab(notebook, colors, user, update_cart_display):
             return
             
         try:
-            cat = Catalogue()
-            product = None
-            
             # Find product by ID
-            for p in cat.list_all_products():
-                if p.product_id == product_id:
-                    product = p
-                    break
+            product = get_catalogue().get_product_by_id(product_id)
             
             if not product:
                 messagebox.showerror("Product Not Found", f"Product ID '{product_id}' not found!")
@@ -445,32 +451,7 @@ def create_cart_tab(notebook, colors, user, update_cart_display):
             if 'cart' not in user:
                 user['cart'] = []
             
-            # Load products using both methods for reliability
-            products_dict = {}
-            
-            # Method 1: Try Catalogue class
-            try:
-                cat = Catalogue()
-                for product in cat.products:
-                    products_dict[product.product_id] = product
-            except Exception as cat_error:
-                print(f"Catalogue loading failed: {cat_error}")
-                # Method 2: Try direct JSON loading
-                try:
-                    products_data = read_json("data/products.json")
-                    for prod_dict in products_data:
-                        class SimpleProduct:
-                            def __init__(self, data):
-                                self.product_id = data['product_id']
-                                self.name = data['name']
-                                self.price = data['price']
-                                self.category = data.get('category', '')
-                                self.stock = data.get('stock', 0)
-                        
-                        products_dict[prod_dict['product_id']] = SimpleProduct(prod_dict)
-                except Exception as json_error:
-                    print(f"Direct JSON loading failed: {json_error}")
-            
+            cat = get_catalogue()
             total = 0
             
             if not user.get("cart"):
@@ -483,8 +464,8 @@ def create_cart_tab(notebook, colors, user, update_cart_display):
                 product_id = cart_item["product_id"]
                 quantity = cart_item["quantity"]
                 
-                if product_id in products_dict:
-                    product = products_dict[product_id]
+                product = cat.get_product_by_id(product_id)
+                if product:
                     subtotal = product.price * quantity
                     total += subtotal
                     
@@ -629,23 +610,34 @@ def create_orders_tab(notebook, colors, user):
                                bd=1)
     orders_listbox.pack(fill='both', expand=True, padx=20, pady=(0, 20))
     
+    page_state = {'page': 0}
+    
     def load_orders():
         try:
             orders_listbox.delete(0, tk.END)
-            orders = read_json(ORDER_FILE)
-            user_orders = [order for order in orders 
-                          if order["order"]["user_id"] == user["username"]]
+            storage = get_storage()
+            total_orders = storage.count_user_orders(user["username"])
+            page_count = max(1, -(-total_orders // ORDER_PAGE_SIZE))
+            page_state['page'] = min(page_state['page'], page_count - 1)
+            page_label.config(text=f"Page {page_state['page'] + 1} of {page_count} "
+                                   f"({total_orders} orders)")
+            newer_btn.config(state='normal' if page_state['page'] > 0 else 'disabled')
+            older_btn.config(state='normal' if page_state['page'] < page_count - 1 else 'disabled')
             
-            if not user_orders:
+            if not total_orders:
                 orders_listbox.insert(tk.END, "No orders found. Start shopping!")
                 return
             
-            # Display orders in reverse chronological order (newest first)
-            for order_data in reversed(user_orders):
+            # Orders come back newest first
+            user_orders = storage.get_user_orders(user["username"],
+                                                  start=page_state['page'] * ORDER_PAGE_SIZE,
+                                                  limit=ORDER_PAGE_SIZE,
+                                                  fields=ORDER_HISTORY_FIELDS)
+            for order_data in user_orders:
                 order = order_data["order"]
-                order_id = order["order_id"][:8] + "..."
+                order_id = short_id(order["order_id"]) + "..."
                 items_count = len(order["items"])
-                total = f"${order['total']:.2f}"
+                total = format_money(stored_cents(order, 'total'))
                 order_date = order.get("order_date", "")
                 if order_date:
                     # Format date nicely
@@ -664,6 +656,15 @@ def create_orders_tab(notebook, colors, user):
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load orders: {str(e)}")
     
+    def change_page(step):
+        page_state['page'] = max(0, page_state['page'] + step)
+        load_orders()
+    
+    def refresh_orders():
+        # Back to the newest orders, where a new one shows up
+        page_state['page'] = 0
+        load_orders()
+    
     # Add refresh button
     refresh_btn = tk.Button(orders_header,
                            text="🔄 Refresh",
@@ -675,9 +676,46 @@ def create_orders_tab(notebook, colors, user):
                            pady=6,
                            cursor='hand2',
                            relief='flat',
-                           command=load_orders)
+                           command=refresh_orders)
     refresh_btn.pack(side='right')
     
+    # Pagination controls, next to the refresh button
+    pager_frame = tk.Frame(orders_header, bg='white')
+    pager_frame.pack(side='right', padx=(0, 10))
+    
+    newer_btn = tk.Button(pager_frame,
+                         text="◀ Newer",
+                         font=('Segoe UI', 9, 'bold'),
+                         bg=colors['light'],
+                         fg=colors['dark'],
+                         border=0,
+                         padx=12,
+                         pady=4,
+                         cursor='hand2',
+                         relief='flat',
+                         command=lambda: change_page(-1))
+    newer_btn.pack(side='left')
+    
+    older_btn = tk.Button(pager_frame,
+                         text="Older ▶",
+                         font=('Segoe UI', 9, 'bold'),
+                         bg=colors['light'],
+                         fg=colors['dark'],
+                         border=0,
+                         padx=12,
+                         pady=4,
+                         cursor='hand2',
+                         relief='flat',
+                         command=lambda: change_page(1))
+    
+    page_label = tk.Label(pager_frame,
+                         text="",
+                         font=('Segoe UI', 9),
+                         bg='white',
+                         fg=colors['gray'])
+    page_label.pack(side='left', padx=8)
+    older_btn.pack(side='left')
+    
     # Load orders initially
     load_orders()
     
@@ -837,33 +875,10 @@ class CheckoutWindow:
         # Calculate total using the same method as cart display
         total = 0
         try:
-            # Load products using both methods for reliability
-            products_dict = {}
-            
-            # Method 1: Catalogue
-            try:
-                cat = Catalogue()
-                for product in cat.products:
-                    products_dict[product.product_id] = product
-            except Exception as cat_error:
-                print(f"Catalogue loading failed: {cat_error}")
-                # Method 2: Direct JSON
-                try:
-                    products_data = read_json("data/products.json")
-                    for prod_dict in products_data:
-                        class SimpleProduct:
-                            def __init__(self, data):
-                                self.product_id = data['product_id']
-                                self.name = data['name']
-                                self.price = data['price']
-                        products_dict[prod_dict['product_id']] = SimpleProduct(prod_dict)
-                except Exception as json_error:
-                    print(f"Direct JSON loading failed: {json_error}")
-            
+            cat = get_catalogue()
             for cart_item in self.user.get("cart", []):
-                product_id = cart_item["product_id"]
-                if product_id in products_dict:
-                    product = products_dict[product_id]
+                product = cat.get_product_by_id(cart_item["product_id"])
+                if product:
                     total += product.price * cart_item["quantity"]
         except Exception as e:
             print(f"Checkout total calculation error: {e}")
@@ -944,31 +959,11 @@ class CheckoutWindow:
             items = []
             
             # Use same product lookup method as cart display
-            products_dict = {}
-            try:
-                cat = Catalogue()
-                for product in cat.products:
-                    products_dict[product.product_id] = product
-            except Exception as cat_error:
-                print(f"Catalogue loading failed: {cat_error}")
-                try:
-                    products_data = read_json("data/products.json")
-                    for prod_dict in products_data:
-                        class SimpleProduct:
-                            def __init__(self, data):
-                                self.product_id = data['product_id']
-                                self.name = data['name']
-                                self.price = data['price']
-                        products_dict[prod_dict['product_id']] = SimpleProduct(prod_dict)
-                except Exception as json_error:
-                    print(f"JSON loading failed: {json_error}")
-                    messagebox.showerror("Error", "Failed to load product information!")
-                    return
+            cat = get_catalogue()
             
             for cart_item in self.user["cart"]:
-                product_id = cart_item["product_id"]
-                if product_id in products_dict:
-                    product = products_dict[product_id]
+                product = cat.get_product_by_id(cart_item["product_id"])
+                if product:
                     items.append({
                         "product_id": product.product_id,
                         "name": product.name,
@@ -984,20 +979,23 @@ class CheckoutWindow:
             invoice = Invoice(order)
             receipt = Receipt(invoice, payment_method)
             
-            # Save order
+            # Take the stock and save the order together
             try:
-                orders = read_json(ORDER_FILE)
-                orders.append({
-                    "order": order.to_dict(),
-                    "invoice": invoice.to_dict(),
-                    "receipt": receipt.to_dict()
-                })
-                write_json(ORDER_FILE, orders)
+                placed, shortages = place_order(order, invoice, receipt)
             except Exception as save_error:
                 print(f"Order save error: {save_error}")
                 messagebox.showerror("Error", f"Failed to save order: {save_error}")
                 return
             
+            if not placed:
+                if shortages:
+                    messagebox.showerror("Insufficient Stock",
+                                       "Some items are no longer available:\n\n" +
+                                       "\n".join(describe_shortages(shortages)))
+                else:
+                    messagebox.showerror("Error", "Failed to save order!")
+                return
+            
             # Clear cart
             self.user["cart"] = []
             
@@ -1009,9 +1007,9 @@ class CheckoutWindow:
             
             # Success message
             success_msg = (f"🎉 Order placed successfully!\n\n"
-                         f"Order ID: {order.order_id[:8]}...\n"
+                         f"Order ID: {short_id(order.order_id)}...\n"
                          f"Total: ${invoice.amount:.2f}\n"
-                         f"Receipt ID: {receipt.receipt_id[:8]}...\n\n"
+                         f"Receipt ID: {short_id(receipt.receipt_id)}...\n\n"
                          f"Thank you for shopping with AWE Electronics!")
             
             messagebox.showinfo("Order Confirmed", success_msg)
@@ -1,8 +1,7 @@
 import tkinter as tk
 from tkinter import messagebox
-from utils.file_handler import read_json
-
-USER_FILE = "data/users.json"
+from utils.storage import get_storage
+from gui.background import run_in_background
 
 def login_gui(previous_geometry="1000x700"):
     root = tk.Tk()
@@ -161,7 +160,12 @@ def login_gui(previous_geometry="1000x700"):
     status_label.pack(pady=(0, 10))
     
     # Login function with better error handling
+    login_state = {'busy': False}
+    
     def attempt_login():
+        if login_state['busy']:
+            return
+        
         username = username_entry.get().strip()
         password = password_entry.get().strip()
         
@@ -172,53 +176,50 @@ def login_gui(previous_geometry="1000x700"):
             status_label.config(text="⚠️ Please fill in all fields!", fg=colors['warning'])
             return
         
-        # Show loading
+        # Show loading; the password check is deliberately slow, so it runs
+        # on a worker thread and the window stays responsive
         status_label.config(text="🔄 Signing in...", fg=colors['secondary'])
-        root.update()
+        login_state['busy'] = True
+        login_btn.config(state='disabled')
+        run_in_background(root,
+                          lambda: get_storage().authenticate(username, password),
+                          lambda user_found: finish_login(username, user_found),
+                          login_error)
+    
+    def finish_login(username, user_found):
+        login_state['busy'] = False
+        login_btn.config(state='normal')
         
-        try:
-            users = read_json(USER_FILE)
+        if user_found:
+            # Successful login
+            status_label.config(text="✅ Login successful!", fg=colors['success'])
+            root.update()
             
-            if not users:
-                status_label.config(text="❌ No user data found. Please contact support.", fg=colors['danger'])
-                return
+            messagebox.showinfo("Login Successful", 
+                              f"Welcome back, {username}!\n\n"
+                              f"Role: {user_found.get('role', 'user').title()}")
             
-            # Find user
-            user_found = None
-            for user in users:
-                if user.get('username') == username and user.get('password') == password:
-                    user_found = user
-                    break
+            current_geometry = root.geometry()
+            root.destroy()
             
-            if user_found:
-                # Successful login
-                status_label.config(text="✅ Login successful!", fg=colors['success'])
-                root.update()
-                
-                messagebox.showinfo("Login Successful", 
-                                  f"Welcome back, {username}!\n\n"
-                                  f"Role: {user_found.get('role', 'user').title()}")
-                
-                current_geometry = root.geometry()
-                root.destroy()
-                
-                # Route to appropriate interface
-                if user_found.get('role') == 'admin':
-                    from gui.admin_gui import admin_gui
-                    admin_gui(current_geometry)
-                else:
-                    from gui.customer_gui import customer_gui
-                    customer_gui(user_found, current_geometry)
-                return
+            # Route to appropriate interface
+            if user_found.get('role') == 'admin':
+                from gui.admin_gui import admin_gui
+                admin_gui(current_geometry)
             else:
-                # Login failed
-                status_label.config(text="❌ Invalid username or password!", fg=colors['danger'])
-                password_entry.delete(0, tk.END)
-                username_entry.focus()
-                
-        except Exception as e:
-            status_label.config(text="❌ Login error occurred!", fg=colors['danger'])
-            print(f"Login error: {e}")  # For debugging
+                from gui.customer_gui import customer_gui
+                customer_gui(user_found, current_geometry)
+        else:
+            # Login failed
+            status_label.config(text="❌ Invalid username or password!", fg=colors['danger'])
+            password_entry.delete(0, tk.END)
+            username_entry.focus()
+    
+    def login_error(e):
+        login_state['busy'] = False
+        login_btn.config(state='normal')
+        status_label.config(text="❌ Login error occurred!", fg=colors['danger'])
+        print(f"Login error: {e}")  # For debugging
     
     # Login button
     login_btn = tk.Button(content_frame,
@@ -1,11 +1,10 @@
 import tkinter as tk
 from tkinter import messagebox
 from models.customer import Customer
-from utils.file_handler import read_json, write_json
+from utils.storage import get_storage
+from gui.background import run_in_background
 import re
 
-USER_FILE = "data/users.json"
-
 def register_gui(previous_geometry="1000x700"):
     root = tk.Tk()
     root.title("AWE Electronics - Create Account")
@@ -271,6 +270,9 @@ def register_gui(previous_geometry="1000x700"):
     
     # Registration function
     def attempt_register():
+        if str(register_btn['state']) == 'disabled':
+            return
+        
         # Clear previous status
         status_label.config(text="", fg=colors['danger'])
         
@@ -302,47 +304,65 @@ def register_gui(previous_geometry="1000x700"):
         
         try:
             # Check if username exists
-            users = read_json(USER_FILE)
-            if any(u['username'] == username for u in users):
+            storage = get_storage()
+            if storage.username_exists(username):
                 status_label.config(text="❌ Username already exists!", fg=colors['danger'])
                 return
             
             # Check if email exists
             email = entries['email'].get().strip()
-            if any(u.get('email') == email for u in users):
+            if storage.email_exists(email):
                 status_label.config(text="❌ An account with this email already exists!", fg=colors['danger'])
                 return
                 
-            # Create new customer
-            new_customer = Customer(
-                username=username,
-                password=entries['password'].get().strip(),
-                email=email,
-                address=entries['address'].get().strip(),
-                phone_number=entries['phone'].get().strip()
-            )
-            
-            customer_dict = new_customer.to_dict()
-            customer_dict['full_name'] = entries['full_name'].get().strip()
-            
-            users.append(customer_dict)
-            write_json(USER_FILE, users)
+            password = entries['password'].get().strip()
+            address = entries['address'].get().strip()
+            phone_number = entries['phone'].get().strip()
+            full_name = entries['full_name'].get().strip()
             
-            status_label.config(text="✅ Account created successfully!", fg=colors['success'])
-            root.update()
-            
-            messagebox.showinfo("Success!", 
-                              f"Account created successfully!\n\n"
-                              f"Welcome {username}!\nYou can now sign in with your credentials.")
+            def create_account():
+                # Hashing the password is slow, so this runs on a worker thread
+                new_customer = Customer(
+                    username=username,
+                    password=password,
+                    email=email,
+                    address=address,
+                    phone_number=phone_number
+                )
+                
+                customer_dict = new_customer.to_dict()
+                customer_dict['full_name'] = full_name
+                return storage.add_user(customer_dict)
             
-            current_geometry = root.geometry()
-            root.destroy()
-            from gui.login_gui import login_gui
-            login_gui(current_geometry)
+            register_btn.config(state='disabled')
+            run_in_background(root, create_account, finish_register, register_error)
             
         except Exception as e:
-            status_label.config(text="❌ Registration failed!", fg=colors['danger'])
-            print(f"Registration error: {e}")  # For debugging
+            register_error(e)
+    
+    def finish_register(created):
+        register_btn.config(state='normal')
+        username = entries['username'].get().strip()
+        if not created:
+            status_label.config(text="❌ Username already exists!", fg=colors['danger'])
+            return
+        
+        status_label.config(text="✅ Account created successfully!", fg=colors['success'])
+        root.update()
+        
+        messagebox.showinfo("Success!", 
+                          f"Account created successfully!\n\n"
+                          f"Welcome {username}!\nYou can now sign in with your credentials.")
+        
+        current_geometry = root.geometry()
+        root.destroy()
+        from gui.login_gui import login_gui
+        login_gui(current_geometry)
+    
+    def register_error(e):
+        register_btn.config(state='normal')
+        status_label.config(text="❌ Registration failed!", fg=colors['danger'])
+        print(f"Registration error: {e}")  # For debugging
     
     # Register button
     register_btn = tk.Button(card_content,
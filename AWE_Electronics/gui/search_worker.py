@@ -0,0 +1,125 @@
+import queue
+import threading
+
+# Default quiet period after the last keystroke before a search runs
+SEARCH_DEBOUNCE_MS = 250
+
+# How often the Tk loop checks for finished searches
+RESULT_POLL_MS = 30
+
+class DebouncedSearch:
+    """Debounced search that runs queries off the Tk main thread
+
+    Keystrokes within the debounce window are coalesced into one query. The
+    query runs on a worker thread; results are handed back to Tk through a
+    queue that is polled with root.after, and results from a query that has
+    since been superseded are dropped.
+
+    search_fn(query) runs on the worker thread and must not touch Tk
+    widgets. on_results(query, results) and on_error(query, error) run on
+    the Tk thread.
+    """
+
+    def __init__(self, root, search_fn, on_results, on_error=None,
+                 delay_ms=SEARCH_DEBOUNCE_MS, poll_ms=RESULT_POLL_MS):
+        self.root = root
+        self.search_fn = search_fn
+        self.on_results = on_results
+        self.on_error = on_error
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+
+        self._generation = 0
+        self._pending_after = None
+        self._poll_after = None
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._closed = False
+
+        self._worker = threading.Thread(target=self._run, name="search-worker", daemon=True)
+        self._worker.start()
+
+    def submit(self, query, immediate=False):
+        """Schedule a search, replacing any search not yet started"""
+        if self._closed:
+            return
+        self._generation += 1
+        if self._pending_after is not None:
+            self.root.after_cancel(self._pending_after)
+            self._pending_after = None
+
+        generation = self._generation
+        if immediate:
+            self._dispatch(generation, query)
+        else:
+            self._pending_after = self.root.after(self.delay_ms, self._dispatch, generation, query)
+
+    def _dispatch(self, generation, query):
+        """Hand a query to the worker thread (Tk thread)"""
+        self._pending_after = None
+        if generation != self._generation:
+            return
+        self._requests.put((generation, query))
+        if self._poll_after is None:
+            self._poll_after = self.root.after(self.poll_ms, self._poll)
+
+    def _run(self):
+        """Worker loop: always run the newest queued query"""
+        while True:
+            request = self._requests.get()
+            # Skip straight to the newest request if several queued up
+            while request is not None:
+                try:
+                    request = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+            if request is None or self._closed:
+                return
+
+            generation, query = request
+            if generation != self._generation:
+                continue
+            try:
+                self._results.put((generation, query, self.search_fn(query), None))
+            except Exception as e:
+                self._results.put((generation, query, None, e))
+
+    def _poll(self):
+        """Deliver finished searches to the Tk thread"""
+        self._poll_after = None
+        if self._closed:
+            return
+
+        latest = None
+        while True:
+            try:
+                latest = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+        if latest is not None:
+            generation, query, results, error = latest
+            if generation == self._generation:
+                if error is None:
+                    self.on_results(query, results)
+                elif self.on_error:
+                    self.on_error(query, error)
+                else:
+                    print(f"Search failed for '{query}': {error}")
+                return
+
+        # Keep polling while the current query is still in flight
+        self._poll_after = self.root.after(self.poll_ms, self._poll)
+
+    def close(self):
+        """Stop the worker thread and cancel scheduled callbacks"""
+        if self._closed:
+            return
+        self._closed = True
+        for after_id in (self._pending_after, self._poll_after):
+            if after_id is not None:
+                try:
+                    self.root.after_cancel(after_id)
+                except Exception:
+                    pass
+        self._requests.put(None)
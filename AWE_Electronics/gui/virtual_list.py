@@ -0,0 +1,190 @@
+import tkinter as tk
+import tkinter.font as tkfont
+from collections import OrderedDict
+
+# Formatted display strings kept for rows that scrolled out of view
+ROW_CACHE_SIZE = 2000
+
+class VirtualListbox(tk.Frame):
+    """Scrollable listbox that only materializes the rows in its viewport
+
+    Rows are set as a sequence of items plus a format_row(item) function.
+    Only the rows visible in the viewport are formatted and inserted into
+    the underlying Listbox, and their display strings are cached, so
+    refreshing the list costs the same for ten items or a hundred thousand.
+    The scrollbar is driven from the full item count, so it behaves like a
+    normal Listbox scrollbar.
+
+    Selection works with absolute row indexes: curselection(), get(index)
+    and item(index) mirror the Listbox API, and a <<ListboxSelect>> event
+    is generated on this widget when the user selects a row.
+    """
+
+    def __init__(self, master, format_row, padding=10, cache_size=ROW_CACHE_SIZE,
+                 bg='white', **listbox_options):
+        super().__init__(master, bg=bg)
+        self.format_row = format_row
+        self.cache_size = cache_size
+
+        self._items = []
+        self._placeholder = None
+        self._row_cache = OrderedDict()
+        self._first = 0
+        self._visible_rows = 1
+        self._selected = None
+
+        listbox_options.setdefault('bg', bg)
+        listbox_options.setdefault('relief', 'flat')
+        self.listbox = tk.Listbox(self, exportselection=False, **listbox_options)
+        self.scrollbar = tk.Scrollbar(self, orient='vertical', command=self.yview)
+
+        self.listbox.pack(side='left', fill='both', expand=True, padx=padding, pady=padding)
+        self.scrollbar.pack(side='right', fill='y')
+
+        font = tkfont.Font(font=self.listbox.cget('font'))
+        self._line_height = (font.metrics('linespace') + 1
+                             + 2 * int(self.listbox.cget('selectborderwidth')))
+
+        self.listbox.bind('<Configure>', self._on_resize)
+        self.listbox.bind('<<ListboxSelect>>', self._on_select)
+        self.listbox.bind('<MouseWheel>', self._on_mousewheel)
+        self.listbox.bind('<Button-4>', lambda e: self._scroll_by(-3))
+        self.listbox.bind('<Button-5>', lambda e: self._scroll_by(3))
+        self.listbox.bind('<Up>', lambda e: self._move_selection(-1))
+        self.listbox.bind('<Down>', lambda e: self._move_selection(1))
+        self.listbox.bind('<Prior>', lambda e: self._move_selection(-self._visible_rows))
+        self.listbox.bind('<Next>', lambda e: self._move_selection(self._visible_rows))
+        self.listbox.bind('<Home>', lambda e: self._move_selection(-len(self._items)))
+        self.listbox.bind('<End>', lambda e: self._move_selection(len(self._items)))
+        # The inner Listbox holds only one screenful, it must never scroll itself
+        self.listbox.bind('<B1-Leave>', lambda e: "break")
+
+    def set_items(self, items, placeholder=None):
+        """Replace the rows, showing placeholder text if there are none"""
+        self._items = items if isinstance(items, list) else list(items)
+        self._placeholder = placeholder
+        self._row_cache.clear()
+        self._first = 0
+        self._selected = None
+        self._render()
+
+    def refresh_rows(self):
+        """Re-format the visible rows after the underlying items changed"""
+        self._row_cache.clear()
+        self._render()
+
+    def size(self):
+        return len(self._items)
+
+    def item(self, index):
+        """Get the item behind a row"""
+        return self._items[index]
+
+    def get(self, index):
+        """Get the display string of a row"""
+        return self._row_text(index)
+
+    def curselection(self):
+        """Get the selected row index as a tuple, like Listbox.curselection"""
+        return () if self._selected is None else (self._selected,)
+
+    def selection_set(self, index):
+        """Select a row and scroll it into view"""
+        if not self._items:
+            return
+        self._selected = max(0, min(index, len(self._items) - 1))
+        self.see(self._selected)
+
+    def selection_clear(self):
+        self._selected = None
+        self._render()
+
+    def see(self, index):
+        """Scroll so that a row is visible"""
+        if index < self._first:
+            self._first = index
+        elif index >= self._first + self._visible_rows:
+            self._first = index - self._visible_rows + 1
+        self._render()
+
+    def yview(self, *args):
+        """Scrollbar command: handles 'moveto' and 'scroll' like Listbox.yview"""
+        if not args:
+            total = max(len(self._items), 1)
+            return (self._first / total, min(self._first + self._visible_rows, total) / total)
+        if args[0] == 'moveto':
+            self._first = int(float(args[1]) * len(self._items))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= max(self._visible_rows - 1, 1)
+            self._first += step
+        self._render()
+
+    def _row_text(self, index):
+        """Format a row, using the display string cache"""
+        text = self._row_cache.get(index)
+        if text is not None:
+            self._row_cache.move_to_end(index)
+            return text
+        text = self.format_row(self._items[index])
+        self._row_cache[index] = text
+        if len(self._row_cache) > self.cache_size:
+            self._row_cache.popitem(last=False)
+        return text
+
+    def _render(self):
+        """Fill the inner Listbox with the rows in the viewport"""
+        total = len(self._items)
+        self._first = max(0, min(self._first, total - self._visible_rows))
+        # One extra row fills a partly visible line at the bottom
+        last = min(self._first + self._visible_rows + 1, total)
+
+        self.listbox.delete(0, tk.END)
+        if total:
+            self.listbox.insert(0, *[self._row_text(i) for i in range(self._first, last)])
+            if self._selected is not None and self._first <= self._selected < last:
+                self.listbox.selection_set(self._selected - self._first)
+        elif self._placeholder:
+            self.listbox.insert(0, self._placeholder)
+        self.listbox.yview_moveto(0)
+
+        if total:
+            self.scrollbar.set(self._first / total,
+                               min(self._first + self._visible_rows, total) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _on_resize(self, event):
+        visible_rows = max(1, event.height // self._line_height)
+        if visible_rows != self._visible_rows:
+            self._visible_rows = visible_rows
+            self._render()
+
+    def _on_select(self, event):
+        selection = self.listbox.curselection()
+        if not selection or not self._items:
+            return
+        index = self._first + selection[0]
+        if index < len(self._items):
+            self._selected = index
+            self.event_generate('<<ListboxSelect>>')
+
+    def _on_mousewheel(self, event):
+        if abs(event.delta) >= 120:
+            self._scroll_by(-3 * int(event.delta / 120))
+        elif event.delta:
+            self._scroll_by(-1 if event.delta > 0 else 1)
+        return "break"
+
+    def _scroll_by(self, rows):
+        self._first += rows
+        self._render()
+        return "break"
+
+    def _move_selection(self, delta):
+        if self._items:
+            current = self._first if self._selected is None else self._selected
+            self.selection_set(current + delta)
+            self.event_generate('<<ListboxSelect>>')
+        return "break"
@@ -17,7 +17,7 @@ Features:
 - Enhanced error handling and validation
 
 Author: AWE Electronics Development Team
-"""-
+"""
 
 import sys
 import os
@@ -99,6 +99,13 @@ class AWEElectronicsApp:
             from utils.file_handler import initialize_default_data
             initialize_default_data()
             
+            # Fold journaled orders into orders.json in the background
+            from utils.storage import STORAGE_BACKEND
+            if STORAGE_BACKEND == "json":
+                from utils.order_store import start_compactor
+                start_compactor()
+            logger.info(f"Storage backend: {STORAGE_BACKEND}")
+            
             print("Data files initialized successfully")
             return True
             
@@ -367,6 +374,21 @@ class AWEElectronicsApp:
             print(f" Setup failed: {str(e)}")
             return False
     
+    def shutdown_storage(self):
+        """Write out queued mutations and counters and stop the journal compactor"""
+        try:
+            from utils.write_behind import shutdown_writes
+            from utils.order_store import stop_compactor
+            from utils.storage import reset_storage
+            # Queued writes go out before the compactor folds the journal
+            shutdown_writes()
+            # Closing the storage also saves the stats counters
+            reset_storage()
+            stop_compactor()
+        except Exception as e:
+            logger.error(f"Failed to shut down storage cleanly: {str(e)}")
+            print(f" Error saving data on exit: {str(e)}")
+    
     def run(self):
         """Main application entry point"""
         try:
@@ -427,6 +449,10 @@ class AWEElectronicsApp:
                 pass
             
             return 1
+        
+        finally:
+            # However the GUI ended, queued writes were already acknowledged
+            self.shutdown_storage()
 
 def main():
     """
@@ -437,6 +463,14 @@ def main():
         python main.py --info       # Show system information
         python main.py --help       # Show help information
         python main.py --setup      # Run setup process
+        python main.py --migrate    # Migrate JSON data files to SQLite
+        python main.py --benchmark  # Run performance benchmarks
+        python main.py --rebuild-sales  # Recompute the sales aggregates
+        python main.py --migrate-orders  # Convert orders to the compact record format
+        python main.py --backup     # Back up the data files incrementally
+        python main.py --restore <id>  # Restore the data files from a backup
+        python main.py --check-data [processes]  # Integrity report as JSON
+        python main.py --calibrate-passwords [ms]  # Tune password hashing cost
     """
     
     # Handle command line arguments
@@ -454,6 +488,23 @@ Options:
   --info, -i     Show system information
   --version, -v  Show version information
   --setup, -s    Run setup process
+  --migrate      Copy the JSON data files into the SQLite database
+                 (then set AWE_STORAGE_BACKEND=sqlite to use it)
+  --rebuild-sales  Recompute the sales report aggregates from all orders
+  --migrate-orders Convert stored orders to the compact record format
+                 (invoice and receipt stored as deltas of the order)
+  --backup       Back up the data files (only changed chunks are stored)
+                 and prune backups outside the retention policy
+  --restore <id> Restore the data files from a backup
+                 (python main.py --restore lists the backups)
+  --check-data [processes]
+                 Check the data files and the references between them,
+                 printing a JSON report (scans run in parallel if given)
+  --calibrate-passwords [ms]
+                 Pick the password hashing cost for this machine so one
+                 login check takes about ms milliseconds (default 250)
+  --benchmark    Run a performance benchmark on scratch data
+                 (python main.py --benchmark --help lists them)
 
 Features:
 • Customer shopping interface with responsive design
@@ -499,6 +550,61 @@ GitHub: https://github.com/awe-electronics/online-store
             success = app.run_setup()
             return 0 if success else 1
             
+        elif arg == '--migrate':
+            from utils.storage import migrate_json_to_sqlite, SQLITE_FILE
+            counts = migrate_json_to_sqlite()
+            print(f"Migrated {counts['users']} users, {counts['products']} products "
+                  f"and {counts['orders']} orders to {SQLITE_FILE}")
+            print("Set AWE_STORAGE_BACKEND=sqlite to use the SQLite backend")
+            return 0
+            
+        elif arg == '--rebuild-sales':
+            from controllers.admin_controller import rebuild_sales_report
+            rebuild_sales_report()
+            return 0
+            
+        elif arg == '--migrate-orders':
+            from utils.storage import get_storage
+            converted, total = get_storage().migrate_order_records()
+            print(f"Converted {converted} of {total} orders to the compact record format")
+            return 0
+            
+        elif arg == '--backup':
+            from utils.file_handler import backup_data
+            return 0 if backup_data() else 1
+            
+        elif arg == '--restore':
+            from utils.file_handler import restore_data
+            from utils.backup_store import list_backups
+            if len(sys.argv) < 3:
+                print("Backups:", ", ".join(list_backups()) or "none")
+                return 1
+            return 0 if restore_data(sys.argv[2]) else 1
+            
+        elif arg == '--check-data':
+            import json
+            from utils.integrity import check_integrity
+            processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+            report = check_integrity(processes)
+            print(json.dumps(report, indent=2))
+            return 0 if report["ok"] else 1
+            
+        elif arg == '--calibrate-passwords':
+            from utils.passwords import (calibrate, save_policy, DEFAULT_TARGET_MS,
+                                         PASSWORD_POLICY_FILE)
+            target_ms = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_TARGET_MS
+            policy, measured_ms = calibrate(target_ms)
+            if not save_policy(policy):
+                return 1
+            print(f"Password hashing: {policy} ({measured_ms:.0f} ms per check, "
+                  f"target {target_ms:.0f} ms)")
+            print(f"Saved to {PASSWORD_POLICY_FILE}; existing hashes are upgraded at next login")
+            return 0
+            
+        elif arg == '--benchmark':
+            from utils.benchmarks import main as run_benchmarks
+            return run_benchmarks(sys.argv[2:])
+            
         else:
             print(f"  Unknown argument: {arg}")
             print("Use --help for usage information")
@@ -1,9 +1,12 @@
+from utils.passwords import hash_password, is_password_hash
+
 class Account:
     """Base account class for all user types"""
     
     def __init__(self, username, password, email, role):
         self.username = username
-        self.password = password  # In production, this should be hashed
+        # Stored as a salted hash, never as plaintext
+        self.password = password if is_password_hash(password) else hash_password(password)
         self.email = email
         self.role = role
 
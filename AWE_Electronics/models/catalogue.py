@@ -1,37 +1,155 @@
-from utils.file_handler import read_json
+import logging
+import threading
+
+from utils.storage import get_storage
+from utils.stats import LOW_STOCK_THRESHOLD, stock_bucket
+from utils.search_index import ProductSearchIndex, tokenize
+from utils.locks import LockStripes
 from models.product import Product
+from models.columnar_catalogue import get_columnar_catalogue, peek_columnar_catalogue
+
+logger = logging.getLogger(__name__)
+
+_shared_catalogue = None
+_shared_lock = threading.Lock()
 
-PRODUCT_FILE = "data/products.json"
+def get_catalogue():
+    """Get the shared catalogue, reloading it only if the product data changed"""
+    global _shared_catalogue
+    with _shared_lock:
+        if _shared_catalogue is None:
+            _shared_catalogue = Catalogue()
+        elif _shared_catalogue.is_stale():
+            _shared_catalogue.refresh()
+        return _shared_catalogue
+
+def reset_catalogue():
+    """Forget the shared catalogue so the next get_catalogue() reloads it"""
+    global _shared_catalogue
+    with _shared_lock:
+        _shared_catalogue = None
 
 class Catalogue:
-    """Product catalogue management class"""
-    
+    """Product catalogue management class
+
+    Products are indexed by ID, by category, by stock bucket and by a
+    full-text search index. The indexes are built once when the catalogue
+    loads and are kept in sync by the mutation methods (add_product,
+    update_product, update_stock, reduce_stock, remove_product), which also
+    persist the change.
+
+    Stock changes hold a per-product stripe lock, so checkouts of different
+    products do not wait on each other inside the process, while storage
+    makes the check-and-decrement atomic across processes.
+
+    Inventory totals (get_total_value, get_category_totals) are answered by
+    the shared ColumnarCatalogue; every mutation here is pushed into it if
+    it is loaded, so it does not have to reload after our own writes.
+    """
+
     def __init__(self):
-        self.products = []
+        self._by_id = {}
+        self._by_category = {}
+        self._by_stock = {"in_stock": {}, "low_stock": {}, "out_of_stock": {}}
+        self._bucket_of = {}
+        self._search_index = ProductSearchIndex()
+        self._lock = threading.RLock()
+        self._stripes = LockStripes()
+        self._version_lock = threading.Lock()
+        self.version = None
         self.load_products()
 
+    @property
+    def products(self):
+        """All products in catalogue order"""
+        with self._lock:
+            return list(self._by_id.values())
+
     def load_products(self):
-        """Load products from JSON file"""
-        try:
-            product_data = read_json(PRODUCT_FILE)
-            self.products = []
-            
-            for prod_dict in product_data:
-                # Handle both old and new data formats
-                description = prod_dict.get('description', '')
-                product = Product(
-                    product_id=prod_dict['product_id'],
-                    name=prod_dict['name'],
-                    price=prod_dict['price'],
-                    category=prod_dict['category'],
-                    stock=prod_dict['stock'],
-                    description=description
-                )
-                self.products.append(product)
-                
-        except Exception as e:
-            print(f"Error loading products: {e}")
-            self.products = []
+        """Load products from the configured storage backend"""
+        with self._lock:
+            self._clear_indexes()
+            try:
+                storage = get_storage()
+                with self._version_lock:
+                    self.version = storage.products_version()
+                product_data = storage.load_products()
+
+                for prod_dict in product_data:
+                    # Handle both old and new data formats
+                    description = prod_dict.get('description', '')
+                    product = Product(
+                        product_id=prod_dict['product_id'],
+                        name=prod_dict['name'],
+                        price=prod_dict['price'],
+                        category=prod_dict['category'],
+                        stock=prod_dict['stock'],
+                        description=description
+                    )
+                    self._index_product(product)
+
+                self._search_index.rebuild(self._by_id.values())
+
+            except Exception as e:
+                print(f"Error loading products: {e}")
+                self._clear_indexes()
+
+    def _clear_indexes(self):
+        """Empty all product indexes"""
+        self._by_id = {}
+        self._by_category = {}
+        self._by_stock = {"in_stock": {}, "low_stock": {}, "out_of_stock": {}}
+        self._bucket_of = {}
+        self._search_index = ProductSearchIndex()
+
+    def _index_product(self, product):
+        """Add a product to every index"""
+        self._by_id[product.product_id] = product
+        category = product.category.lower()
+        self._by_category.setdefault(category, {})[product.product_id] = product
+        bucket = stock_bucket(product.stock)
+        self._by_stock[bucket][product.product_id] = product
+        self._bucket_of[product.product_id] = bucket
+
+    def _unindex_product(self, product):
+        """Remove a product from the category and stock indexes"""
+        category = product.category.lower()
+        members = self._by_category.get(category)
+        if members is not None:
+            members.pop(product.product_id, None)
+            if not members:
+                del self._by_category[category]
+        bucket = self._bucket_of.pop(product.product_id, None)
+        if bucket is not None:
+            self._by_stock[bucket].pop(product.product_id, None)
+
+    def _rebucket(self, product):
+        """Move a product to the right stock bucket after its stock changed"""
+        bucket = stock_bucket(product.stock)
+        old_bucket = self._bucket_of.get(product.product_id)
+        if bucket != old_bucket:
+            self._by_stock[old_bucket].pop(product.product_id, None)
+            self._by_stock[bucket][product.product_id] = product
+            self._bucket_of[product.product_id] = bucket
+
+    def _written(self, before, after):
+        """on_version callback of our own writes: take the version the write made
+
+        Only if the write was applied to the version this catalogue holds;
+        otherwise someone else wrote in between and is_stale() must stay
+        true so that their change gets loaded. Called under storage's
+        write lock, possibly on the writer thread, so no catalogue lock.
+        """
+        with self._version_lock:
+            if before == self.version:
+                self.version = after
+        columns = peek_columnar_catalogue()
+        if columns is not None:
+            columns.written(before, after)
+
+    def is_stale(self):
+        """Check if the stored product data changed since the last load"""
+        return get_storage().products_version() != self.version
 
     def list_all_products(self):
         """Return all products"""
@@ -39,57 +157,180 @@ class Catalogue:
 
     def list_by_category(self, category):
         """Return products filtered by category"""
-        return [p for p in self.products if p.category.lower() == category.lower()]
-    
-    def search_products(self, search_term):
-        """Search products by name, category, or product ID"""
-        search_term = search_term.lower()
-        return [p for p in self.products if (
-            search_term in p.name.lower() or
-            search_term in p.category.lower() or
-            search_term in p.product_id.lower()
-        )]
-    
+        return list(self._by_category.get(category.lower(), {}).values())
+
+    def search_products(self, search_term, limit=None):
+        """Search products by name, category, product ID or description
+
+        Every word must match (as a whole word, a prefix or a substring) and
+        results come back best match first. An empty search returns all
+        products.
+        """
+        with self._lock:
+            if not tokenize(search_term):
+                return self.products[:limit] if limit is not None else self.products
+            return [self._by_id[pid] for pid in self._search_index.search(search_term, limit)]
+
     def get_product_by_id(self, product_id):
         """Get a specific product by ID"""
-        for product in self.products:
-            if product.product_id == product_id:
-                return product
-        return None
-    
+        return self._by_id.get(product_id)
+
     def get_available_products(self):
         """Return only products that are in stock"""
-        return [p for p in self.products if p.stock > 0]
-    
-    def get_low_stock_products(self, threshold=5):
+        return [p for p in self._by_id.values() if p.stock > 0]
+
+    def get_low_stock_products(self, threshold=LOW_STOCK_THRESHOLD):
         """Return products with low stock"""
-        return [p for p in self.products if 0 < p.stock <= threshold]
-    
+        if threshold == LOW_STOCK_THRESHOLD:
+            return list(self._by_stock["low_stock"].values())
+        return [p for p in self._by_id.values() if 0 < p.stock <= threshold]
+
     def get_out_of_stock_products(self):
         """Return products that are out of stock"""
-        return [p for p in self.products if p.stock == 0]
-    
+        return list(self._by_stock["out_of_stock"].values())
+
     def get_categories(self):
         """Get unique list of all categories"""
         categories = set()
-        for product in self.products:
-            categories.add(product.category)
+        for members in self._by_category.values():
+            for product in members.values():
+                categories.add(product.category)
         return sorted(list(categories))
-    
+
     def get_total_products(self):
         """Get total number of products"""
-        return len(self.products)
-    
+        return len(self._by_id)
+
     def get_total_value(self):
         """Get total value of all inventory"""
-        return sum(p.price * p.stock for p in self.products)
-    
+        return get_columnar_catalogue().get_total_value()
+
+    def get_category_totals(self):
+        """Get {category: (products, units in stock, stock value)}"""
+        return get_columnar_catalogue().get_category_totals()
+
+    def add_product(self, product):
+        """Add and persist a new product, returns False if the ID exists"""
+        with self._lock:
+            if product.product_id in self._by_id:
+                return False
+            if not get_storage().add_product(product.to_dict(), on_version=self._written):
+                return False
+            self._index_product(product)
+            self._search_index.add(product)
+            columns = peek_columnar_catalogue()
+            if columns is not None:
+                columns.put_product(product.to_dict())
+            return True
+
+    def update_product(self, product_id, product):
+        """Replace and persist the product stored under product_id"""
+        with self._lock:
+            existing = self._by_id.get(product_id)
+            if existing is None:
+                return False
+            if product.product_id != product_id and product.product_id in self._by_id:
+                return False
+            if not get_storage().update_product(product_id, product.to_dict(),
+                                                on_version=self._written):
+                return False
+            self._unindex_product(existing)
+            if product.product_id == product_id:
+                self._by_id[product_id] = product
+            else:
+                del self._by_id[product_id]
+            self._index_product(product)
+            self._search_index.update(product, product_id)
+            columns = peek_columnar_catalogue()
+            if columns is not None:
+                if product.product_id == product_id:
+                    columns.put_product(product.to_dict())
+                else:
+                    columns.drop_product(product_id)
+            return True
+
+    def update_stock(self, product_id, new_stock):
+        """Set and persist a product's stock, returns the old stock or None"""
+        with self._stripes.hold([product_id]), self._lock:
+            product = self._by_id.get(product_id)
+            if product is None:
+                return None
+            old_stock = product.stock
+            product.update_stock(new_stock)
+            # The in-memory copy is already right, so don't hold the caller
+            # (usually the GUI thread) up while the write is made durable
+            written = get_storage().update_stock(product_id, product.stock, wait=False,
+                                                 on_version=self._written)
+            written.add_done_callback(self._stock_written)
+            self._rebucket(product)
+            columns = peek_columnar_catalogue()
+            if columns is not None:
+                columns.apply_stock_levels({product_id: product.stock})
+            return old_stock
+
+    def _stock_written(self, written):
+        """Report a stock update that failed to reach storage"""
+        if written.exception() is not None:
+            logger.error(f"Error saving stock: {written.exception()}")
+
+    def reduce_stock(self, product_id, quantity):
+        """Reduce and persist a product's stock if enough is available"""
+        reserved, _ = self.reserve_stock({product_id: quantity})
+        return reserved
+
+    def reserve_stock(self, quantities):
+        """Atomically take stock for several products, all or nothing
+
+        quantities maps product_id to quantity. Stock is re-validated
+        against storage rather than the in-memory copy, since another
+        process may have sold it. Returns (True, new stock levels) or
+        (False, available stock of the products that fell short).
+        """
+        with self._stripes.hold(quantities):
+            reserved, levels = get_storage().reserve_stock(quantities, on_version=self._written)
+            self._apply_stock_levels(levels)
+            return reserved, levels
+
+    def release_stock(self, quantities):
+        """Give back stock taken by reserve_stock, e.g. when an order fails"""
+        with self._stripes.hold(quantities):
+            levels = get_storage().release_stock(quantities, on_version=self._written)
+            self._apply_stock_levels(levels)
+            return levels
+
+    def _apply_stock_levels(self, levels):
+        """Bring in-memory stock in line with levels read from storage"""
+        with self._lock:
+            for product_id, stock in levels.items():
+                product = self._by_id.get(product_id)
+                if product is not None:
+                    product.stock = stock
+                    self._rebucket(product)
+            columns = peek_columnar_catalogue()
+            if columns is not None:
+                columns.apply_stock_levels(levels)
+
+    def remove_product(self, product_id):
+        """Delete and persist the removal of a product"""
+        with self._lock:
+            product = self._by_id.get(product_id)
+            if product is None or not get_storage().delete_product(product_id,
+                                                                   on_version=self._written):
+                return False
+            self._unindex_product(product)
+            self._search_index.remove(product_id)
+            del self._by_id[product_id]
+            columns = peek_columnar_catalogue()
+            if columns is not None:
+                columns.drop_product(product_id)
+            return True
+
     def refresh(self):
         """Reload products from file"""
         self.load_products()
 
     def __str__(self):
-        return f"Catalogue with {len(self.products)} products"
-    
+        return f"Catalogue with {len(self._by_id)} products"
+
     def __repr__(self):
-        return self.__str__()
\ No newline at end of file
+        return self.__str__()
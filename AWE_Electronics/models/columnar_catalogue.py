@@ -0,0 +1,388 @@
+import operator
+import threading
+from array import array
+
+from utils.storage import get_storage
+from utils.stats import LOW_STOCK_THRESHOLD
+from models.product import Product
+
+try:
+    import numpy
+except ImportError:  # The array module alone still works, just without vectorizing
+    numpy = None
+
+# Column type codes: price as float64, stock as int32, category as a code
+# into ProductColumns.category_names
+PRICE_TYPECODE = "d"
+STOCK_TYPECODE = "i"
+CATEGORY_TYPECODE = "H"
+
+_shared_columns = None
+_shared_lock = threading.Lock()
+
+def get_columnar_catalogue():
+    """Get the shared columnar catalogue, reloading it only if the product data changed"""
+    global _shared_columns
+    with _shared_lock:
+        if _shared_columns is None:
+            _shared_columns = ColumnarCatalogue()
+        elif _shared_columns.is_stale():
+            _shared_columns.refresh()
+        return _shared_columns
+
+def peek_columnar_catalogue():
+    """Get the shared columnar catalogue if one is loaded, without loading it
+
+    Reads the reference without the shared lock, so it can be called from
+    storage's on_version callbacks while another thread is reloading.
+    """
+    return _shared_columns
+
+def reset_columnar_catalogue():
+    """Forget the shared columnar catalogue so the next call reloads it"""
+    global _shared_columns
+    with _shared_lock:
+        _shared_columns = None
+
+class ProductRow(Product):
+    """Product view of one row of a ProductColumns
+
+    Attributes read from and write to the columns, so a view costs a few
+    dozen bytes and changes made through it show up in the bulk queries.
+    """
+
+    __slots__ = ("_columns", "_row")
+
+    def __init__(self, columns, row):
+        self._columns = columns
+        self._row = row
+
+    @property
+    def product_id(self):
+        return self._columns.ids[self._row]
+
+    @property
+    def name(self):
+        return self._columns.names[self._row]
+
+    @name.setter
+    def name(self, value):
+        self._columns.names[self._row] = value
+
+    @property
+    def price(self):
+        return self._columns.price[self._row]
+
+    @price.setter
+    def price(self, value):
+        self._columns.price[self._row] = float(value)
+
+    @property
+    def category(self):
+        return self._columns.category_names[self._columns.category[self._row]]
+
+    @category.setter
+    def category(self, value):
+        self._columns.set_category(self._row, value)
+
+    @property
+    def stock(self):
+        return self._columns.stock[self._row]
+
+    @stock.setter
+    def stock(self, value):
+        self._columns.stock[self._row] = int(value)
+
+    @property
+    def description(self):
+        return self._columns.descriptions[self._row]
+
+    @description.setter
+    def description(self, value):
+        self._columns.descriptions[self._row] = value
+
+class ProductColumns:
+    """Products stored as one array per field instead of one object per SKU
+
+    Numeric fields live in array.array columns of machine values, about a
+    third of the memory of Product objects. With NumPy installed the
+    columns are viewed as NumPy arrays without copying and inventory math
+    runs vectorized; without it the same queries are plain loops over the
+    arrays, about as fast as looping over Product objects.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.names = []
+        self.descriptions = []
+        self.price = array(PRICE_TYPECODE)
+        self.stock = array(STOCK_TYPECODE)
+        self.category = array(CATEGORY_TYPECODE)
+        self.category_names = []
+        self._category_codes = {}
+        self._row_of = None
+        self._category_rows = None
+        self._views = {}
+
+    @classmethod
+    def from_records(cls, records):
+        """Build the columns from product dicts as storage returns them"""
+        columns = cls()
+        for record in records:
+            columns.append(record)
+        return columns
+
+    def __len__(self):
+        return len(self.ids)
+
+    def category_code(self, category):
+        """Get the small-int code of a category, adding it if it is new"""
+        code = self._category_codes.get(category)
+        if code is None:
+            code = len(self.category_names)
+            self.category_names.append(category)
+            self._category_codes[category] = code
+        return code
+
+    def set_category(self, row, category):
+        self.category[row] = self.category_code(category)
+        self._category_rows = None
+
+    def set_row(self, row, record):
+        """Overwrite the fields of a row from a product record"""
+        self.names[row] = record['name']
+        self.descriptions[row] = record.get('description', '')
+        self.price[row] = float(record['price'])
+        self.stock[row] = int(record['stock'])
+        if self.category_names[self.category[row]] != record['category']:
+            self.set_category(row, record['category'])
+
+    def append(self, record):
+        """Add a product record as a new row, returns the row number"""
+        row = len(self.ids)
+        if self._row_of is not None:
+            self._row_of[record['product_id']] = row
+        self._category_rows = None
+        self.ids.append(record['product_id'])
+        self.names.append(record['name'])
+        self.descriptions.append(record.get('description', ''))
+        self.price.append(float(record['price']))
+        self.stock.append(int(record['stock']))
+        self.category.append(self.category_code(record['category']))
+        return row
+
+    def row_of(self, product_id):
+        """Get the row of a product ID, or None"""
+        if self._row_of is None:
+            # Built on the first lookup, bulk queries never need it
+            self._row_of = {product_id: row for row, product_id in enumerate(self.ids)}
+        return self._row_of.get(product_id)
+
+    def view(self, row):
+        """Get the Product view of a row, made the first time it is asked for"""
+        product = self._views.get(row)
+        if product is None:
+            product = self._views[row] = ProductRow(self, row)
+        return product
+
+    def views(self, rows):
+        return [self.view(row) for row in rows]
+
+    def _numpy_columns(self):
+        """Zero-copy NumPy views of the numeric columns"""
+        return (numpy.frombuffer(self.price, dtype=numpy.float64),
+                numpy.frombuffer(self.stock, dtype=numpy.intc),
+                numpy.frombuffer(self.category, dtype=numpy.ushort))
+
+    def total_value(self):
+        """Sum of price * stock over all rows"""
+        if not self.ids:
+            return 0.0
+        if numpy is not None:
+            price, stock, _ = self._numpy_columns()
+            return float(numpy.dot(price, stock))
+        return sum(map(operator.mul, self.price, self.stock))
+
+    def rows_where_stock(self, low, high=None):
+        """Rows with low < stock <= high (no upper bound if high is None)"""
+        if numpy is not None and self.ids:
+            _, stock, _ = self._numpy_columns()
+            mask = stock > low
+            if high is not None:
+                mask &= stock <= high
+            return numpy.flatnonzero(mask).tolist()
+        if high is None:
+            return [row for row, stock in enumerate(self.stock) if stock > low]
+        return [row for row, stock in enumerate(self.stock) if low < stock <= high]
+
+    def rows_out_of_stock(self):
+        if numpy is not None and self.ids:
+            _, stock, _ = self._numpy_columns()
+            return numpy.flatnonzero(stock <= 0).tolist()
+        return [row for row, stock in enumerate(self.stock) if stock <= 0]
+
+    def categories(self):
+        """Names of the categories that have at least one row"""
+        return [name for name, rows in zip(self.category_names, self.rows_by_category())
+                if rows]
+
+    def rows_by_category(self):
+        """Get the rows of each category code, kept until categories change"""
+        if self._category_rows is None:
+            groups = [[] for _ in self.category_names]
+            for row, code in enumerate(self.category):
+                groups[code].append(row)
+            self._category_rows = groups
+        return self._category_rows
+
+    def category_totals(self):
+        """Get {category: (products, units in stock, stock value)}"""
+        count = len(self.category_names)
+        if numpy is not None and self.ids:
+            price, stock, category = self._numpy_columns()
+            products = numpy.bincount(category, minlength=count)
+            units = numpy.bincount(category, weights=stock, minlength=count)
+            values = numpy.bincount(category, weights=price * stock, minlength=count)
+            return {name: (int(products[code]), int(units[code]), float(values[code]))
+                    for code, name in enumerate(self.category_names) if products[code]}
+        totals = {}
+        for name, rows in zip(self.category_names, self.rows_by_category()):
+            if not rows:
+                continue
+            if len(rows) > 1:
+                gather = operator.itemgetter(*rows)
+                price, stock = gather(self.price), gather(self.stock)
+            else:
+                price = [self.price[row] for row in rows]
+                stock = [self.stock[row] for row in rows]
+            totals[name] = (len(rows), sum(stock), sum(map(operator.mul, price, stock)))
+        return totals
+
+class ColumnarCatalogue:
+    """Read-mostly catalogue over ProductColumns, for bulk inventory math
+
+    Answers the same queries as Catalogue (get_total_value, the stock
+    bucket lists, categories, lookups by ID) plus per-category totals, but
+    keeps no Product object per SKU: lists of products are handed out as
+    ProductRow views made on demand. Products are written through
+    Catalogue, which pushes each change in here (put_product, drop_product,
+    apply_stock_levels) and reports the version it made (written); anything
+    else written to storage makes is_stale() true and the next
+    get_columnar_catalogue() reloads.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._columns = ProductColumns()
+        self._version_lock = threading.Lock()
+        self.version = None
+        self.load_products()
+
+    def load_products(self):
+        """Load products from the configured storage backend"""
+        with self._lock:
+            try:
+                storage = get_storage()
+                with self._version_lock:
+                    self.version = storage.products_version()
+                self._columns = ProductColumns.from_records(storage.load_products())
+            except Exception as e:
+                print(f"Error loading products: {e}")
+                self._columns = ProductColumns()
+
+    def refresh(self):
+        """Reload products from storage"""
+        self.load_products()
+
+    def is_stale(self):
+        """Check if the stored product data changed since the last load"""
+        return get_storage().products_version() != self.version
+
+    @property
+    def columns(self):
+        return self._columns
+
+    @property
+    def products(self):
+        """All products in catalogue order, as row views"""
+        with self._lock:
+            return self._columns.views(range(len(self._columns)))
+
+    def get_product_by_id(self, product_id):
+        """Get a specific product by ID"""
+        with self._lock:
+            row = self._columns.row_of(product_id)
+            return self._columns.view(row) if row is not None else None
+
+    def get_available_products(self):
+        """Return only products that are in stock"""
+        with self._lock:
+            return self._columns.views(self._columns.rows_where_stock(0))
+
+    def get_low_stock_products(self, threshold=LOW_STOCK_THRESHOLD):
+        """Return products with low stock"""
+        with self._lock:
+            return self._columns.views(self._columns.rows_where_stock(0, threshold))
+
+    def get_out_of_stock_products(self):
+        """Return products that are out of stock"""
+        with self._lock:
+            return self._columns.views(self._columns.rows_out_of_stock())
+
+    def get_categories(self):
+        """Get unique list of all categories"""
+        with self._lock:
+            return sorted(self._columns.categories())
+
+    def get_category_totals(self):
+        """Get {category: (products, units in stock, stock value)}"""
+        with self._lock:
+            return self._columns.category_totals()
+
+    def get_total_products(self):
+        """Get total number of products"""
+        return len(self._columns)
+
+    def get_total_value(self):
+        """Get total value of all inventory"""
+        with self._lock:
+            return self._columns.total_value()
+
+    def written(self, before, after):
+        """on_version callback of Catalogue's writes, see Catalogue._written"""
+        with self._version_lock:
+            if before == self.version:
+                self.version = after
+
+    def put_product(self, record):
+        """Add a product record, or overwrite the row already holding its ID"""
+        with self._lock:
+            row = self._columns.row_of(record['product_id'])
+            if row is None:
+                self._columns.append(record)
+            else:
+                self._columns.set_row(row, record)
+
+    def drop_product(self, product_id):
+        """Forget a removed or renamed product
+
+        Rows cannot be taken out without moving the rows of the views
+        already handed out, so the columns are reloaded on the next
+        get_columnar_catalogue() instead. Removals are rare admin edits.
+        """
+        with self._version_lock:
+            self.version = None
+
+    def apply_stock_levels(self, levels):
+        """Set in-memory stock from {product_id: stock}, e.g. after a reservation"""
+        with self._lock:
+            for product_id, stock in levels.items():
+                row = self._columns.row_of(product_id)
+                if row is not None:
+                    self._columns.stock[row] = int(stock)
+
+    def __str__(self):
+        return f"Columnar catalogue with {len(self._columns)} products"
+
+    def __repr__(self):
+        return self.__str__()
@@ -1,27 +1,40 @@
-import uuid
-from datetime import datetime
+from utils.ids import new_id, id_datetime, short_id, document_number
+from utils.order_records import is_order_record, expand_invoice, stored_date
+from utils.money import (money_property, stored_cents, to_cents, from_cents, percent_of,
+                         line_total_cents, format_money)
 
 class Invoice:
     """Invoice model for order billing"""
+
+    # Amounts are whole cents; amount, subtotal etc. are dollar views of them
+    __slots__ = ("invoice_id", "order_id", "user_id", "amount_cents", "subtotal_cents",
+                 "tax_amount_cents", "total_amount_cents", "invoice_date", "due_date", "status",
+                 "items", "shipping_info", "discount_amount_cents", "discount_description")
+
+    amount = money_property("amount")
+    subtotal = money_property("subtotal")
+    tax_amount = money_property("tax_amount")
+    total_amount = money_property("total_amount")
+    discount_amount = money_property("discount_amount")
     
     def __init__(self, order):
-        self.invoice_id = str(uuid.uuid4())
+        self.invoice_id = new_id()
         self.order_id = order.order_id
         self.user_id = order.user_id
-        self.amount = order.calculate_total()
-        self.subtotal = order.calculate_subtotal()
-        self.tax_amount = 0.0  # Can be calculated later if needed
-        self.total_amount = self.amount + self.tax_amount
-        self.invoice_date = datetime.now().isoformat()
-        self.due_date = datetime.now().isoformat()  # Immediate payment
+        self.amount_cents = order.calculate_total_cents()
+        self.subtotal_cents = order.calculate_subtotal_cents()
+        self.tax_amount_cents = 0  # Can be calculated later if needed
+        self.total_amount_cents = self.amount_cents + self.tax_amount_cents
+        self.invoice_date = id_datetime(self.invoice_id).isoformat()
+        self.due_date = self.invoice_date  # Immediate payment
         self.status = "Generated"
         self.items = order.items.copy()
         self.shipping_info = order.shipping.copy()
     
     def calculate_tax(self, tax_rate=0.10):
-        """Calculate tax amount based on rate"""
-        self.tax_amount = self.subtotal * tax_rate
-        self.total_amount = self.subtotal + self.tax_amount
+        """Calculate tax amount based on rate, rounded to the cent"""
+        self.tax_amount_cents = percent_of(self.subtotal_cents, tax_rate)
+        self.total_amount_cents = self.subtotal_cents + self.tax_amount_cents
         return self.tax_amount
     
     def mark_as_paid(self):
@@ -41,8 +54,8 @@ class Invoice:
     def get_invoice_summary(self):
         """Get invoice summary"""
         return {
-            "invoice_id": self.invoice_id[:8] + "...",
-            "order_id": self.order_id[:8] + "...",
+            "invoice_id": short_id(self.invoice_id) + "...",
+            "order_id": short_id(self.order_id) + "...",
             "amount": self.amount,
             "tax": self.tax_amount,
             "total": self.total_amount,
@@ -54,7 +67,7 @@ class Invoice:
         """Get detailed line items"""
         line_items = []
         for item in self.items:
-            line_total = item["price"] * item["quantity"]
+            line_total = from_cents(line_total_cents(item))
             line_items.append({
                 "product_id": item["product_id"],
                 "name": item["name"],
@@ -66,16 +79,15 @@ class Invoice:
     
     def add_discount(self, discount_amount, description="Discount"):
         """Add discount to invoice"""
-        self.discount_amount = discount_amount
+        self.discount_amount_cents = to_cents(discount_amount)
         self.discount_description = description
-        self.total_amount = self.subtotal + self.tax_amount - discount_amount
+        self.total_amount_cents = (self.subtotal_cents + self.tax_amount_cents
+                                   - self.discount_amount_cents)
         return True
     
     def generate_invoice_number(self, prefix="INV"):
         """Generate human-readable invoice number"""
-        date_str = datetime.now().strftime("%Y%m%d")
-        short_id = self.invoice_id[:8].upper()
-        return f"{prefix}-{date_str}-{short_id}"
+        return document_number(self.invoice_id, prefix)
 
     def to_dict(self):
         """Convert invoice to dictionary for JSON storage"""
@@ -83,10 +95,10 @@ class Invoice:
             "invoice_id": self.invoice_id,
             "order_id": self.order_id,
             "user_id": self.user_id,
-            "amount": self.amount,
-            "subtotal": self.subtotal,
-            "tax_amount": self.tax_amount,
-            "total_amount": self.total_amount,
+            "amount_cents": self.amount_cents,
+            "subtotal_cents": self.subtotal_cents,
+            "tax_amount_cents": self.tax_amount_cents,
+            "total_amount_cents": self.total_amount_cents,
             "invoice_date": self.invoice_date,
             "due_date": self.due_date,
             "status": self.status,
@@ -96,36 +108,41 @@ class Invoice:
     
     @classmethod
     def from_dict(cls, data, order=None):
-        """Create Invoice instance from dictionary"""
-        # Create a minimal order object if not provided
+        """Create Invoice instance from dictionary
+
+        data is an invoice dict or a whole stored order record of either
+        version; compact records are only expanded here, when asked for.
+        """
+        if is_order_record(data):
+            data = expand_invoice(data)
+        # Filled in directly rather than through __init__, which needs an
+        # order and would make an ID and dates only for them to be replaced
+        invoice = cls.__new__(cls)
+        # Cents fields, or the float dollars of invoices saved before them
+        amount_cents = stored_cents(data, "amount")
         if order is None:
-            class MinimalOrder:
-                def __init__(self, data):
-                    self.order_id = data["order_id"]
-                    self.user_id = data["user_id"]
-                    self.items = data.get("items", [])
-                    self.shipping = data.get("shipping_info", {})
-                
-                def calculate_total(self):
-                    return data["amount"]
-                
-                def calculate_subtotal(self):
-                    return data.get("subtotal", data["amount"])
-            
-            order = MinimalOrder(data)
-        
-        invoice = cls(order)
+            invoice.order_id = data["order_id"]
+            invoice.user_id = data["user_id"]
+            invoice.amount_cents = amount_cents
+            invoice.items = data.get("items", []).copy()
+            invoice.shipping_info = data.get("shipping_info", {}).copy()
+        else:
+            invoice.order_id = order.order_id
+            invoice.user_id = order.user_id
+            invoice.amount_cents = order.calculate_total_cents()
+            invoice.items = order.items.copy()
+            invoice.shipping_info = order.shipping.copy()
         invoice.invoice_id = data["invoice_id"]
-        invoice.subtotal = data.get("subtotal", data["amount"])
-        invoice.tax_amount = data.get("tax_amount", 0.0)
-        invoice.total_amount = data.get("total_amount", data["amount"])
-        invoice.invoice_date = data.get("invoice_date", datetime.now().isoformat())
-        invoice.due_date = data.get("due_date", datetime.now().isoformat())
+        invoice.subtotal_cents = stored_cents(data, "subtotal", amount_cents)
+        invoice.tax_amount_cents = stored_cents(data, "tax_amount")
+        invoice.total_amount_cents = stored_cents(data, "total_amount", amount_cents)
+        invoice.invoice_date = stored_date(data, "invoice_date")
+        invoice.due_date = stored_date(data, "due_date")
         invoice.status = data.get("status", "Generated")
         return invoice
 
     def __str__(self):
-        return f"Invoice {self.invoice_id[:8]}... - ${self.total_amount:.2f} - {self.status}"
+        return f"Invoice {short_id(self.invoice_id)}... - {format_money(self.total_amount_cents)} - {self.status}"
     
     def __repr__(self):
-        return f"Invoice(id={self.invoice_id[:8]}..., amount={self.total_amount:.2f}, status='{self.status}')"
\ No newline at end of file
+        return f"Invoice(id={short_id(self.invoice_id)}..., amount={self.total_amount:.2f}, status='{self.status}')"
\ No newline at end of file
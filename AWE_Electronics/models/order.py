@@ -1,34 +1,68 @@
-import uuid
-from datetime import datetime
+from utils.ids import new_id, id_datetime, short_id
+from utils.order_records import stored_date
+from utils.money import (items_total_cents, line_total_cents, to_cents, stored_cents, from_cents,
+                         format_money)
 
 class Order:
-    """Order model for managing customer orders"""
+    """Order model for managing customer orders
+
+    The total and the item count are kept as running values: computed once
+    when the items are set and then adjusted by add_item and remove_item,
+    so totals, summaries, invoices and to_dict don't re-sum the lines.
+    Change the lines through those methods (or assign a new items list);
+    editing the list in place bypasses the running totals.
+    """
+
+    __slots__ = ("order_id", "user_id", "_items", "shipping", "payment_method", "order_date",
+                 "status", "_total_cents", "_item_count")
     
     def __init__(self, user_id, items, shipping, payment_method):
-        self.order_id = str(uuid.uuid4())
+        self.order_id = new_id()
         self.user_id = user_id
         self.items = items  # List of dicts with product_id, name, price, quantity
         self.shipping = shipping  # Dict with name, address, phone
         self.payment_method = payment_method
-        self.order_date = datetime.now().isoformat()
+        self.order_date = id_datetime(self.order_id).isoformat()
         self.status = "Confirmed"
 
+    @property
+    def items(self):
+        return self._items
+
+    @items.setter
+    def items(self, items):
+        self._items = items
+        self._total_cents = items_total_cents(items)
+        self._item_count = sum(item["quantity"] for item in items)
+
+    def calculate_total_cents(self):
+        """Get the total order amount in cents, exactly"""
+        if self._total_cents is None:
+            self._total_cents = items_total_cents(self._items)
+        return self._total_cents
+
     def calculate_total(self):
-        """Calculate total order amount"""
-        return sum(item["price"] * item["quantity"] for item in self.items)
+        """Calculate total order amount in dollars"""
+        return from_cents(self.calculate_total_cents())
     
+    def calculate_subtotal_cents(self):
+        """Calculate subtotal in cents (same as total for now, but could include taxes later)"""
+        return self.calculate_total_cents()
+
     def calculate_subtotal(self):
         """Calculate subtotal (same as total for now, but could include taxes later)"""
         return self.calculate_total()
     
     def get_total_items(self):
         """Get total number of items in order"""
-        return sum(item["quantity"] for item in self.items)
+        if self._item_count is None:
+            self._item_count = sum(item["quantity"] for item in self._items)
+        return self._item_count
     
     def get_order_summary(self):
         """Get a summary of the order"""
         return {
-            "order_id": self.order_id[:8] + "...",
+            "order_id": short_id(self.order_id) + "...",
             "customer": self.user_id,
             "items_count": self.get_total_items(),
             "total": self.calculate_total(),
@@ -46,16 +80,30 @@ class Order:
     
     def add_item(self, product_id, name, price, quantity):
         """Add item to order"""
-        self.items.append({
+        item = {
             "product_id": product_id,
             "name": name,
             "price": price,
             "quantity": quantity
-        })
+        }
+        self._items.append(item)
+        if self._total_cents is not None:
+            self._total_cents += to_cents(price) * quantity
+        if self._item_count is not None:
+            self._item_count += quantity
     
     def remove_item(self, product_id):
         """Remove item from order"""
-        self.items = [item for item in self.items if item["product_id"] != product_id]
+        kept = []
+        for item in self._items:
+            if item["product_id"] != product_id:
+                kept.append(item)
+                continue
+            if self._total_cents is not None:
+                self._total_cents -= line_total_cents(item)
+            if self._item_count is not None:
+                self._item_count -= item["quantity"]
+        self._items = kept
     
     def get_shipping_info(self):
         """Get shipping information"""
@@ -73,7 +121,7 @@ class Order:
             "items": self.items,
             "shipping": self.shipping,
             "payment_method": self.payment_method,
-            "total": self.calculate_total(),
+            "total_cents": self.calculate_total_cents(),
             "order_date": self.order_date,
             "status": self.status
         }
@@ -81,19 +129,23 @@ class Order:
     @classmethod
     def from_dict(cls, data):
         """Create Order instance from dictionary"""
-        order = cls(
-            user_id=data["user_id"],
-            items=data["items"],
-            shipping=data["shipping"],
-            payment_method=data["payment_method"]
-        )
+        # Not through __init__, which would make an ID and a date only for
+        # them to be replaced
+        order = cls.__new__(cls)
         order.order_id = data["order_id"]
-        order.order_date = data.get("order_date", datetime.now().isoformat())
+        order.user_id = data["user_id"]
+        # The stored total is taken as is; the count is summed when first asked for
+        order._items = data["items"]
+        order._total_cents = stored_cents(data, "total", None)
+        order._item_count = None
+        order.shipping = data["shipping"]
+        order.payment_method = data["payment_method"]
+        order.order_date = stored_date(data, "order_date")
         order.status = data.get("status", "Confirmed")
         return order
 
     def __str__(self):
-        return f"Order {self.order_id[:8]}... - {self.user_id} - ${self.calculate_total():.2f}"
+        return f"Order {short_id(self.order_id)}... - {self.user_id} - {format_money(self.calculate_total_cents())}"
     
     def __repr__(self):
-        return f"Order(id={self.order_id[:8]}..., user={self.user_id}, total={self.calculate_total():.2f})"
\ No newline at end of file
+        return f"Order(id={short_id(self.order_id)}..., user={self.user_id}, total={self.calculate_total():.2f})"
\ No newline at end of file
@@ -1,3 +1,5 @@
+from utils.money import Money, money_property, stored_cents, to_cents
+
 def choose_payment_method():
     """Choose payment method from command line (for CLI version)"""
     print("\n Payment Methods:")
@@ -17,11 +19,16 @@ def choose_payment_method():
 
 class Payment:
     """Payment model for managing payment information"""
+
+    __slots__ = ("method", "account_holder", "amount_cents", "currency", "status",
+                 "transaction_id")
+
+    amount = money_property("amount")
     
     def __init__(self, method, account_holder, amount, currency="AUD"):
         self.method = method  # PayPal, Credit Card, etc.
         self.account_holder = account_holder
-        self.amount = float(amount)
+        self.amount_cents = to_cents(amount)
         self.currency = currency
         self.status = "Pending"
         self.transaction_id = None
@@ -31,7 +38,7 @@ class Payment:
         return {
             "method": self.method,
             "account_holder": self.account_holder,
-            "amount": self.amount,
+            "amount_cents": self.amount_cents,
             "currency": self.currency,
             "status": self.status,
             "transaction_id": self.transaction_id
@@ -43,9 +50,10 @@ class Payment:
         payment = cls(
             method=data.get("method", ""),
             account_holder=data.get("account_holder", ""),
-            amount=data.get("amount", 0.0),
+            amount=0,
             currency=data.get("currency", "AUD")
         )
+        payment.amount_cents = stored_cents(data, "amount")
         payment.status = data.get("status", "Pending")
         payment.transaction_id = data.get("transaction_id")
         return payment
@@ -55,7 +63,7 @@ class Payment:
         # In a real system, this would integrate with payment gateways
         import uuid
         
-        if self.amount <= 0:
+        if self.amount_cents <= 0:
             self.status = "Failed"
             return False
         
@@ -69,8 +77,8 @@ class Payment:
         if self.status != "Completed":
             return False
         
-        refund_amount = amount if amount else self.amount
-        if refund_amount > self.amount:
+        refund_cents = to_cents(amount) if amount else self.amount_cents
+        if refund_cents > self.amount_cents:
             return False
         
         self.status = "Refunded"
@@ -86,11 +94,16 @@ class Payment:
         if not self.account_holder or len(self.account_holder.strip()) < 2:
             errors.append("Account holder name is required")
         
-        if self.amount <= 0:
+        if self.amount_cents <= 0:
             errors.append("Payment amount must be greater than zero")
         
         return errors
     
+    @property
+    def money(self):
+        """The payment amount as Money in the payment's currency"""
+        return Money(self.amount_cents, self.currency)
+
     def get_display_method(self):
         """Get formatted payment method for display"""
         return f"{self.method} - {self.account_holder}"
@@ -1,5 +1,9 @@
+from utils.stats import LOW_STOCK_THRESHOLD, STOCK_STATUS_LABELS, stock_bucket
+
 class Product:
     """Product model for inventory management"""
+
+    __slots__ = ("product_id", "name", "price", "category", "stock", "description")
     
     def __init__(self, product_id, name, price, category, stock, description=""):
         self.product_id = product_id
@@ -24,9 +28,9 @@ class Product:
         """Check if product is available in requested quantity"""
         return self.stock >= quantity
     
-    def is_low_stock(self, threshold=5):
-        """Check if product is low in stock"""
-        return self.stock <= threshold
+    def is_low_stock(self, threshold=LOW_STOCK_THRESHOLD):
+        """Check if product is low (but not out of) stock"""
+        return stock_bucket(self.stock, threshold) == "low_stock"
     
     def update_stock(self, new_stock):
         """Update product stock"""
@@ -41,12 +45,7 @@ class Product:
     
     def get_stock_status(self):
         """Get stock status as a readable string"""
-        if self.stock == 0:
-            return "Out of Stock"
-        elif self.stock <= 5:
-            return "Low Stock"
-        else:
-            return "In Stock"
+        return STOCK_STATUS_LABELS[stock_bucket(self.stock)]
 
     def __str__(self):
         return f"[{self.product_id}] {self.name} - ${self.price} ({self.stock} left)"
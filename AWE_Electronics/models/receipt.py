@@ -1,43 +1,59 @@
-import uuid
 from datetime import datetime
 
+from utils.ids import new_id, id_datetime, short_id, document_number, is_time_ordered
+from utils.order_records import is_order_record, expand_receipt, stored_date
+from utils.money import (money_property, stored_cents, to_cents, from_cents, line_total_cents,
+                         format_money)
+
 class Receipt:
     """Receipt model for payment confirmation"""
+
+    # Amounts are whole cents; amount_paid, subtotal etc. are dollar views of them
+    __slots__ = ("receipt_id", "invoice_id", "order_id", "user_id", "payment_method",
+                 "amount_paid_cents", "payment_date", "status", "transaction_reference", "items",
+                 "subtotal_cents", "tax_amount_cents", "total_amount_cents", "shipping_info",
+                 "refund_amount_cents", "refund_date")
+
+    amount_paid = money_property("amount_paid")
+    subtotal = money_property("subtotal")
+    tax_amount = money_property("tax_amount")
+    total_amount = money_property("total_amount")
+    refund_amount = money_property("refund_amount")
     
     def __init__(self, invoice, payment_method):
-        self.receipt_id = str(uuid.uuid4())
+        self.receipt_id = new_id()
         self.invoice_id = invoice.invoice_id
         self.order_id = invoice.order_id
         self.user_id = invoice.user_id
         self.payment_method = payment_method
-        self.amount_paid = invoice.total_amount
-        self.payment_date = datetime.now().isoformat()
+        self.amount_paid_cents = invoice.total_amount_cents
+        self.payment_date = id_datetime(self.receipt_id).isoformat()
         self.status = "Paid"
         self.transaction_reference = self.generate_transaction_reference()
         
         # Copy invoice details for receipt
         self.items = invoice.items.copy()
-        self.subtotal = invoice.subtotal
-        self.tax_amount = invoice.tax_amount
-        self.total_amount = invoice.total_amount
+        self.subtotal_cents = invoice.subtotal_cents
+        self.tax_amount_cents = invoice.tax_amount_cents
+        self.total_amount_cents = invoice.total_amount_cents
         self.shipping_info = invoice.shipping_info.copy()
     
     def generate_transaction_reference(self):
         """Generate transaction reference number"""
+        if is_time_ordered(self.receipt_id):
+            return document_number(self.receipt_id, "TXN")
         date_str = datetime.now().strftime("%Y%m%d%H%M")
-        short_id = self.receipt_id[:6].upper()
-        return f"TXN-{date_str}-{short_id}"
+        short_ref = self.receipt_id[:6].upper()
+        return f"TXN-{date_str}-{short_ref}"
     
     def generate_receipt_number(self, prefix="RCP"):
         """Generate human-readable receipt number"""
-        date_str = datetime.now().strftime("%Y%m%d")
-        short_id = self.receipt_id[:8].upper()
-        return f"{prefix}-{date_str}-{short_id}"
+        return document_number(self.receipt_id, prefix)
     
     def get_payment_summary(self):
         """Get payment summary"""
         return {
-            "receipt_id": self.receipt_id[:8] + "...",
+            "receipt_id": short_id(self.receipt_id) + "...",
             "transaction_ref": self.transaction_reference,
             "payment_method": self.payment_method,
             "amount_paid": self.amount_paid,
@@ -69,7 +85,7 @@ class Receipt:
         """Get itemized list with calculations"""
         itemized = []
         for item in self.items:
-            line_total = item["price"] * item["quantity"]
+            line_total = from_cents(line_total_cents(item))
             itemized.append({
                 "product_id": item["product_id"],
                 "name": item["name"],
@@ -83,9 +99,9 @@ class Receipt:
         """Mark receipt as refunded"""
         self.status = "Refunded"
         if refund_amount:
-            self.refund_amount = refund_amount
+            self.refund_amount_cents = to_cents(refund_amount)
         else:
-            self.refund_amount = self.amount_paid
+            self.refund_amount_cents = self.amount_paid_cents
         self.refund_date = datetime.now().isoformat()
         return True
     
@@ -99,11 +115,12 @@ class Receipt:
     
     def validate_payment(self):
         """Validate payment amount matches invoice"""
-        return abs(self.amount_paid - self.total_amount) < 0.01  # Allow for small rounding differences
+        # Exact: both are whole cents, no rounding tolerance needed
+        return self.amount_paid_cents == self.total_amount_cents
     
     def get_change_amount(self):
         """Calculate change if overpaid"""
-        return max(0, self.amount_paid - self.total_amount)
+        return from_cents(max(0, self.amount_paid_cents - self.total_amount_cents))
 
     def to_dict(self):
         """Convert receipt to dictionary for JSON storage"""
@@ -113,45 +130,62 @@ class Receipt:
             "order_id": self.order_id,
             "user_id": self.user_id,
             "payment_method": self.payment_method,
-            "amount_paid": self.amount_paid,
+            "amount_paid_cents": self.amount_paid_cents,
             "payment_date": self.payment_date,
             "status": self.status,
             "transaction_reference": self.transaction_reference,
             "items": self.items,
-            "subtotal": self.subtotal,    
-            "tax_amount": self.tax_amount,
-            "total_amount": self.total_amount,
+            "subtotal_cents": self.subtotal_cents,
+            "tax_amount_cents": self.tax_amount_cents,
+            "total_amount_cents": self.total_amount_cents,
             "shipping_info": self.shipping_info
         }
     
     @classmethod
     def from_dict(cls, data, invoice=None):
-        """Create Receipt instance from dictionary"""
-        # Create a minimal invoice object if not provided
+        """Create Receipt instance from dictionary
+
+        data is a receipt dict or a whole stored order record of either
+        version; compact records are only expanded here, when asked for.
+        """
+        if is_order_record(data):
+            data = expand_receipt(data)
+        # Filled in directly rather than through __init__, which needs an
+        # invoice and would make an ID and a reference only to replace them
+        receipt = cls.__new__(cls)
+        # Cents fields, or the float dollars of receipts saved before them
+        amount_paid_cents = stored_cents(data, "amount_paid")
         if invoice is None:
-            class MinimalInvoice:
-                def __init__(self, data):
-                    self.invoice_id = data["invoice_id"]
-                    self.order_id = data["order_id"]
-                    self.user_id = data["user_id"]
-                    self.items = data.get("items", [])
-                    self.subtotal = data.get("subtotal", 0)
-                    self.tax_amount = data.get("tax_amount", 0)
-                    self.total_amount = data.get("total_amount", data.get("amount_paid", 0))
-                    self.shipping_info = data.get("shipping_info", {})
-            
-            invoice = MinimalInvoice(data)
-        
-        receipt = cls(invoice, data["payment_method"])
+            receipt.invoice_id = data["invoice_id"]
+            receipt.order_id = data["order_id"]
+            receipt.user_id = data["user_id"]
+            receipt.items = data.get("items", []).copy()
+            receipt.subtotal_cents = stored_cents(data, "subtotal")
+            receipt.tax_amount_cents = stored_cents(data, "tax_amount")
+            receipt.total_amount_cents = stored_cents(data, "total_amount", amount_paid_cents)
+            receipt.shipping_info = data.get("shipping_info", {}).copy()
+        else:
+            receipt.invoice_id = invoice.invoice_id
+            receipt.order_id = invoice.order_id
+            receipt.user_id = invoice.user_id
+            receipt.items = invoice.items.copy()
+            receipt.subtotal_cents = invoice.subtotal_cents
+            receipt.tax_amount_cents = invoice.tax_amount_cents
+            receipt.total_amount_cents = invoice.total_amount_cents
+            receipt.shipping_info = invoice.shipping_info.copy()
+        receipt.payment_method = data["payment_method"]
         receipt.receipt_id = data["receipt_id"]
-        receipt.amount_paid = data["amount_paid"]
-        receipt.payment_date = data.get("payment_date", datetime.now().isoformat())
+        receipt.amount_paid_cents = amount_paid_cents
+        receipt.payment_date = stored_date(data, "payment_date")
         receipt.status = data.get("status", "Paid")
-        receipt.transaction_reference = data.get("transaction_reference", receipt.generate_transaction_reference())
+        if "transaction_reference" in data:
+            receipt.transaction_reference = data["transaction_reference"]
+        else:
+            receipt.transaction_reference = receipt.generate_transaction_reference()
         return receipt
 
     def __str__(self):
-        return f"Receipt {self.receipt_id[:8]}... - ${self.amount_paid:.2f} - {self.payment_method} - {self.status}"
+        return f"Receipt {short_id(self.receipt_id)}... - {format_money(self.amount_paid_cents)} - {self.payment_method} - {self.status}"
     
     def __repr__(self):
-        return f"Receipt(id={self.receipt_id[:8]}..., amount={self.amount_paid:.2f}, method='{self.payment_method}', status='{self.status}')"
\ No newline at end of file
+        return f"Receipt(id={short_id(self.receipt_id)}..., amount={self.amount_paid:.2f}, method='{self.payment_method}', status='{self.status}')"
\ No newline at end of file
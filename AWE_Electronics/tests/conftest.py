@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+# The app imports its packages from the AWE_Electronics directory
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Run a test from an empty working directory, data paths are relative to it"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    return tmp_path / "data"
+
+PRODUCTS = [
+    {"product_id": "P001", "name": "Laptop", "price": 1200.0, "category": "Computers", "stock": 5},
+    {"product_id": "P002", "name": "Mouse", "price": 25.5, "category": "Accessories", "stock": 2},
+    {"product_id": "P003", "name": "Cable", "price": 9.95, "category": "Accessories", "stock": 0},
+]
+
+@pytest.fixture
+def storage(data_dir):
+    """Fresh shared storage and catalogues over a data directory holding PRODUCTS"""
+    from utils.file_handler import write_json
+    from utils.storage import get_storage, reset_storage
+    from models.catalogue import reset_catalogue
+    from models.columnar_catalogue import reset_columnar_catalogue
+
+    def reset():
+        reset_storage()
+        reset_catalogue()
+        reset_columnar_catalogue()
+
+    reset()
+    write_json("data/products.json", PRODUCTS)
+    yield get_storage()
+    reset()
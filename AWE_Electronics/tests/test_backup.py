@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from utils import backup_store
+from utils.backup_store import (create_backup, list_backups, load_manifest, prune_backups,
+                                read_backup_file)
+from utils.file_handler import backup_data, read_json, restore_data, write_json
+
+USERS = [{"username": "admin1", "password": "adminpass", "role": "admin"}]
+PRODUCTS = [
+    {"product_id": "P001", "name": "Laptop", "price": 1200.0, "category": "Computers", "stock": 5},
+    {"product_id": "P002", "name": "Café mug ☕", "price": 9.95, "category": "Kitchen", "stock": 0},
+]
+
+def make_order(n):
+    return {"order": {"order_id": f"order-{n}", "user_id": "customer1",
+                      "items": [{"product_id": "P001", "price": 1200.0, "quantity": 1}],
+                      "total_cents": 120000, "order_date": f"2025-06-0{n}T10:00:00"}}
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Small files still span several chunks
+    monkeypatch.setattr(backup_store, "BACKUP_CHUNK_BYTES", 64)
+
+def test_files_round_trip(data_dir, small_chunks):
+    path = data_dir / "products.json"
+    write_json(str(path), PRODUCTS, fmt="pretty")
+    original = path.read_bytes()
+    backup_id, stats = create_backup([str(path)])
+    assert stats["files"] == 1
+    assert stats["new_chunks"] == len(load_manifest(backup_id)["files"]["products.json"]["chunks"]) > 1
+    assert read_backup_file(load_manifest(backup_id), "products.json") == original
+
+def test_unchanged_files_are_not_read_again(data_dir, small_chunks):
+    path = data_dir / "products.json"
+    write_json(str(path), PRODUCTS)
+    create_backup([str(path)])
+    _, stats = create_backup([str(path)])
+    assert (stats["unchanged_files"], stats["new_chunks"], stats["bytes_read"]) == (1, 0, 0)
+    assert len(list_backups()) == 2
+
+def test_appended_data_adds_only_new_chunks(data_dir, small_chunks):
+    path = data_dir / "orders.json"
+    path.write_bytes(b"x" * 64 * 10)
+    first, _ = create_backup([str(path)])
+    path.write_bytes(b"x" * 64 * 10 + b"tail")
+    second, stats = create_backup([str(path)])
+    assert stats["new_chunks"] == 1
+    assert read_backup_file(load_manifest(first), "orders.json") == b"x" * 640
+    assert read_backup_file(load_manifest(second), "orders.json") == b"x" * 640 + b"tail"
+
+def test_corrupt_chunk_is_detected(data_dir, small_chunks):
+    path = data_dir / "users.json"
+    write_json(str(path), USERS)
+    backup_id, _ = create_backup([str(path)], compress=False)
+    manifest = load_manifest(backup_id)
+    digest = manifest["files"]["users.json"]["chunks"][0][0]
+    stored, _ = backup_store._find_object(digest)
+    stored.write_bytes(b"garbage")
+    with pytest.raises(ValueError):
+        read_backup_file(manifest, "users.json")
+
+def test_pruning_keeps_chunks_of_kept_backups(data_dir, small_chunks):
+    path = data_dir / "orders.json"
+    for n in range(4):
+        path.write_bytes(json.dumps([make_order(i) for i in range(n + 1)]).encode())
+        create_backup([str(path)])
+    removed_backups, _ = prune_backups(keep_last=2, keep_daily=0)
+    kept = list_backups()
+    assert removed_backups == 2 and len(kept) == 2
+    for backup_id in kept:
+        data = json.loads(read_backup_file(load_manifest(backup_id), "orders.json"))
+        assert len(data) in (3, 4)
+
+def test_backup_and_restore_data(data_dir):
+    from utils.order_store import load_orders, replace_orders
+
+    write_json("data/users.json", USERS)
+    write_json("data/products.json", PRODUCTS)
+    replace_orders([make_order(1), make_order(2)])
+    backup_id = backup_data(prune=False)
+    assert backup_id is not None
+
+    write_json("data/users.json", [])
+    write_json("data/products.json", PRODUCTS[:1])
+    replace_orders([make_order(3)])
+
+    assert restore_data(backup_id)
+    assert read_json("data/users.json") == USERS
+    assert read_json("data/products.json") == PRODUCTS
+    assert [record["order"]["order_id"] for record in load_orders()] == ["order-1", "order-2"]
+
+def test_restore_of_a_missing_backup_fails(data_dir):
+    assert not restore_data("19990101_000000")
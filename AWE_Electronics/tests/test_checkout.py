@@ -0,0 +1,69 @@
+import pytest
+
+from controllers.order_controller import describe_shortages, place_order
+from models.catalogue import get_catalogue
+from models.invoice import Invoice
+from models.order import Order
+from models.receipt import Receipt
+
+SHIPPING = {"name": "Test Customer", "address": "1 Test St", "phone": "0400000000"}
+
+def make_order(*lines):
+    items = [{"product_id": product_id, "name": product_id, "price": 10.0, "quantity": quantity}
+             for product_id, quantity in lines]
+    order = Order("customer1", items, SHIPPING, "Credit Card")
+    invoice = Invoice(order)
+    return order, invoice, Receipt(invoice, "Credit Card")
+
+def stored_stock(storage):
+    return {product['product_id']: product['stock'] for product in storage.load_products()}
+
+def test_reservation_takes_every_line(storage):
+    assert get_catalogue().reserve_stock({"P001": 2, "P002": 2}) == (True, {"P001": 3, "P002": 0})
+    assert stored_stock(storage) == {"P001": 3, "P002": 0, "P003": 0}
+    catalogue = get_catalogue()
+    assert catalogue.get_product_by_id("P002").stock == 0
+    assert {p.product_id for p in catalogue.get_out_of_stock_products()} == {"P002", "P003"}
+
+def test_short_line_changes_nothing(storage):
+    reserved, shortages = get_catalogue().reserve_stock({"P001": 1, "P002": 3, "P003": 1})
+    assert not reserved
+    assert shortages == {"P002": 2, "P003": 0}
+    assert stored_stock(storage) == {"P001": 5, "P002": 2, "P003": 0}
+    assert get_catalogue().get_product_by_id("P001").stock == 5
+
+def test_shortages_are_described_by_name(storage):
+    _, shortages = get_catalogue().reserve_stock({"P002": 3, "P999": 1})
+    assert describe_shortages(shortages) == ["Mouse: only 2 available", "P999: only 0 available"]
+
+def test_place_order_saves_the_order(storage):
+    order, invoice, receipt = make_order(("P001", 1), ("P002", 1), ("P001", 1))
+    assert place_order(order, invoice, receipt) == (True, {})
+    assert stored_stock(storage)["P001"] == 3
+    assert stored_stock(storage)["P002"] == 1
+    saved = storage.get_user_orders("customer1")
+    assert [record["order"]["order_id"] for record in saved] == [order.order_id]
+
+def test_place_order_reports_shortages(storage):
+    order, invoice, receipt = make_order(("P001", 1), ("P002", 5))
+    assert place_order(order, invoice, receipt) == (False, {"P002": 2})
+    assert stored_stock(storage) == {"P001": 5, "P002": 2, "P003": 0}
+    assert storage.count_user_orders("customer1") == 0
+
+def test_failed_save_gives_the_stock_back(storage, monkeypatch):
+    monkeypatch.setattr(storage, "save_order", lambda record: False)
+    order, invoice, receipt = make_order(("P001", 2), ("P002", 1))
+    assert place_order(order, invoice, receipt) == (False, {})
+    assert stored_stock(storage) == {"P001": 5, "P002": 2, "P003": 0}
+    assert get_catalogue().get_product_by_id("P001").stock == 5
+
+def test_save_error_gives_the_stock_back(storage, monkeypatch):
+    def fail(record):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(storage, "save_order", fail)
+    order, invoice, receipt = make_order(("P001", 2))
+    with pytest.raises(OSError):
+        place_order(order, invoice, receipt)
+    assert stored_stock(storage)["P001"] == 5
+    assert get_catalogue().get_product_by_id("P001").stock == 5
@@ -0,0 +1,57 @@
+import pytest
+
+from models.catalogue import get_catalogue
+from models.columnar_catalogue import ColumnarCatalogue, get_columnar_catalogue
+from models.product import Product
+from utils.write_behind import flush_writes
+
+def assert_matches_reload(columns):
+    """The pushed-in columns answer like a catalogue freshly loaded from storage"""
+    flush_writes()
+    reloaded = ColumnarCatalogue()
+    assert columns.get_total_value() == pytest.approx(reloaded.get_total_value())
+    assert columns.get_category_totals() == pytest.approx(reloaded.get_category_totals())
+    assert columns.get_categories() == reloaded.get_categories()
+
+def test_loads_the_stored_products(storage):
+    columns = get_columnar_catalogue()
+    assert columns.get_total_value() == pytest.approx(1200.0 * 5 + 25.5 * 2)
+    assert columns.get_categories() == ["Accessories", "Computers"]
+    assert [p.product_id for p in columns.get_out_of_stock_products()] == ["P003"]
+
+def test_put_product_matches_reload(storage):
+    columns = get_columnar_catalogue()
+    catalogue = get_catalogue()
+    assert catalogue.add_product(Product("P004", "Monitor", 300.0, "Displays", 4))
+    assert catalogue.update_product("P002", Product("P002", "Mouse", 30.0, "Computers", 6))
+    assert get_columnar_catalogue() is columns and not columns.is_stale()
+    assert columns.get_total_value() == pytest.approx(6000.0 + 180.0 + 1200.0)
+    assert_matches_reload(columns)
+
+def test_stock_levels_match_reload(storage):
+    columns = get_columnar_catalogue()
+    catalogue = get_catalogue()
+    assert catalogue.update_stock("P003", 10) == 0
+    assert catalogue.reserve_stock({"P001": 2, "P002": 1}) == (True, {"P001": 3, "P002": 1})
+    assert catalogue.release_stock({"P001": 1}) == {"P001": 4}
+    assert get_columnar_catalogue() is columns and not columns.is_stale()
+    assert columns.get_total_value() == pytest.approx(1200.0 * 4 + 25.5 + 9.95 * 10)
+    assert_matches_reload(columns)
+
+def test_drop_product_matches_reload(storage):
+    columns = get_columnar_catalogue()
+    catalogue = get_catalogue()
+    assert catalogue.remove_product("P001")
+    assert catalogue.update_product("P002", Product("P005", "Mouse", 25.5, "Accessories", 2))
+    columns = get_columnar_catalogue()
+    assert columns.get_product_by_id("P001") is None
+    assert columns.get_categories() == ["Accessories"]
+    assert columns.get_total_value() == pytest.approx(51.0)
+    assert_matches_reload(columns)
+
+def test_outside_write_reloads(storage):
+    columns = get_columnar_catalogue()
+    # Written past the catalogues, as another process would
+    assert storage.update_stock("P001", 1) == 5
+    assert columns.is_stale()
+    assert get_columnar_catalogue().get_total_value() == pytest.approx(1200.0 + 51.0)
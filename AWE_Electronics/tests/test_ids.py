@@ -0,0 +1,88 @@
+import uuid
+from datetime import datetime, timedelta
+
+from utils.ids import (UNDATED_KEY, IdGenerator, document_number, id_counter, id_datetime,
+                       id_floor, id_timestamp_ms, is_time_ordered, new_id, sort_key,
+                       timestamp_ms)
+
+MS = 1_000_000  # nanoseconds
+
+def fixed_clock(*times_ms):
+    """A clock for IdGenerator returning the given milliseconds, then the last forever"""
+    times = list(times_ms)
+
+    def clock():
+        return (times.pop(0) if len(times) > 1 else times[0]) * MS
+    return clock
+
+def test_ids_increase():
+    ids = [new_id() for _ in range(5000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert all(is_time_ordered(record_id) for record_id in ids)
+
+def test_same_millisecond_takes_the_counter():
+    generator = IdGenerator(clock=fixed_clock(1_700_000_000_000))
+    ids = [generator.new_id() for _ in range(3)]
+    assert [id_counter(record_id) for record_id in ids] == [0, 1, 2]
+    assert {id_timestamp_ms(record_id) for record_id in ids} == {1_700_000_000_000}
+    assert ids == sorted(ids)
+
+def test_counter_overflow_carries_the_millisecond():
+    generator = IdGenerator(clock=fixed_clock(1_700_000_000_000))
+    ids = [generator.new_id() for _ in range(4097)]
+    assert ids == sorted(ids)
+    assert id_timestamp_ms(ids[-1]) == 1_700_000_000_001
+    assert id_counter(ids[-1]) == 0
+
+def test_clock_stepping_back_keeps_the_order():
+    generator = IdGenerator(clock=fixed_clock(2_000, 1_000, 1_500, 3_000))
+    ids = [generator.new_id() for _ in range(4)]
+    assert ids == sorted(ids)
+    assert [id_timestamp_ms(record_id) for record_id in ids] == [2_000, 2_000, 2_000, 3_000]
+
+def test_id_floor_separates_ids_by_time():
+    when = datetime(2026, 10, 18, 12, 30, 15, 250_000)
+    ms = timestamp_ms(when)
+    before = IdGenerator(clock=fixed_clock(ms - 1)).new_id()
+    at = IdGenerator(clock=fixed_clock(ms)).new_id()
+    after = IdGenerator(clock=fixed_clock(ms + 1)).new_id()
+    floor = id_floor(when)
+    assert before < floor <= at < after
+    assert id_floor(when.isoformat()) == floor
+    # Microseconds inside the same millisecond give the same floor
+    assert id_floor(when + timedelta(microseconds=999)) == floor
+
+def test_timestamps_round_trip():
+    when = datetime(2025, 5, 26, 9, 15, 0, 123_000)
+    record_id = IdGenerator(clock=fixed_clock(timestamp_ms(when))).new_id()
+    assert id_datetime(record_id) == when
+    assert uuid.UUID(record_id).version == 7
+
+def test_random_ids_carry_no_time():
+    record_id = str(uuid.uuid4())
+    assert not is_time_ordered(record_id)
+    assert id_timestamp_ms(record_id) is None
+    assert id_datetime(record_id) is None
+
+def test_sort_key_falls_back_to_dates():
+    record_id = new_id()
+    assert sort_key(record_id, "2000-01-01T00:00:00") == record_id
+    legacy = str(uuid.uuid4())
+    assert sort_key(legacy, "2025-05-26T10:00:00") == id_floor("2025-05-26T10:00:00")
+    assert sort_key(legacy, None, "not a date", "2025-05-27") == id_floor("2025-05-27")
+    assert sort_key(legacy) == UNDATED_KEY
+    assert sort_key(legacy, "", None) == UNDATED_KEY
+
+def test_undated_records_sort_first():
+    keys = [sort_key(str(uuid.uuid4())), sort_key(str(uuid.uuid4()), "1970-01-02"), new_id()]
+    assert sorted(keys) == keys
+    assert UNDATED_KEY < id_floor("1970-01-02")
+
+def test_document_numbers_sort_within_a_day():
+    start = timestamp_ms(datetime(2026, 10, 18, 0, 0, 1))
+    generator = IdGenerator(clock=fixed_clock(start, start, start + 5, start + 86_000_000))
+    numbers = [document_number(generator.new_id(), "INV") for _ in range(4)]
+    assert numbers == sorted(numbers)
+    assert len(set(numbers)) == 4
+    assert all(number.startswith("INV-20261018-") for number in numbers)
@@ -0,0 +1,81 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from utils.file_handler import dumps_json, iter_json_array
+
+RECORDS = [
+    {"order": {"order_id": "a1", "user_id": "zoë", "total": 12.5}, "note": "café ☕"},
+    {"order": {"order_id": "a2", "user_id": "ünïcode", "total": 3}},
+    {"receipt": {"payment_date": "2025-05-26T10:00:00"}},
+    {"order": {"order_id": "a4", "user_id": "日本", "total": -0.25}, "note": "x" * 300},
+]
+
+def write_records(path, fmt):
+    path.write_bytes(dumps_json(RECORDS, fmt))
+    return path
+
+@pytest.mark.parametrize("fmt", ["compact", "pretty", "gzip", "lzma"])
+def test_reads_every_format(tmp_path, fmt):
+    path = write_records(tmp_path / f"orders.{fmt}", fmt)
+    assert list(iter_json_array(str(path))) == RECORDS
+
+@pytest.mark.parametrize("fmt", ["compact", "pretty"])
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_offsets_count_bytes_of_non_ascii_text(tmp_path, fmt, chunk_size):
+    path = write_records(tmp_path / "orders.json", fmt)
+    raw = path.read_bytes()
+    found = list(iter_json_array(str(path), chunk_size=chunk_size, offsets=True))
+    assert [element for _, _, element in found] == RECORDS
+    for start, length, element in found:
+        assert json.loads(raw[start:start + length].decode('utf-8')) == element
+
+def test_offsets_need_plain_json(tmp_path):
+    path = write_records(tmp_path / "orders.json.gz", "gzip")
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(path), offsets=True))
+
+def test_projection_keeps_documents_without_the_fields(tmp_path):
+    path = write_records(tmp_path / "orders.json", "compact")
+    projected = list(iter_json_array(str(path), fields=["order.user_id", "order.total"]))
+    assert projected == [
+        {"order": {"user_id": "zoë", "total": 12.5}},
+        {"order": {"user_id": "ünïcode", "total": 3}},
+        {},
+        {"order": {"user_id": "日本", "total": -0.25}},
+    ]
+
+def test_projection_with_offsets_points_at_whole_documents(tmp_path):
+    path = write_records(tmp_path / "orders.json", "pretty")
+    raw = path.read_bytes()
+    found = list(iter_json_array(str(path), fields=["order.order_id"], chunk_size=5,
+                                 offsets=True))
+    assert [element for _, _, element in found] == [
+        {"order": {"order_id": "a1"}}, {"order": {"order_id": "a2"}}, {},
+        {"order": {"order_id": "a4"}}]
+    assert [json.loads(raw[start:start + length]) for start, length, _ in found] == RECORDS
+
+def test_numbers_split_across_chunks():
+    source = io.StringIO("[1, 22.5, -333, 4e2]")
+    assert list(iter_json_array(source, chunk_size=2)) == [1, 22.5, -333, 400.0]
+
+@pytest.mark.parametrize("text", ["", "[]", "  [ ]  "])
+def test_empty_arrays(text):
+    assert list(iter_json_array(io.StringIO(text))) == []
+
+def test_missing_file_yields_nothing(tmp_path):
+    assert list(iter_json_array(str(tmp_path / "missing.json"))) == []
+
+@pytest.mark.parametrize("text", ['{"a": 1}', "[1, 2", "[1 2]"])
+def test_malformed_arrays(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text)))
+
+def test_gzip_file_streams_in_chunks(tmp_path):
+    path = tmp_path / "big.json.gz"
+    records = [{"i": i, "name": f"prodüct {i}"} for i in range(2000)]
+    with gzip.open(path, 'wt', encoding='utf-8') as file:
+        json.dump(records, file, ensure_ascii=False)
+    assert list(iter_json_array(str(path), chunk_size=100)) == records
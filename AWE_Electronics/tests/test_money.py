@@ -0,0 +1,73 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+import pytest
+
+from utils.money import (Money, average_cents, cents_fields, items_total_cents, percent_of, stored_cents,
+                         sum_line_items, to_cents)
+
+@pytest.mark.parametrize("amount, cents", [
+    (0.0, 0),
+    (19.99, 1999),
+    (0.1 + 0.2, 30),
+    (1.005, 101),
+    (2.675, 268),
+    (0.125, 13),
+    (0.135, 14),
+    (0.115, 12),
+    (1.0049, 100),
+    (-1.005, -101),
+    (-0.125, -13),
+    (1e-9, 0),
+    (12345678.915, 1234567892),
+])
+def test_floats_round_half_up(amount, cents):
+    assert to_cents(amount) == cents
+
+@pytest.mark.parametrize("amount, cents", [
+    (5, 500),
+    (-3, -300),
+    ("10.005", 1001),
+    ("0.004", 0),
+    ("7", 700),
+    (Decimal("0.015"), 2),
+    (Money(1234), 1234),
+])
+def test_other_amount_types(amount, cents):
+    assert to_cents(amount) == cents
+
+def test_every_two_decimal_price_is_exact():
+    # The float fast path must agree with the exact cents of every price
+    for cents in range(0, 1_000_000, 7):
+        assert to_cents(cents / 100) == cents
+        assert to_cents(-cents / 100) == -cents
+
+def test_half_cents_match_decimal_rounding():
+    for tenth_cents in range(5, 200_000, 10):
+        amount = tenth_cents / 1000
+        expected = int((Decimal(str(amount)) * 100).quantize(Decimal(1), ROUND_HALF_UP))
+        assert to_cents(amount) == expected
+
+def test_percent_of_rounds_half_up():
+    assert percent_of(1999, 0.10) == 200
+    assert percent_of(1995, 0.10) == 200
+    assert percent_of(1994, 0.10) == 199
+    assert percent_of(1000, 0.075) == 75
+
+def test_average_cents_rounds_half_up():
+    assert average_cents(1000, 3) == 333
+    assert average_cents(1001, 2) == 501
+    assert average_cents(137600, 3) == 45867
+    assert average_cents(0, 0) == 0
+
+def test_line_items_sum_in_cents():
+    items = [{"price": 0.1, "quantity": 3}, {"price": 19.99, "quantity": 2}, {"price": 1.005}]
+    assert items_total_cents(items) == 30 + 3998
+    prices = [to_cents(0.01 * i) for i in range(1000)]
+    quantities = [i % 7 for i in range(1000)]
+    assert sum_line_items(prices, quantities) == sum(p * q for p, q in zip(prices, quantities))
+
+def test_stored_cents_reads_both_formats():
+    assert stored_cents({"total_cents": 1050, "total": 99.0}, "total") == 1050
+    assert stored_cents({"total": 10.505}, "total") == 1051
+    assert stored_cents({}, "total", default=None) is None
+    assert cents_fields({"total": 2.675, "order_id": "x"}) == {"total_cents": 268, "order_id": "x"}
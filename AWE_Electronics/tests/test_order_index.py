@@ -0,0 +1,86 @@
+import pytest
+
+from utils import order_store
+from utils.file_handler import write_json, loads_json, file_signature
+from utils.ids import new_id
+from utils.order_index import ORDER_INDEX_FILE, ORDER_INDEX_VERSION
+
+@pytest.fixture
+def orders(data_dir):
+    """Seven orders by ann and four by bob, interleaved, returns their ids oldest first"""
+    write_json(order_store.ORDER_FILE, [])
+    # The shared index may still describe another test's files
+    order_store._index.invalidate()
+    placed = []
+    for user_id in ["ann", "bob", "ann", "ann", "bob", "ann", "bob", "ann", "ann", "bob", "ann"]:
+        order_id = new_id()
+        assert order_store.save_order({"order": {"order_id": order_id, "user_id": user_id}})
+        placed.append((user_id, order_id))
+    yield placed
+    order_store._index.invalidate()
+
+def ids(records):
+    return [record["order"]["order_id"] for record in records]
+
+def newest_first(placed, user_id=None):
+    return [order_id for owner, order_id in reversed(placed) if user_id in (None, owner)]
+
+def pages(fetch, size):
+    """Every page of a listing, until the first empty one"""
+    result, start = [], 0
+    while True:
+        page = ids(fetch(start, size))
+        if not page:
+            return result
+        assert len(page) <= size
+        result.append(page)
+        start += size
+
+def assert_listings(placed):
+    ann = newest_first(placed, "ann")
+    assert order_store.count_user_orders("ann") == 7
+    assert order_store.count_user_orders("bob") == 4
+    assert order_store.count_user_orders("cat") == 0
+    assert order_store.count_orders() == 11
+    assert pages(lambda start, limit: order_store.user_orders("ann", start, limit), 3) == [
+        ann[0:3], ann[3:6], ann[6:7]]
+    assert ids(order_store.user_orders("ann", 6, 3)) == ann[6:]
+    assert ids(order_store.user_orders("ann", 7, 3)) == []
+    assert ids(order_store.user_orders("bob")) == newest_first(placed, "bob")
+    assert ids(order_store.user_orders("cat", 0, 3)) == []
+    everyone = newest_first(placed)
+    assert pages(order_store.recent_orders, 4) == [everyone[0:4], everyone[4:8], everyone[8:11]]
+
+def test_pages_from_the_journal(orders):
+    assert_listings(orders)
+
+def test_pages_across_snapshot_and_journal(orders):
+    assert order_store.compact_orders()
+    assert order_store.save_order({"order": {"order_id": new_id(), "user_id": "bob"}})
+    ann = newest_first(orders, "ann")
+    assert ids(order_store.user_orders("ann", 0, 3)) == ann[0:3]
+    assert order_store.count_user_orders("bob") == 5
+    assert ids(order_store.recent_orders(1, 3)) == newest_first(orders)[0:3]
+
+def test_pages_after_compaction(orders):
+    assert order_store.compact_orders()
+    assert_listings(orders)
+    with open(ORDER_INDEX_FILE, 'rb') as file:
+        assert loads_json(file.read())["version"] == ORDER_INDEX_VERSION
+
+def test_index_rebuilt_when_missing(orders, data_dir):
+    assert order_store.compact_orders()
+    (data_dir / "orders_by_user.idx").unlink()
+    order_store._index.invalidate()
+    assert_listings(orders)
+
+def test_index_of_an_old_version_rebuilt(orders):
+    assert order_store.compact_orders()
+    # Matches orders.json but was written by an older layout
+    signature = list(file_signature(order_store.ORDER_FILE))
+    write_json(ORDER_INDEX_FILE, {'version': ORDER_INDEX_VERSION - 1, 'snapshot': signature,
+                                  'users': {}, 'timeline': [[], []]}, fmt="marshal")
+    order_store._index.invalidate()
+    assert_listings(orders)
+    with open(ORDER_INDEX_FILE, 'rb') as file:
+        assert loads_json(file.read())["version"] == ORDER_INDEX_VERSION
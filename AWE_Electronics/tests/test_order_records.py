@@ -0,0 +1,106 @@
+import copy
+import json
+
+from utils.money import cents_fields
+from utils.order_records import (ORDER_RECORD_VERSION, compact_record, expand_invoice,
+                                 expand_receipt, expand_record, hydrate_record, pack_record,
+                                 record_version)
+
+ITEMS = [{"product_id": "P005", "name": "headphone", "price": 300.0, "quantity": 1},
+         {"product_id": "P008", "name": "Portable SSD", "price": 150.0, "quantity": 1}]
+SHIPPING = {"name": "saqib", "address": "kelebek", "phone": "0456039986"}
+DATE = "2025-06-05T20:47:35.933257"
+
+# A version 1 record as older releases saved it, money in float dollars
+V1_RECORD = {
+    "order": {"order_id": "5ec10927-3dc2-4159-b84d-67d75430177b", "user_id": "saqib6",
+              "items": ITEMS, "shipping": SHIPPING, "payment_method": "Credit Card - saqib",
+              "total": 450.0, "order_date": DATE, "status": "Confirmed"},
+    "invoice": {"invoice_id": "e40240a4-1335-48c4-bc4b-7dc37e3e34de",
+                "order_id": "5ec10927-3dc2-4159-b84d-67d75430177b", "user_id": "saqib6",
+                "amount": 450.0, "subtotal": 450.0, "tax_amount": 0.0, "total_amount": 450.0,
+                "invoice_date": DATE, "due_date": DATE, "status": "Generated",
+                "items": ITEMS, "shipping_info": SHIPPING},
+    "receipt": {"receipt_id": "8b177ce4-7728-4be0-825b-af0b660e48ed",
+                "invoice_id": "e40240a4-1335-48c4-bc4b-7dc37e3e34de",
+                "order_id": "5ec10927-3dc2-4159-b84d-67d75430177b", "user_id": "saqib6",
+                "payment_method": "Credit Card - saqib", "amount_paid": 450.0,
+                "payment_date": DATE, "status": "Paid",
+                "transaction_reference": "TXN-202506052047-8B177C", "items": ITEMS,
+                "subtotal": 450.0, "tax_amount": 0.0, "total_amount": 450.0,
+                "shipping_info": SHIPPING},
+}
+
+def in_cents(record):
+    """The v1 record with its float amounts as cents, which is what v2 stores"""
+    return {name: cents_fields(document) for name, document in record.items()}
+
+def test_v1_record_survives_compacting():
+    record = copy.deepcopy(V1_RECORD)
+    packed = compact_record(record)
+    assert record == V1_RECORD
+    assert record_version(packed) == ORDER_RECORD_VERSION
+    # Only what cannot be derived from the order is kept
+    assert "items" not in packed["invoice"] and "items" not in packed["receipt"]
+    assert len(json.dumps(packed)) < len(json.dumps(V1_RECORD))
+    assert expand_record(packed) == in_cents(V1_RECORD)
+
+def test_fresh_documents_survive_packing():
+    from models.invoice import Invoice
+    from models.order import Order
+    from models.receipt import Receipt
+
+    order = Order("customer1", copy.deepcopy(ITEMS), SHIPPING, "PayPal")
+    invoice = Invoice(order)
+    receipt = Receipt(invoice, "PayPal")
+    packed = pack_record(order.to_dict(), invoice.to_dict(), receipt.to_dict())
+    packed = json.loads(json.dumps(packed))
+    assert expand_invoice(packed) == invoice.to_dict()
+    assert expand_receipt(packed) == receipt.to_dict()
+
+    hydrated = hydrate_record(packed)
+    assert [document.to_dict() for document in hydrated] == [
+        order.to_dict(), invoice.to_dict(), receipt.to_dict()]
+
+def test_hydrating_either_version_gives_the_same_objects():
+    v1 = [document.to_dict() for document in hydrate_record(V1_RECORD)]
+    v2 = [document.to_dict() for document in hydrate_record(compact_record(V1_RECORD))]
+    assert v1 == v2
+
+def test_differing_fields_are_kept_in_the_delta():
+    record = copy.deepcopy(V1_RECORD)
+    record["invoice"]["tax_amount"] = 45.0
+    record["invoice"]["total_amount"] = 495.0
+    record["receipt"]["shipping_info"] = {"name": "someone else"}
+    packed = compact_record(record)
+    assert packed["invoice"]["tax_amount_cents"] == 4500
+    assert expand_record(packed) == in_cents(record)
+
+def test_records_missing_derivable_fields_stay_v1():
+    record = copy.deepcopy(V1_RECORD)
+    del record["receipt"]["items"]
+    assert compact_record(record) is record
+
+def test_v2_records_are_left_alone():
+    packed = compact_record(V1_RECORD)
+    assert compact_record(packed) is packed
+    assert expand_record(V1_RECORD) is V1_RECORD
+
+def test_migration_converts_only_v1_records(data_dir):
+    from utils.file_handler import read_json, write_json
+    from utils import order_store
+
+    packed = compact_record(V1_RECORD)
+    legacy = copy.deepcopy(V1_RECORD)
+    legacy["order"]["order_id"] = legacy["invoice"]["order_id"] = "legacy-order"
+    legacy["receipt"]["order_id"] = "legacy-order"
+    write_json(order_store.ORDER_FILE, [packed, legacy])
+
+    assert order_store.migrate_order_records() == (1, 2)
+    stored = read_json(order_store.ORDER_FILE)
+    assert stored[0] == packed
+    assert stored[1] == compact_record(legacy)
+
+    before = open(order_store.ORDER_FILE, 'rb').read()
+    assert order_store.migrate_order_records() == (0, 2)
+    assert open(order_store.ORDER_FILE, 'rb').read() == before
@@ -0,0 +1,74 @@
+from models.invoice import Invoice
+from models.order import Order
+from models.receipt import Receipt
+from utils import order_store
+from utils.order_records import pack_record
+from utils.sales_aggregates import empty_aggregates, apply_order, build_aggregates, top_products
+
+SHIPPING = {"name": "Test Customer", "address": "1 Test St", "phone": "0400000000"}
+
+ORDERS = [
+    [("P001", "Laptop", 1200.0, 1), ("P002", "Mouse", 25.5, 2)],
+    [("P002", "Mouse", 25.5, 1), ("P003", "Cable", 9.95, 3)],
+    [("P003", "Cable", 9.95, 7)],
+]
+
+def make_record(lines, user_id="customer1"):
+    items = [{"product_id": product_id, "name": name, "price": price, "quantity": quantity}
+             for product_id, name, price, quantity in lines]
+    order = Order(user_id, items, SHIPPING, "Credit Card")
+    invoice = Invoice(order)
+    receipt = Receipt(invoice, "Credit Card")
+    return pack_record(order.to_dict(), invoice.to_dict(), receipt.to_dict())
+
+def totals(aggregates):
+    """Everything but the timestamp of the last change"""
+    return {key: value for key, value in aggregates.items() if key != "updated"}
+
+def test_incremental_matches_build():
+    records = [make_record(lines) for lines in ORDERS]
+    aggregates = empty_aggregates()
+    for record in records:
+        apply_order(aggregates, record)
+    assert totals(aggregates) == totals(build_aggregates(records))
+    assert aggregates["order_count"] == 3
+    assert aggregates["items_sold"] == 14
+    # 1200 + 2 * 25.50 + 25.50 + 3 * 9.95 + 7 * 9.95, exactly
+    assert aggregates["total_revenue_cents"] == 137600
+    assert [product_id for product_id, _ in top_products(aggregates, 2)] == ["P001", "P003"]
+
+def test_orders_then_rebuild_match(storage):
+    for lines in ORDERS:
+        assert storage.save_order(make_record(lines))
+    incremental = storage.sales_aggregates()
+    assert incremental["order_count"] == 3
+    assert totals(storage.rebuild_sales_aggregates()) == totals(incremental)
+
+def test_batched_orders_then_rebuild_match(storage):
+    futures = [storage.save_order(make_record(lines), wait=False) for lines in ORDERS * 4]
+    assert all(future.result() for future in futures)
+    incremental = storage.sales_aggregates()
+    assert incremental["order_count"] == 12
+    assert totals(storage.rebuild_sales_aggregates()) == totals(incremental)
+
+def test_orders_stored_elsewhere_are_counted(storage):
+    assert storage.save_order(make_record(ORDERS[0]))
+    storage.sales_aggregates()
+    # Written past the aggregates, as another process or a restore would
+    assert order_store.save_order(make_record(ORDERS[1]))
+    aggregates = storage.sales_aggregates()
+    assert aggregates["order_count"] == 2
+    assert totals(aggregates) == totals(storage.rebuild_sales_aggregates())
+
+def test_saved_aggregates_are_reused(storage, monkeypatch):
+    import utils.storage as storage_module
+    for lines in ORDERS:
+        assert storage.save_order(make_record(lines))
+    saved = storage.sales_aggregates()
+    storage_module.reset_storage()
+
+    def rebuild(records):
+        raise AssertionError("aggregates rebuilt although their orders_tag matched")
+
+    monkeypatch.setattr(storage_module, "build_aggregates", rebuild)
+    assert totals(storage_module.get_storage().sales_aggregates()) == totals(saved)
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from models.catalogue import get_catalogue, reset_catalogue
+from models.columnar_catalogue import get_columnar_catalogue, reset_columnar_catalogue
+from utils import storage as storage_module
+from utils.storage import SqliteStorage
+
+from conftest import PRODUCTS
+
+@pytest.fixture
+def sqlite_storage(data_dir, monkeypatch):
+    """The shared storage on a SQLite database holding PRODUCTS"""
+    def reset():
+        storage_module.reset_storage()
+        reset_catalogue()
+        reset_columnar_catalogue()
+
+    monkeypatch.setattr(storage_module, "STORAGE_BACKEND", "sqlite")
+    reset()
+    storage = storage_module.get_storage()
+    for product in PRODUCTS:
+        assert storage.add_product(product)
+    yield storage
+    reset()
+
+def in_thread(function):
+    """Call function on a new thread (so on its own connection), returns its result"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+def test_threads_agree_on_the_version(sqlite_storage):
+    version = sqlite_storage.products_version()
+    assert in_thread(sqlite_storage.products_version) == version
+    assert in_thread(lambda: sqlite_storage.update_stock("P001", 4)) == 5
+    assert sqlite_storage.products_version() != version
+    assert sqlite_storage.products_version() == in_thread(sqlite_storage.products_version)
+
+def test_other_connections_change_the_version(sqlite_storage):
+    version = sqlite_storage.products_version()
+    # Another process, on its own connection
+    assert SqliteStorage().update_stock("P002", 9) == 2
+    assert sqlite_storage.products_version() != version
+
+def test_writes_report_consecutive_versions(sqlite_storage):
+    reported = []
+    version = sqlite_storage.products_version()
+    sqlite_storage.update_stock("P001", 3, on_version=lambda *pair: reported.append(pair))
+    assert sqlite_storage.reserve_stock({"P001": 1, "P002": 1},
+                                        on_version=lambda *pair: reported.append(pair))[0]
+    assert reported[0][0] == version
+    assert reported[1][0] == reported[0][1]
+    assert reported[1][1] == sqlite_storage.products_version()
+
+def test_failed_reservation_keeps_the_version(sqlite_storage):
+    version = sqlite_storage.products_version()
+    assert sqlite_storage.reserve_stock({"P001": 1, "P003": 1}) == (False, {"P003": 0})
+    assert sqlite_storage.products_version() == version
+
+def test_catalogues_stay_current_across_threads(sqlite_storage):
+    catalogue = get_catalogue()
+    columns = get_columnar_catalogue()
+    assert in_thread(lambda: catalogue.reserve_stock({"P001": 2})) == (True, {"P001": 3})
+    assert not catalogue.is_stale() and not columns.is_stale()
+    assert in_thread(lambda: not catalogue.is_stale() and not columns.is_stale())
+    # A write made past the catalogues is still noticed
+    assert sqlite_storage.update_stock("P002", 7) == 2
+    assert catalogue.is_stale() and columns.is_stale()
+    assert get_columnar_catalogue().get_total_value() == pytest.approx(1200.0 * 3 + 25.5 * 7)
@@ -0,0 +1,85 @@
+import pytest
+
+from utils import stats
+from utils.file_handler import read_json, write_json
+from utils.locks import file_lock
+from utils.stats import StatsRegistry, stock_change, role_change
+
+from conftest import PRODUCTS
+
+USERS = [
+    {"username": "admin", "role": "admin"},
+    {"username": "ann", "role": "customer"},
+    {"username": "bob", "role": "customer"},
+]
+
+@pytest.fixture
+def recounts(monkeypatch):
+    """Record the sections recounted from their files"""
+    counted = []
+    for name, count in list(stats._COUNTERS.items()):
+        def counter(filename, name=name, count=count):
+            counted.append(name)
+            return count(filename)
+        monkeypatch.setitem(stats._COUNTERS, name, counter)
+    return counted
+
+@pytest.fixture
+def registry(data_dir):
+    write_json("data/products.json", PRODUCTS)
+    write_json("data/users.json", USERS)
+    return StatsRegistry({"products": "data/products.json", "users": "data/users.json"})
+
+def tracked_write(registry, name, data, change):
+    filename = registry.files[name]
+    with file_lock(filename), registry.tracking(name):
+        write_json(filename, data)
+        registry.note(name, change)
+
+def test_counts(registry):
+    assert registry.counts("products") == {"total": 3, "low_stock": 2, "out_of_stock": 1}
+    assert registry.counts("users") == {"total": 3, "admin": 1, "customers": 2}
+
+def test_tracked_write_updates_in_place(registry, recounts):
+    registry.counts("products")
+    products = PRODUCTS + [{"product_id": "P004", "name": "Monitor", "stock": 20}]
+    tracked_write(registry, "products", products, stock_change(None, 20))
+    assert registry.counts("products") == {"total": 4, "low_stock": 2, "out_of_stock": 1}
+    assert recounts == ["products"]
+
+def test_write_outside_tracking_recounts(registry, recounts):
+    registry.counts("products")
+    write_json("data/products.json", PRODUCTS[:1])
+    assert registry.counts("products") == {"total": 1, "low_stock": 1, "out_of_stock": 0}
+    assert recounts == ["products", "products"]
+
+def test_note_outside_tracking_recounts(registry, recounts):
+    registry.counts("users")
+    users = USERS + [{"username": "cat", "role": "admin"}]
+    write_json("data/users.json", users)
+    registry.note("users", role_change(None, "admin"))
+    assert registry.counts("users") == {"total": 4, "admin": 2, "customers": 2}
+    assert recounts == ["users", "users"]
+
+def test_counters_behind_when_tracking_recount(registry, recounts):
+    registry.counts("products")
+    write_json("data/products.json", PRODUCTS[:2])
+    # Applying this change to counters that missed the write above would be wrong
+    tracked_write(registry, "products", PRODUCTS[:1], stock_change(2, None))
+    assert registry.counts("products") == {"total": 1, "low_stock": 1, "out_of_stock": 0}
+    assert recounts == ["products", "products"]
+
+def test_saved_counters_survive_a_restart(registry, recounts):
+    registry.counts("products")
+    restarted = StatsRegistry(registry.files)
+    assert restarted.counts("products") == {"total": 3, "low_stock": 2, "out_of_stock": 1}
+    assert recounts == ["products"]
+    assert "products" in read_json("data/stats.json")
+
+def test_storage_writes_keep_counters_current(storage, recounts):
+    storage.data_stats()
+    assert storage.update_stock("P003", 50) == 0
+    assert storage.delete_product("P002")
+    report = storage.data_stats()["products"]
+    assert report == {"total": 2, "in_stock": 2, "low_stock": 1, "out_of_stock": 0}
+    assert recounts.count("products") == 1
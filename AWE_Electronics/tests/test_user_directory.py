@@ -0,0 +1,82 @@
+import pytest
+
+from utils.file_handler import file_signature, write_json
+
+USERS = [
+    {"username": "admin1", "password": "adminpass", "email": "Admin@Example.com", "role": "admin"},
+    {"username": "ann", "password": "annpass", "email": "shared@example.com", "role": "customer"},
+    {"username": "bob", "password": "bobpass", "email": "SHARED@example.com", "role": "customer"},
+]
+
+@pytest.fixture
+def users(storage):
+    """The storage fixture with USERS saved, older data may repeat an email"""
+    write_json("data/users.json", USERS)
+    return storage
+
+def test_lookups(users):
+    directory = users.users
+    assert len(directory) == 3
+    assert directory.username_exists("ann") and not directory.username_exists("Ann")
+    assert directory.email_exists(" admin@EXAMPLE.com ")
+    assert directory.username_for_email("shared@example.com") == "ann"
+    assert directory.get_user("bob")["email"] == "SHARED@example.com"
+    assert directory.authenticate("ann", "annpass")["username"] == "ann"
+    assert directory.authenticate("ann", "wrong") is None
+    assert directory.authenticate("nobody", "annpass") is None
+
+def test_returned_records_are_copies(users):
+    users.users.get_user("ann")["email"] = "changed@example.com"
+    assert users.users.get_user("ann")["email"] == "shared@example.com"
+
+def test_outside_writes_rebuild_the_index(users):
+    directory = users.users
+    assert directory.email_exists("admin@example.com")
+    write_json("data/users.json", USERS[:1] + [dict(USERS[1], email="moved@example.com")])
+    assert len(directory) == 2
+    assert directory.email_exists("moved@example.com")
+    assert not directory.email_exists("shared@example.com")
+    assert not directory.username_exists("bob")
+
+def test_own_writes_update_the_index_in_place(users):
+    directory = users.users
+    len(directory)
+    assert users.add_user({"username": "cara", "password": "x", "email": "Cara@example.com",
+                           "role": "customer"})
+    # Still in step with the file, so the next lookup does not rebuild
+    assert directory._signature == file_signature("data/users.json")
+    assert directory.username_for_email("cara@example.com") == "cara"
+    assert not users.add_user({"username": "cara", "password": "y", "role": "customer"})
+
+def test_changed_email_frees_the_old_address(users):
+    directory = users.users
+    assert users.update_user(dict(USERS[0], email="root@example.com"))
+    assert not directory.email_exists("admin@example.com")
+    assert directory.username_for_email("ROOT@example.com") == "admin1"
+
+def test_unchanged_email_stays_indexed(users):
+    assert users.update_user(dict(USERS[0], role="customer"))
+    assert users.users.username_for_email("admin@example.com") == "admin1"
+
+def test_shared_address_passes_to_the_other_user(users):
+    directory = users.users
+    assert users.update_user(dict(USERS[1], email="ann@example.com"))
+    assert directory.username_for_email("shared@example.com") == "bob"
+    assert directory.username_for_email("ann@example.com") == "ann"
+
+def test_other_holder_changing_email_keeps_the_owner(users):
+    directory = users.users
+    assert users.update_user(dict(USERS[2], email="bob@example.com"))
+    assert directory.username_for_email("shared@example.com") == "ann"
+    assert users.update_user(dict(USERS[1], email="ann@example.com"))
+    assert not directory.email_exists("shared@example.com")
+
+def test_index_matches_a_rebuild_after_writes(users):
+    directory = users.users
+    users.update_user(dict(USERS[1], email="ann@example.com"))
+    users.add_user({"username": "dan", "password": "x", "email": "shared@example.com",
+                    "role": "customer"})
+    incremental = dict(directory._by_email)
+    directory.invalidate()
+    len(directory)
+    assert directory._by_email == incremental
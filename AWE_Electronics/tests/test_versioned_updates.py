@@ -0,0 +1,132 @@
+import threading
+
+from utils.file_handler import (apply_updates, get_update_stats, read_json, read_version,
+                                update_json)
+
+def increment(key, by=1):
+    """A mutate for update_json that adds to a counter in a dict document"""
+    def mutate(data):
+        data[key] = data.get(key, 0) + by
+        return True, data[key]
+    return mutate
+
+def stats_delta(before):
+    after = get_update_stats()
+    return {name: after[name] - before[name] for name in after}
+
+def test_commit_bumps_version(tmp_path):
+    path = str(tmp_path / "doc.json")
+    assert read_version(path) == 0
+    assert update_json(path, lambda data: (True, data.append(1))) == (True, None)
+    assert update_json(path, lambda data: (True, data.append(2))) == (True, None)
+    assert read_json(path) == [1, 2]
+    assert read_version(path) == 2
+
+def test_unchanged_document_is_not_written(tmp_path):
+    path = str(tmp_path / "doc.json")
+    committed = []
+    ok, result = update_json(path, lambda data: (False, "nothing"),
+                             on_commit=lambda data, result: committed.append(result))
+    assert (ok, result) == (True, "nothing")
+    assert committed == []
+    assert read_version(path) == 0
+    assert not (tmp_path / "doc.json").exists()
+
+def test_conflict_is_retried_under_the_lock(tmp_path):
+    path = str(tmp_path / "doc.json")
+    update_json(path, lambda data: (True, data.append({})))
+    attempts = []
+    committed = []
+
+    def mutate(data):
+        attempts.append(list(data))
+        if len(attempts) == 1:
+            # Someone else commits between our read and our write
+            update_json(path, lambda other: (True, other.append("theirs")))
+        data.append("ours")
+        return True, len(attempts)
+
+    before = get_update_stats()
+    ok, result = update_json(path, mutate, on_commit=lambda data, result: committed.append(list(data)))
+    assert (ok, result) == (True, 2)
+    assert attempts == [[{}], [{}, "theirs"]]
+    assert read_json(path) == [{}, "theirs", "ours"]
+    assert committed == [[{}, "theirs", "ours"]]
+    assert read_version(path) == 3
+    delta = stats_delta(before)
+    assert delta["conflicts"] == 1
+    assert delta["locked"] == 1
+
+def test_no_retries_goes_straight_to_the_lock(tmp_path):
+    path = str(tmp_path / "doc.json")
+    before = get_update_stats()
+    update_json(path, lambda data: (True, data.append(1)), retries=0)
+    delta = stats_delta(before)
+    assert (delta["conflicts"], delta["locked"], delta["commits"]) == (0, 1, 1)
+
+def test_concurrent_writers_lose_no_update(tmp_path):
+    path = str(tmp_path / "counter.json")
+    update_json(path, lambda data: (True, None))
+
+    def worker():
+        for _ in range(25):
+            update_json(path, lambda data: (True, data.append(1)))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(read_json(path)) == 100
+    assert read_version(path) == 101
+
+def test_apply_updates_commits_once(tmp_path):
+    path = str(tmp_path / "doc.json")
+    update_json(path, lambda data: (True, data.append({})))
+    committed = []
+    results = apply_updates(path, [
+        (lambda data: increment("a")(data[0]), lambda data, result: committed.append(("a", result))),
+        (lambda data: increment("b", 5)(data[0]), lambda data, result: committed.append(("b", result))),
+    ])
+    assert results == [(True, 1), (True, 5)]
+    assert committed == [("a", 1), ("b", 5)]
+    assert read_json(path) == [{"a": 1, "b": 5}]
+    assert read_version(path) == 2
+
+def test_apply_updates_reports_a_failed_mutation(tmp_path):
+    path = str(tmp_path / "doc.json")
+    update_json(path, lambda data: (True, data.append({})))
+    committed = []
+
+    def fail(data):
+        raise ValueError("not enough stock")
+
+    results = apply_updates(path, [
+        (fail, lambda data, result: committed.append("fail")),
+        (lambda data: increment("a")(data[0]), lambda data, result: committed.append("a")),
+    ])
+    assert isinstance(results[0], ValueError)
+    assert results[1] == (True, 1)
+    assert committed == ["a"]
+    assert read_json(path) == [{"a": 1}]
+
+def test_apply_updates_without_changes_keeps_the_version(tmp_path):
+    path = str(tmp_path / "doc.json")
+    update_json(path, lambda data: (True, data.append({})))
+    assert apply_updates(path, [(lambda data: (False, "same"), None)]) == [(True, "same")]
+    assert read_version(path) == 1
+
+def test_apply_updates_conflicts_with_an_optimistic_update(tmp_path):
+    path = str(tmp_path / "doc.json")
+    update_json(path, lambda data: (True, data.append({})))
+    calls = []
+
+    def mutate(data):
+        calls.append(dict(data[0]))
+        if len(calls) == 1:
+            apply_updates(path, [(lambda other: increment("batch")(other[0]), None)])
+        return increment("single")(data[0])
+
+    assert update_json(path, mutate) == (True, 1)
+    assert calls == [{}, {"batch": 1}]
+    assert read_json(path) == [{"batch": 1, "single": 1}]
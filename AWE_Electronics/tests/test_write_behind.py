@@ -0,0 +1,141 @@
+import threading
+
+import pytest
+
+from utils import write_behind
+from utils.write_behind import WriteBehindQueue, chain, completed
+
+class Recorder:
+    """A commit callback that records each group and can be held back"""
+
+    def __init__(self, fail=None):
+        self.groups = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+
+    def __call__(self, ops):
+        self.started.set()
+        self.release.wait(5)
+        self.groups.append(list(ops))
+        if self.fail is not None:
+            raise self.fail
+        return [op * 10 if op >= 0 else ValueError(f"bad op {op}") for op in ops]
+
+def test_ops_queued_while_busy_share_one_write():
+    queue = WriteBehindQueue()
+    commit = Recorder()
+    commit.release.clear()
+    first = queue.submit("a", 1, commit)
+    assert commit.started.wait(5)
+    # The writer is held inside the first write, these pile up behind it
+    futures = [queue.submit("a", n, commit) for n in (2, 3, 4)]
+    commit.release.set()
+    assert first.result(5) == 10
+    assert [future.result(5) for future in futures] == [20, 30, 40]
+    assert commit.groups == [[1], [2, 3, 4]]
+    assert queue.stats() == {"mutations": 4, "batches": 2, "writes": 2}
+    queue.close()
+
+def test_targets_get_their_own_commit():
+    queue = WriteBehindQueue()
+    hold, first_commit, second_commit = Recorder(), Recorder(), Recorder()
+    hold.release.clear()
+    queue.submit("hold", 0, hold)
+    assert hold.started.wait(5)
+    futures = [queue.submit("a", 1, first_commit), queue.submit("b", 2, second_commit),
+               queue.submit("a", 3, first_commit)]
+    hold.release.set()
+    assert [future.result(5) for future in futures] == [10, 20, 30]
+    assert first_commit.groups == [[1, 3]]
+    assert second_commit.groups == [[2]]
+    queue.close()
+
+def test_each_future_gets_its_own_result_or_exception():
+    queue = WriteBehindQueue()
+    commit = Recorder()
+    commit.release.clear()
+    queue.submit("a", 0, commit)
+    assert commit.started.wait(5)
+    good, bad = queue.submit("a", 1, commit), queue.submit("a", -1, commit)
+    commit.release.set()
+    assert good.result(5) == 10
+    with pytest.raises(ValueError):
+        bad.result(5)
+    queue.close()
+
+def test_a_failed_commit_fails_every_op_of_the_group():
+    queue = WriteBehindQueue()
+    commit = Recorder(fail=OSError("disk full"))
+    futures = [queue.submit("a", n, commit) for n in range(3)]
+    for future in futures:
+        with pytest.raises(OSError):
+            future.result(5)
+    # The writer carries on after a failure
+    assert queue.submit("a", 5, Recorder()).result(5) == 50
+    queue.close()
+
+def test_flush_waits_for_everything_queued():
+    queue = WriteBehindQueue()
+    commit = Recorder()
+    commit.release.clear()
+    futures = [queue.submit("a", n, commit) for n in range(5)]
+    assert not queue.flush(timeout=0.05)
+    commit.release.set()
+    assert queue.flush(timeout=5)
+    assert all(future.done() for future in futures)
+    assert sum(len(group) for group in commit.groups) == 5
+    queue.close()
+
+def test_close_writes_what_is_queued_then_writes_directly():
+    queue = WriteBehindQueue()
+    commit = Recorder()
+    commit.release.clear()
+    futures = [queue.submit("a", n, commit) for n in range(3)]
+    threading.Timer(0.05, commit.release.set).start()
+    assert queue.close(timeout=5)
+    assert all(future.done() for future in futures)
+    assert not queue._thread.is_alive()
+    # Closed: committed on the caller's thread, already done when returned
+    late = queue.submit("a", 7, commit)
+    assert late.done() and late.result() == 70
+
+def test_commit_callback_can_submit_without_deadlock():
+    queue = WriteBehindQueue()
+    inner = Recorder()
+
+    def commit(ops):
+        nested = queue.submit("b", 1, inner)
+        return [nested.result(1) + op for op in ops]
+
+    assert queue.submit("a", 1, commit).result(5) == 11
+    queue.close()
+
+def test_shutdown_writes_flushes_the_shared_queue(monkeypatch):
+    monkeypatch.setattr(write_behind, "_queue", None)
+    commit = Recorder()
+    commit.release.clear()
+    queue = write_behind.get_write_queue()
+    futures = [queue.submit("a", n, commit) for n in range(3)]
+    threading.Timer(0.05, commit.release.set).start()
+    assert write_behind.shutdown_writes(timeout=5)
+    assert [future.result(0) for future in futures] == [0, 10, 20]
+    assert write_behind._queue is None
+    assert write_behind.flush_writes() is True
+
+def test_completed_and_chain():
+    assert completed(3).result(0) == 3
+    assert chain(completed(3), lambda value: value + 1).result(0) == 4
+    failed = chain(completed(0), lambda value: 1 / value)
+    with pytest.raises(ZeroDivisionError):
+        failed.result(0)
+
+def test_closing_storage_writes_queued_stock(storage):
+    from utils.storage import reset_storage
+    from utils.file_handler import read_json
+
+    written = storage.update_stock("P001", 42, wait=False)
+    reset_storage()
+    assert written.done()
+    assert {p['product_id']: p['stock'] for p in read_json("data/products.json")}["P001"] == 42
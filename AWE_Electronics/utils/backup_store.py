@@ -0,0 +1,252 @@
+import hashlib
+import lzma
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from utils.file_handler import read_json, write_json, file_signature, BACKUP_DIR
+from utils.locks import file_lock
+
+# Backups are content addressed: each data file is cut into fixed-size
+# chunks, every chunk is stored once under objects/ named by its SHA-256,
+# and a small manifest per backup lists the chunks of each file. Order
+# history only grows at the end, so a new backup of a large orders.json
+# adds just its last chunk or two.
+OBJECT_DIR = f"{BACKUP_DIR}/objects"
+MANIFEST_DIR = f"{BACKUP_DIR}/manifests"
+BACKUP_CHUNK_BYTES = 1024 * 1024
+
+# New chunks are stored lzma-compressed when that makes them smaller.
+# Preset 1 compresses at tens of MB/s, the higher presets save little more
+# on JSON and are many times slower.
+BACKUP_LZMA_PRESET = 1
+
+# Retention: the newest BACKUP_KEEP_LAST backups, plus the newest backup of
+# each of the last BACKUP_KEEP_DAILY days
+BACKUP_KEEP_LAST = 10
+BACKUP_KEEP_DAILY = 7
+
+BACKUP_ID_FORMAT = "%Y%m%d_%H%M%S"
+
+def _object_path(digest, compressed):
+    """Where a chunk is stored: objects/ab/abcd...[.xz]"""
+    name = digest + (".xz" if compressed else "")
+    return Path(OBJECT_DIR) / digest[:2] / name
+
+def _find_object(digest):
+    """Get (path, compressed) of a stored chunk, or None if it is missing"""
+    for compressed in (True, False):
+        path = _object_path(digest, compressed)
+        if path.exists():
+            return path, compressed
+    return None
+
+def _write_file(path, payload):
+    """Write bytes durably via a temporary file and an atomic rename"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, 'wb') as file:
+            file.write(payload)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+def _store_chunk(chunk, compress):
+    """Store a chunk unless it is already there, returns (digest, bytes written)"""
+    digest = hashlib.sha256(chunk).hexdigest()
+    if _find_object(digest) is not None:
+        return digest, 0
+    payload = chunk
+    if compress:
+        packed = lzma.compress(chunk, preset=BACKUP_LZMA_PRESET)
+        if len(packed) < len(chunk):
+            payload = packed
+    _write_file(_object_path(digest, payload is not chunk), payload)
+    return digest, len(payload)
+
+def _read_chunk(digest):
+    """Load a chunk and check it against its digest"""
+    found = _find_object(digest)
+    if found is None:
+        raise FileNotFoundError(f"Backup chunk {digest} is missing")
+    path, compressed = found
+    payload = path.read_bytes()
+    chunk = lzma.decompress(payload) if compressed else payload
+    if hashlib.sha256(chunk).hexdigest() != digest:
+        raise ValueError(f"Backup chunk {digest} is corrupt")
+    return chunk
+
+def _manifest_path(backup_id):
+    return Path(MANIFEST_DIR) / f"{backup_id}.json"
+
+def list_backups():
+    """IDs of all stored backups, oldest first"""
+    manifest_dir = Path(MANIFEST_DIR)
+    if not manifest_dir.exists():
+        return []
+    return sorted(path.stem for path in manifest_dir.glob("*.json"))
+
+def load_manifest(backup_id):
+    """Get a backup's manifest, or None if there is no such backup"""
+    path = _manifest_path(backup_id)
+    if not path.exists():
+        return None
+    return read_json(path)
+
+def _new_backup_id():
+    """Timestamp ID for a new backup, made unique within the second"""
+    base = datetime.now().strftime(BACKUP_ID_FORMAT)
+    backup_id, n = base, 1
+    while _manifest_path(backup_id).exists():
+        n += 1
+        backup_id = f"{base}_{n}"
+    return backup_id
+
+def _chunks_present(entry):
+    return all(_find_object(digest) is not None for digest, _ in entry.get('chunks', []))
+
+def _snapshot_file(path, previous, compress, stats):
+    """Build the manifest entry of one data file
+
+    A file whose signature matches the previous backup is not read at all.
+    Otherwise the open handle is read chunk by chunk, so a writer
+    replacing the file meanwhile cannot mix two versions into the backup.
+    """
+    if previous is not None and _chunks_present(previous):
+        try:
+            if list(file_signature(path)) == previous.get('signature'):
+                stats['unchanged_files'] += 1
+                return previous
+        except FileNotFoundError:
+            return None
+    try:
+        source = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    with source:
+        st = os.fstat(source.fileno())
+        chunks = []
+        whole = hashlib.sha256()
+        while True:
+            chunk = source.read(BACKUP_CHUNK_BYTES)
+            if not chunk:
+                break
+            whole.update(chunk)
+            digest, written = _store_chunk(chunk, compress)
+            chunks.append([digest, len(chunk)])
+            stats['new_chunks'] += bool(written)
+            stats['bytes_written'] += written
+        stats['bytes_read'] += st.st_size
+    return {
+        "signature": [st.st_mtime_ns, st.st_size, st.st_ino],
+        "size": sum(length for _, length in chunks),
+        "sha256": whole.hexdigest(),
+        "chunks": chunks
+    }
+
+def create_backup(paths, compress=True):
+    """Back up the given files incrementally, returns (backup_id, stats)
+
+    Chunks already in the store are not written again, and files that did
+    not change since the latest backup are not even read.
+    """
+    # Held against prune_backups, which must not collect chunks this backup
+    # is about to reference
+    with file_lock(MANIFEST_DIR):
+        return _create_backup(paths, compress)
+
+def _create_backup(paths, compress):
+    backups = list_backups()
+    latest = load_manifest(backups[-1]) if backups else None
+    previous_files = latest.get('files', {}) if latest else {}
+    stats = {"files": 0, "unchanged_files": 0, "new_chunks": 0,
+             "bytes_read": 0, "bytes_written": 0}
+
+    files = {}
+    for path in paths:
+        name = Path(path).name
+        entry = _snapshot_file(path, previous_files.get(name), compress, stats)
+        if entry is not None:
+            files[name] = entry
+            stats['files'] += 1
+
+    backup_id = _new_backup_id()
+    manifest = {
+        "id": backup_id,
+        "created": datetime.now().isoformat(),
+        "files": files
+    }
+    Path(MANIFEST_DIR).mkdir(parents=True, exist_ok=True)
+    if not write_json(_manifest_path(backup_id), manifest, fmt="compact"):
+        return None, stats
+    return backup_id, stats
+
+def read_backup_file(manifest, name):
+    """Reassemble one file of a backup, verifying every chunk and the whole"""
+    entry = manifest['files'][name]
+    data = b"".join(_read_chunk(digest) for digest, _ in entry['chunks'])
+    if len(data) != entry['size'] or hashlib.sha256(data).hexdigest() != entry['sha256']:
+        raise ValueError(f"Backup of {name} in {manifest['id']} does not match its manifest")
+    return data
+
+def _backup_time(backup_id):
+    return datetime.strptime(backup_id[:15], BACKUP_ID_FORMAT)
+
+def backups_to_keep(backup_ids, keep_last=BACKUP_KEEP_LAST, keep_daily=BACKUP_KEEP_DAILY,
+                    now=None):
+    """Apply the retention policy to a sorted list of backup IDs"""
+    keep = set(backup_ids[-keep_last:]) if keep_last > 0 else set()
+    now = now or datetime.now()
+    cutoff = (now - timedelta(days=keep_daily)).date()
+    newest_per_day = {}
+    for backup_id in backup_ids:
+        try:
+            day = _backup_time(backup_id).date()
+        except ValueError:
+            # Not one of ours, leave it alone
+            keep.add(backup_id)
+            continue
+        if day > cutoff:
+            newest_per_day[day] = backup_id
+    keep.update(newest_per_day.values())
+    return keep
+
+def prune_backups(keep_last=BACKUP_KEEP_LAST, keep_daily=BACKUP_KEEP_DAILY):
+    """Delete backups outside the retention policy and the chunks only they used
+
+    Returns (backups removed, chunks removed).
+    """
+    with file_lock(MANIFEST_DIR):
+        return _prune_backups(keep_last, keep_daily)
+
+def _prune_backups(keep_last, keep_daily):
+    backup_ids = list_backups()
+    keep = backups_to_keep(backup_ids, keep_last, keep_daily)
+    removed_backups = 0
+    for backup_id in backup_ids:
+        if backup_id not in keep:
+            _manifest_path(backup_id).unlink()
+            removed_backups += 1
+
+    # Mark and sweep: any chunk no remaining manifest lists is garbage
+    referenced = set()
+    for backup_id in keep:
+        manifest = load_manifest(backup_id)
+        for entry in (manifest or {}).get('files', {}).values():
+            referenced.update(digest for digest, _ in entry.get('chunks', []))
+    removed_chunks = 0
+    object_dir = Path(OBJECT_DIR)
+    if object_dir.exists():
+        for path in object_dir.glob("*/*"):
+            if path.name.startswith("."):
+                # Temporary file of a backup in progress
+                continue
+            if path.name.split(".")[0] not in referenced:
+                path.unlink()
+                removed_chunks += 1
+    return removed_backups, removed_chunks
@@ -0,0 +1,932 @@
+"""Performance benchmarks for the storage and checkout paths
+
+Every benchmark runs against a scratch data directory, so the real data
+files are never touched. Run them through main.py, e.g.
+
+    python main.py --benchmark checkout --threads 1,4,8 --backend sqlite
+    python main.py --benchmark formats --orders 10000,100000
+    python main.py --benchmark contention --processes 1,2,4,8
+    python main.py --benchmark backup --orders 10000,100000
+    python main.py --benchmark catalogue --products 10000,100000
+    python main.py --benchmark models --count 100000
+    python main.py --benchmark money
+    python main.py --benchmark order-build --lines 500
+    python main.py --benchmark ids --orders 100000
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from utils import storage
+from utils.file_handler import (read_json, write_json, invalidate_json_cache, loads_json, JSON_FORMATS,
+                                update_json, get_update_stats, OPTIMISTIC_RETRIES)
+from models import catalogue, columnar_catalogue
+
+@contextmanager
+def scratch_data_dir(backend="json", write_behind=True):
+    """Run with an empty temporary data/ directory and fresh shared objects"""
+    old_cwd = os.getcwd()
+    old_backend = storage.STORAGE_BACKEND
+    old_write_behind = storage.WRITE_BEHIND
+    scratch = tempfile.mkdtemp(prefix="awe-bench-")
+    os.chdir(scratch)
+    os.mkdir("data")
+    storage.STORAGE_BACKEND = backend
+    storage.WRITE_BEHIND = write_behind
+    storage.reset_storage()
+    catalogue.reset_catalogue()
+    columnar_catalogue.reset_columnar_catalogue()
+    invalidate_json_cache()
+    try:
+        yield scratch
+    finally:
+        storage.reset_storage()
+        catalogue.reset_catalogue()
+        columnar_catalogue.reset_columnar_catalogue()
+        invalidate_json_cache()
+        storage.STORAGE_BACKEND = old_backend
+        storage.WRITE_BEHIND = old_write_behind
+        os.chdir(old_cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+def make_products(count, stock=100):
+    """Generate simple product records"""
+    return [{
+        "product_id": f"B{i:05d}",
+        "name": f"Bench Product {i}",
+        "price": 10.0 + i % 90,
+        "category": f"Category {i % 10}",
+        "stock": stock,
+        "description": "Generated for benchmarking"
+    } for i in range(count)]
+
+def seed_products(products):
+    """Store products through the configured backend"""
+    store = storage.get_storage()
+    if store.name == "json":
+        write_json(storage.PRODUCT_FILE, products)
+    else:
+        for product in products:
+            store.add_product(product)
+
+def print_table(headers, rows):
+    """Print rows as an aligned text table"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).rjust(w) for c, w in zip(row, widths)))
+
+# Checkout
+
+def bench_checkout(threads=4, orders=1000, products=20, stock=100, backend="json", seed=1,
+                   write_behind=True):
+    """Checkout throughput with concurrent threads, plus an oversell check
+
+    Each thread places random 1-3 line orders through place_order. Stock is
+    deliberately scarce so that lines compete; afterwards every product's
+    stock must equal its starting stock minus what was actually sold.
+    """
+    from controllers.order_controller import place_order
+    from models.order import Order
+    from models.invoice import Invoice
+    from models.receipt import Receipt
+
+    with scratch_data_dir(backend, write_behind):
+        records = make_products(products, stock)
+        seed_products(records)
+        product_ids = [p["product_id"] for p in records]
+        catalogue.get_catalogue()
+
+        sold = {pid: 0 for pid in product_ids}
+        counts = {"placed": 0, "rejected": 0}
+        results_lock = threading.Lock()
+        per_thread = max(1, orders // threads)
+
+        def worker(worker_seed):
+            rng = random.Random(worker_seed)
+            for _ in range(per_thread):
+                items = [{"product_id": pid, "name": pid, "price": 1.0,
+                          "quantity": rng.randint(1, 3)}
+                         for pid in rng.sample(product_ids, rng.randint(1, 3))]
+                order = Order("bench", items, {"name": "Bench", "address": "-", "phone": "-"}, "Card")
+                invoice = Invoice(order)
+                placed, _ = place_order(order, invoice, Receipt(invoice, "Card"))
+                with results_lock:
+                    if placed:
+                        counts["placed"] += 1
+                        for item in items:
+                            sold[item["product_id"]] += item["quantity"]
+                    else:
+                        counts["rejected"] += 1
+
+        workers = [threading.Thread(target=worker, args=(seed + i,)) for i in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        invalidate_json_cache()
+        final = {p["product_id"]: p["stock"] for p in storage.get_storage().load_products()}
+        consistent = all(final[pid] == stock - sold[pid] for pid in product_ids)
+        attempts = counts["placed"] + counts["rejected"]
+        return {
+            "threads": threads,
+            "backend": backend,
+            "attempts": attempts,
+            "placed": counts["placed"],
+            "rejected": counts["rejected"],
+            "seconds": round(elapsed, 3),
+            "checkouts_per_sec": round(attempts / elapsed, 1) if elapsed else 0.0,
+            "min_stock": min(final.values()),
+            "consistent": consistent,
+        }
+
+def run_checkout(args):
+    rows = []
+    for threads in args.threads:
+        result = bench_checkout(threads, args.orders, args.products, args.stock, args.backend,
+                                write_behind=not args.direct)
+        rows.append([result[k] for k in ("threads", "attempts", "placed", "rejected",
+                                         "seconds", "checkouts_per_sec", "min_stock",
+                                         "consistent")])
+    mode = "direct writes" if args.direct else "write-behind"
+    print(f"Checkout throughput ({args.backend} backend, {mode}, {args.products} products "
+          f"x {args.stock} stock)")
+    print_table(["threads", "attempts", "placed", "rejected", "seconds",
+                 "per_sec", "min_stock", "consistent"], rows)
+    return 0 if all(row[-1] and row[-2] >= 0 for row in rows) else 1
+
+# User directory
+
+def bench_users(users=1_000_000, lookups=100_000, scans=20, seed=1):
+    """Login and registration lookups: linear users.json scans vs the directory"""
+    from utils.user_directory import UserDirectory
+    from utils.file_handler import read_json
+
+    with scratch_data_dir("json"):
+        with open(storage.USER_FILE, 'w', encoding='utf-8') as file:
+            json.dump([{"username": f"user{i}", "password": f"pw{i}",
+                        "email": f"User{i}@Example.com", "role": "customer", "cart": []}
+                       for i in range(users)], file)
+
+        rng = random.Random(seed)
+        names = [f"user{rng.randrange(users * 2)}" for _ in range(lookups)]
+        emails = [f"user{rng.randrange(users * 2)}@example.com" for _ in range(lookups)]
+        results = []
+
+        start = time.perf_counter()
+        records = read_json(storage.USER_FILE, copy=False)
+        results.append(("parse users.json", time.perf_counter() - start, 1))
+
+        # What login and registration used to do: scan the whole list
+        start = time.perf_counter()
+        for name in names[:scans]:
+            any(u.get('username') == name for u in records)
+        results.append(("linear username scan", time.perf_counter() - start, scans))
+        start = time.perf_counter()
+        for email in emails[:scans]:
+            any(u.get('email', '').lower() == email for u in records)
+        results.append(("linear email scan", time.perf_counter() - start, scans))
+
+        directory = UserDirectory(storage.USER_FILE)
+        start = time.perf_counter()
+        len(directory)
+        results.append(("build directory", time.perf_counter() - start, 1))
+
+        for label, check, keys in (("username_exists", directory.username_exists, names),
+                                   ("email_exists", directory.email_exists, emails),
+                                   ("authenticate", lambda n: directory.authenticate(n, "x"), names)):
+            start = time.perf_counter()
+            for key in keys:
+                check(key)
+            results.append((label, time.perf_counter() - start, len(keys)))
+        return results
+
+def run_users(args):
+    results = bench_users(args.users, args.lookups, args.scans)
+    print(f"User lookups ({args.users:,} users)")
+    print_table(["operation", "calls", "total_s", "per_call_us"],
+                [[label, calls, round(total, 3), round(total / calls * 1e6, 2)]
+                 for label, total, calls in results])
+    return 0
+
+# On-disk formats
+
+# Generated orders are spread from this day on, BENCH_ORDER_GAP_MS apart on average
+BENCH_ORDER_START = "2025-06-01T09:00:00"
+BENCH_ORDER_GAP_MS = 60_000
+
+def make_order_records(count, seed=1):
+    """Generate stored order records shaped like real checkouts"""
+    from utils.order_records import pack_record
+    from utils.money import items_total_cents
+    from utils.ids import IdGenerator, id_datetime, timestamp_ms, document_number
+    rng = random.Random(seed)
+    # Time-ordered ids from a clock that steps forward between orders
+    clock = [timestamp_ms(BENCH_ORDER_START) * 1_000_000]
+    ids = IdGenerator(clock=lambda: clock[0])
+    records = []
+    for i in range(count):
+        clock[0] += rng.randrange(2 * BENCH_ORDER_GAP_MS) * 1_000_000
+        order_id, invoice_id, receipt_id = ids.new_id(), ids.new_id(), ids.new_id()
+        stamp = id_datetime(order_id).isoformat()
+        items = [{"product_id": f"B{rng.randrange(500):05d}", "name": f"Bench Product {j}",
+                  "price": rng.randrange(1000, 200000) / 100, "quantity": rng.randint(1, 3)}
+                 for j in range(rng.randint(1, 4))]
+        total = items_total_cents(items)
+        order = {"order_id": order_id, "user_id": f"user{rng.randrange(count // 10 + 1)}",
+                 "items": items, "shipping": {"name": "Bench Customer",
+                                              "address": f"{i} Example Street",
+                                              "phone": "0400000000"},
+                 "payment_method": "Credit Card", "total_cents": total, "order_date": stamp,
+                 "status": "Confirmed"}
+        invoice = {"invoice_id": invoice_id, "order_id": order["order_id"],
+                   "user_id": order["user_id"], "amount_cents": total, "subtotal_cents": total,
+                   "tax_amount_cents": 0, "total_amount_cents": total, "invoice_date": stamp,
+                   "due_date": stamp, "status": "Generated", "items": items,
+                   "shipping_info": order["shipping"]}
+        receipt = {"receipt_id": receipt_id, "invoice_id": invoice["invoice_id"],
+                   "order_id": order["order_id"], "user_id": order["user_id"],
+                   "payment_method": "Credit Card", "amount_paid_cents": total,
+                   "payment_date": stamp, "status": "Paid",
+                   "transaction_reference": document_number(receipt_id, "TXN"), "items": items,
+                   "subtotal_cents": total, "tax_amount_cents": 0, "total_amount_cents": total,
+                   "shipping_info": order["shipping"]}
+        records.append(pack_record(order, invoice, receipt))
+    return records
+
+def bench_formats(sizes=(10_000, 100_000, 1_000_000), formats=JSON_FORMATS):
+    """Serialize and parse time and file size of orders.json in each format"""
+    results = []
+    with scratch_data_dir("json"):
+        for size in sizes:
+            records = make_order_records(size)
+            for fmt in formats:
+                path = f"data/orders.{fmt}"
+                start = time.perf_counter()
+                write_json(path, records, fmt=fmt)
+                write_s = time.perf_counter() - start
+                size_bytes = os.path.getsize(path)
+
+                start = time.perf_counter()
+                with open(path, 'rb') as file:
+                    parsed = loads_json(file.read())
+                parse_s = time.perf_counter() - start
+                assert len(parsed) == size
+                del parsed
+                os.remove(path)
+                results.append((size, fmt, write_s, parse_s, size_bytes))
+            del records
+    return results
+
+def run_formats(args):
+    results = bench_formats(args.orders, args.formats)
+    print("orders.json formats (version 2 records)")
+    baseline = {size: size_bytes for size, fmt, _, _, size_bytes in results if fmt == "pretty"}
+    print_table(["orders", "format", "write_s", "parse_s", "MB", "vs_pretty"],
+                [[size, fmt, round(write_s, 3), round(parse_s, 3), round(size_bytes / 1e6, 2),
+                  f"{size_bytes / baseline[size]:.2f}" if size in baseline else "-"]
+                 for size, fmt, write_s, parse_s, size_bytes in results])
+    return 0
+
+# Cross-process contention
+
+def _contention_worker(path, mode, updates, seed):
+    """Bump random stock counters in a shared products file from one process"""
+    rng = random.Random(seed)
+    before = get_update_stats()
+
+    def bump(products):
+        products[rng.randrange(len(products))]['stock'] += 1
+        return True, None
+
+    for _ in range(updates):
+        if mode == "unsafe":
+            # The old read_json -> mutate -> write_json sequence, no lock
+            products = read_json(path)
+            bump(products)
+            write_json(path, products)
+        else:
+            retries = 0 if mode == "locked" else OPTIMISTIC_RETRIES
+            update_json(path, bump, retries=retries)
+    after = get_update_stats()
+    return {key: after[key] - before[key] for key in after}
+
+def bench_contention(processes=(1, 2, 4, 8), updates=200, products=200,
+                     modes=("unsafe", "locked", "optimistic")):
+    """Several processes updating products.json at once: throughput and lost updates"""
+    results = []
+    with scratch_data_dir("json") as scratch:
+        path = os.path.join(scratch, storage.PRODUCT_FILE)
+        context = multiprocessing.get_context()
+        for mode in modes:
+            for count in processes:
+                seed_products(make_products(products, stock=0))
+                start = time.perf_counter()
+                with context.Pool(count) as pool:
+                    stats = pool.starmap(_contention_worker,
+                                         [(path, mode, updates, seed) for seed in range(count)])
+                elapsed = time.perf_counter() - start
+                invalidate_json_cache()
+                applied = sum(p['stock'] for p in read_json(path))
+                expected = count * updates
+                results.append((mode, count, expected, applied, elapsed,
+                                sum(s['conflicts'] for s in stats),
+                                sum(s['locked'] for s in stats)))
+    return results
+
+def run_contention(args):
+    results = bench_contention(args.processes, args.updates, args.products)
+    print(f"products.json contention ({args.products} products, {args.updates} updates per process)")
+    print_table(["mode", "procs", "updates", "lost", "seconds", "per_sec", "conflicts", "locked"],
+                [[mode, count, expected, expected - applied, round(elapsed, 3),
+                  round(expected / elapsed, 1), conflicts, locked]
+                 for mode, count, expected, applied, elapsed, conflicts, locked in results])
+    return 0 if all(expected == applied for mode, _, expected, applied, *_ in results
+                    if mode != "unsafe") else 1
+
+# Backups
+
+def _tree_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+def bench_backup(sizes=(10_000, 100_000), new_orders=100):
+    """Full-copy backups vs incremental backups of a growing order history"""
+    from utils import order_store
+    from utils.backup_store import create_backup
+    from utils.file_handler import _load_json_file, BACKUP_DIR, BACKUP_FILES
+
+    results = []
+    with scratch_data_dir("json"):
+        data_files = [f"data/{name}" for name in BACKUP_FILES]
+        for size in sizes:
+            shutil.rmtree(BACKUP_DIR, ignore_errors=True)
+            seed_products(make_products(500))
+            write_json(storage.USER_FILE, [])
+            records = make_order_records(size + new_orders)
+            order_store.replace_orders(records[:size])
+
+            # What backup_data used to do: parse and rewrite every file
+            start = time.perf_counter()
+            for path in data_files:
+                write_json(f"{BACKUP_DIR}/full/{os.path.basename(path)}", _load_json_file(path))
+            results.append((size, "full copy", time.perf_counter() - start,
+                            _tree_bytes(f"{BACKUP_DIR}/full")))
+            shutil.rmtree(f"{BACKUP_DIR}/full")
+
+            for label in ("first", "unchanged", f"+{new_orders} orders"):
+                if label.startswith("+"):
+                    order_store.append_orders(records[size:])
+                    order_store.compact_orders()
+                start = time.perf_counter()
+                _, stats = create_backup(data_files)
+                results.append((size, label, time.perf_counter() - start, stats["bytes_written"]))
+    return results
+
+def run_backup(args):
+    results = bench_backup(args.orders, args.new_orders)
+    print("Backups of the data files (bytes = new data stored by that backup)")
+    print_table(["orders", "backup", "seconds", "MB"],
+                [[size, label, round(elapsed, 3), round(written / 1e6, 3)]
+                 for size, label, elapsed, written in results])
+    return 0
+
+# Integrity check
+
+def bench_integrity(orders=100_000, users=10_000, products=500, processes=(1, 3)):
+    """check_integrity on a generated data set, in one process and in a pool"""
+    from utils import order_store
+    from utils.integrity import check_integrity
+
+    results = []
+    with scratch_data_dir("json"):
+        seed_products(make_products(products))
+        write_json(storage.USER_FILE, [{"username": f"user{i}", "role": "customer",
+                                        "email": f"user{i}@example.com"}
+                                       for i in range(users)])
+        order_store.replace_orders(make_order_records(orders))
+        for count in processes:
+            report = check_integrity(count)
+            results.append((count, report))
+    return results
+
+def run_integrity(args):
+    results = bench_integrity(args.orders, args.users, args.products, args.processes)
+    print(f"Integrity check ({args.orders} orders, {args.users} users, {args.products} products)")
+    print_table(["processes", "seconds", "users_s", "products_s", "orders_s", "issues"],
+                [[count, report["seconds"], report["files"]["users"]["seconds"],
+                  report["files"]["products"]["seconds"], report["files"]["orders"]["seconds"],
+                  report["issue_count"]] for count, report in results])
+    return 0
+
+# Catalogue layouts
+
+def _object_inventory(products, threshold):
+    """The bulk inventory queries as loops over Product objects"""
+    value = sum(p.price * p.stock for p in products)
+    low = [p for p in products if 0 < p.stock <= threshold]
+    out = [p for p in products if p.stock <= 0]
+    available = [p for p in products if p.stock > 0]
+    totals = {}
+    for p in products:
+        count, units, worth = totals.get(p.category, (0, 0, 0.0))
+        totals[p.category] = (count + 1, units + p.stock, worth + p.price * p.stock)
+    return value, len(low), len(out), len(available), totals
+
+def _columnar_inventory(columns, threshold):
+    """The same queries on the columns, rows only (no views)"""
+    return (columns.total_value(), len(columns.rows_where_stock(0, threshold)),
+            len(columns.rows_out_of_stock()), len(columns.rows_where_stock(0)),
+            columns.category_totals())
+
+def bench_catalogue(sizes=(10_000, 100_000), repeats=20, seed=1):
+    """Product objects vs columns: memory, load time and bulk inventory queries"""
+    import tracemalloc
+    from models.columnar_catalogue import ProductColumns
+    from models.product import Product
+    from utils.stats import LOW_STOCK_THRESHOLD
+
+    rng = random.Random(seed)
+    layouts = [("objects", None), ("array", False)]
+    if columnar_catalogue.numpy is not None:
+        layouts.append(("numpy", True))
+    old_numpy = columnar_catalogue.numpy
+    results = []
+    try:
+        for size in sizes:
+            records = make_products(size)
+            for record in records:
+                record["stock"] = rng.choice([0, rng.randint(1, 5), rng.randint(6, 500)])
+            answers = []
+            for label, use_numpy in layouts:
+                columnar_catalogue.numpy = old_numpy if use_numpy else None
+                tracemalloc.start()
+                start = time.perf_counter()
+                if use_numpy is None:
+                    loaded = [Product(r['product_id'], r['name'], r['price'], r['category'],
+                                      r['stock'], r['description']) for r in records]
+                else:
+                    loaded = ProductColumns.from_records(records)
+                load_seconds = time.perf_counter() - start
+                held = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+
+                query = _object_inventory if use_numpy is None else _columnar_inventory
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    answer = query(loaded, LOW_STOCK_THRESHOLD)
+                query_seconds = (time.perf_counter() - start) / repeats
+                answers.append(answer)
+                results.append((size, label, load_seconds, held, query_seconds))
+                del loaded
+            value, low, out, available, totals = answers[0]
+            for other in answers[1:]:
+                # Float sums may differ in the last bits between orders of addition
+                if (other[1:4] != (low, out, available) or abs(other[0] - value) > 1e-6 * value
+                        or {k: v[:2] for k, v in other[4].items()}
+                        != {k: v[:2] for k, v in totals.items()}):
+                    raise AssertionError("catalogue layouts disagree")
+    finally:
+        columnar_catalogue.numpy = old_numpy
+    return results
+
+def run_catalogue(args):
+    results = bench_catalogue(args.products, args.repeats)
+    print("Catalogue layouts (query = value, stock buckets, available, per-category totals)")
+    print_table(["products", "layout", "load_s", "MB", "bytes/product", "query_ms"],
+                [[size, label, round(load, 3), round(held / 1e6, 2), round(held / size),
+                  round(query * 1000, 2)] for size, label, load, held, query in results])
+    return 0
+
+# Model objects
+
+def _dict_model(cls):
+    """The model class laid out as before __slots__: same methods, a __dict__ per instance"""
+    skip = set(cls.__slots__) | {"__slots__", "__dict__", "__weakref__"}
+    return type(cls.__name__, (), {name: value for name, value in vars(cls).items()
+                                   if name not in skip})
+
+def _legacy_hydrators():
+    """Hydration as it was before: through __init__, with a helper class per call
+
+    The removed MinimalOrder / MinimalInvoice code paths, run on __dict__
+    copies of today's classes, so "before" differs from "after" only in
+    the layout and the hydration path.
+    """
+    from datetime import datetime
+    from models.product import Product
+    from models.order import Order
+    from models.invoice import Invoice
+    from models.receipt import Receipt
+    from models.payment import Payment
+    from utils.money import stored_cents
+    from utils.order_records import is_order_record, expand_invoice, expand_receipt
+
+    DictProduct, DictOrder, DictInvoice, DictReceipt, DictPayment = (
+        _dict_model(cls) for cls in (Product, Order, Invoice, Receipt, Payment))
+
+    def order_from_dict(data):
+        order = DictOrder(user_id=data["user_id"], items=data["items"],
+                          shipping=data["shipping"], payment_method=data["payment_method"])
+        order.order_id = data["order_id"]
+        order.order_date = data.get("order_date", datetime.now().isoformat())
+        order.status = data.get("status", "Confirmed")
+        return order
+
+    def invoice_from_dict(data):
+        if is_order_record(data):
+            data = expand_invoice(data)
+
+        class MinimalOrder:
+            def __init__(self, data):
+                self.order_id = data["order_id"]
+                self.user_id = data["user_id"]
+                self.items = data.get("items", [])
+                self.shipping = data.get("shipping_info", {})
+
+            def calculate_total_cents(self):
+                return stored_cents(data, "amount")
+
+            def calculate_subtotal_cents(self):
+                return stored_cents(data, "subtotal", stored_cents(data, "amount"))
+
+        invoice = DictInvoice(MinimalOrder(data))
+        invoice.invoice_id = data["invoice_id"]
+        invoice.subtotal_cents = stored_cents(data, "subtotal", invoice.amount_cents)
+        invoice.tax_amount_cents = stored_cents(data, "tax_amount")
+        invoice.total_amount_cents = stored_cents(data, "total_amount", invoice.amount_cents)
+        invoice.invoice_date = data.get("invoice_date", datetime.now().isoformat())
+        invoice.due_date = data.get("due_date", datetime.now().isoformat())
+        invoice.status = data.get("status", "Generated")
+        return invoice
+
+    def receipt_from_dict(data):
+        if is_order_record(data):
+            data = expand_receipt(data)
+
+        class MinimalInvoice:
+            def __init__(self, data):
+                self.invoice_id = data["invoice_id"]
+                self.order_id = data["order_id"]
+                self.user_id = data["user_id"]
+                self.items = data.get("items", [])
+                self.subtotal_cents = stored_cents(data, "subtotal")
+                self.tax_amount_cents = stored_cents(data, "tax_amount")
+                self.total_amount_cents = stored_cents(data, "total_amount",
+                                                       stored_cents(data, "amount_paid"))
+                self.shipping_info = data.get("shipping_info", {})
+
+        receipt = DictReceipt(MinimalInvoice(data), data["payment_method"])
+        receipt.receipt_id = data["receipt_id"]
+        receipt.amount_paid_cents = stored_cents(data, "amount_paid")
+        receipt.payment_date = data.get("payment_date", datetime.now().isoformat())
+        receipt.status = data.get("status", "Paid")
+        receipt.transaction_reference = data.get("transaction_reference",
+                                                 receipt.generate_transaction_reference())
+        return receipt
+
+    return {
+        "Product": lambda data: DictProduct(**data),
+        "Order": order_from_dict,
+        "Invoice": invoice_from_dict,
+        "Receipt": receipt_from_dict,
+        "Payment": DictPayment.from_dict,
+        "Order record": lambda record: (order_from_dict(record["order"]),
+                                        invoice_from_dict(record), receipt_from_dict(record)),
+    }
+
+def _model_sources(count):
+    """(label, before, after, sources) for each model class"""
+    from models.product import Product
+    from models.order import Order
+    from models.invoice import Invoice
+    from models.receipt import Receipt
+    from models.payment import Payment
+    from utils.order_records import hydrate_record
+
+    records = make_order_records(count)
+    payments = [{"method": "Credit Card", "account_holder": f"Customer {i}",
+                 "amount_cents": record["order"]["total_cents"], "currency": "AUD",
+                 "status": "Completed", "transaction_id": f"T{i:015d}"}
+                for i, record in enumerate(records)]
+    before = _legacy_hydrators()
+    return [
+        ("Product", before["Product"], lambda data: Product(**data), make_products(count)),
+        ("Order", before["Order"], Order.from_dict, [record["order"] for record in records]),
+        ("Invoice", before["Invoice"], Invoice.from_dict, records),
+        ("Receipt", before["Receipt"], Receipt.from_dict, records),
+        ("Payment", before["Payment"], Payment.from_dict, payments),
+        ("Order record", before["Order record"], hydrate_record, records)
+    ]
+
+def _measure_hydration(hydrate, sources):
+    """(instances per second, bytes of the first object, bytes allocated per instance)"""
+    import gc
+    import sys
+    import tracemalloc
+
+    # Warm up, and keep the cyclic collector out of the timing: its passes
+    # over the large source lists would land on whichever variant triggers them
+    [hydrate(data) for data in sources[:1000]]
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        objects = [hydrate(data) for data in sources]
+        seconds = time.perf_counter() - start
+    finally:
+        gc.enable()
+    shallow = sys.getsizeof(objects[0]) + sys.getsizeof(getattr(objects[0], "__dict__", {}))
+    del objects
+
+    # Everything an instance allocates: the object, its attribute
+    # storage and any lists or dicts it copies from the source
+    tracemalloc.start()
+    objects = [hydrate(data) for data in sources]
+    held = tracemalloc.get_traced_memory()[0] - sys.getsizeof(objects)
+    tracemalloc.stop()
+    del objects
+    return len(sources) / seconds, shallow, held / len(sources)
+
+def bench_models(count=100_000):
+    """Memory per instance and hydration rate of the model classes, before and after
+
+    "before" is a __dict__ instance built the old way (see
+    _legacy_hydrators), "after" today's slotted class and from_dict.
+    """
+    results = []
+    for label, before, after, sources in _model_sources(count):
+        results.append((label, _measure_hydration(before, sources),
+                        _measure_hydration(after, sources)))
+    return results
+
+def run_models(args):
+    results = bench_models(args.count)
+    print(f"Model hydration from stored dicts ({args.count:,} instances each), before -> after")
+    print_table(["model", "per_sec_before", "per_sec_after", "object_bytes_before",
+                 "object_bytes_after", "bytes_per_instance_before", "bytes_per_instance_after"],
+                [[label, round(old[0]), round(new[0]), old[1], new[1], round(old[2]), round(new[2])]
+                 for label, old, new in results])
+    return 0
+
+# Money
+
+def bench_money(orders=100_000, lines=500, repeats=20, seed=1):
+    """Float dollars vs integer cents: report sums and order line totals"""
+    import math
+    from utils import money
+    from utils.money import to_cents, format_money, items_total_cents
+
+    rng = random.Random(seed)
+    prices = [rng.randrange(1, 100_000) / 100 for _ in range(orders)]
+    quantities = [rng.randint(1, 5) for _ in range(orders)]
+    dollars = [price * qty for price, qty in zip(prices, quantities)]
+    cents = [to_cents(price) * qty for price, qty in zip(prices, quantities)]
+    exact = sum(cents)
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            result = fn()
+        return result, (time.perf_counter() - start) / repeats
+
+    results = []
+    # What reports did: add float dollars, rounding the running total for display
+    def float_running():
+        total = 0.0
+        for amount in dollars:
+            total = round(total + amount, 2)
+        return format_money(to_cents(total))
+    for label, fn in (("float sum", lambda: f"${sum(dollars):.2f}"),
+                      ("float sum, rounded each step", float_running),
+                      ("math.fsum", lambda: f"${math.fsum(dollars):.2f}"),
+                      ("int cents", lambda: format_money(sum(cents)))):
+        text, seconds = timed(fn)
+        results.append((f"{orders:,} order totals", label, seconds, text == format_money(exact)))
+
+    items = [{"price": rng.randrange(1, 100_000) / 100, "quantity": rng.randint(1, 5)}
+             for _ in range(lines)]
+    line_exact = sum(to_cents(item["price"]) * item["quantity"] for item in items)
+    old_numpy = money.numpy
+    try:
+        variants = [("float dollars", lambda: to_cents(sum(i["price"] * i["quantity"] for i in items))),
+                    ("int cents", lambda: items_total_cents(items))]
+        for label, fn in variants:
+            money.numpy = None
+            total, seconds = timed(fn)
+            results.append((f"{lines}-line order", label, seconds, total == line_exact))
+        if old_numpy is not None:
+            money.numpy = old_numpy
+            total, seconds = timed(lambda: items_total_cents(items))
+            results.append((f"{lines}-line order", "int cents, numpy", seconds, total == line_exact))
+    finally:
+        money.numpy = old_numpy
+    return results
+
+def run_money(args):
+    results = bench_money(args.orders, args.lines, args.repeats)
+    print("Money arithmetic (exact = matches the integer-cents result to the cent)")
+    print_table(["sum over", "method", "ms", "exact"],
+                [[what, label, round(seconds * 1000, 3), exact]
+                 for what, label, seconds, exact in results])
+    return 0
+
+# Order building
+
+def bench_order_build(lines=500, repeats=200, seed=1):
+    """Build an order line by line, bill it and serialize it, as checkout does"""
+    from models.order import Order
+    from models.invoice import Invoice
+    from models.receipt import Receipt
+    from utils.order_records import pack_record
+
+    rng = random.Random(seed)
+    items = [(f"B{i:05d}", f"Bench Product {i}", rng.randrange(100, 200000) / 100,
+              rng.randint(1, 5)) for i in range(lines)]
+    shipping = {"name": "Bench", "address": "-", "phone": "-"}
+    steps = {"add items": 0.0, "invoice + receipt": 0.0, "summary + str": 0.0, "to_dict": 0.0}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        order = Order("bench", [], shipping, "Card")
+        for product_id, name, price, quantity in items:
+            order.add_item(product_id, name, price, quantity)
+        added = time.perf_counter()
+        invoice = Invoice(order)
+        receipt = Receipt(invoice, "Card")
+        billed = time.perf_counter()
+        order.get_order_summary()
+        str(order), repr(order)
+        summarized = time.perf_counter()
+        pack_record(order.to_dict(), invoice.to_dict(), receipt.to_dict())
+        done = time.perf_counter()
+        steps["add items"] += added - start
+        steps["invoice + receipt"] += billed - added
+        steps["summary + str"] += summarized - billed
+        steps["to_dict"] += done - summarized
+    return {step: seconds / repeats for step, seconds in steps.items()}
+
+def run_order_build(args):
+    steps = bench_order_build(args.lines, args.repeats)
+    print(f"Building and serializing one {args.lines}-line order (mean of {args.repeats})")
+    rows = [[step, round(seconds * 1000, 3)] for step, seconds in steps.items()]
+    rows.append(["total", round(sum(steps.values()) * 1000, 3)])
+    print_table(["step", "ms"], rows)
+    return 0
+
+# Time-ordered ids
+
+def bench_ids(orders=100_000, journaled=1_000, windows=(0.001, 0.01, 0.1), threads=4,
+              count=100_000):
+    """Id generation rate, and "orders since T" by binary search vs a full scan"""
+    import uuid
+    from utils import order_store
+    from utils.ids import new_id, id_datetime
+
+    def rate(make, threads):
+        per_thread = count // threads
+        def worker():
+            for _ in range(per_thread):
+                make()
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return per_thread * threads / (time.perf_counter() - start)
+
+    generation = [(label, n, rate(make, n)) for label, make in
+                  (("uuid4", uuid.uuid4), ("time-ordered", new_id)) for n in (1, threads)]
+
+    queries = []
+    with scratch_data_dir("json", write_behind=False):
+        records = make_order_records(orders + journaled)
+        write_json(order_store.ORDER_FILE, records[:orders])
+        order_store.append_orders(records[orders:])
+        invalidate_json_cache()
+        start = time.perf_counter()
+        order_store.orders_since(BENCH_ORDER_START, BENCH_ORDER_START)
+        build = time.perf_counter() - start
+
+        for window in windows:
+            first = records[len(records) - max(1, int(len(records) * window))]
+            since = id_datetime(first['order']['order_id'])
+            start = time.perf_counter()
+            found = order_store.orders_since(since)
+            indexed = time.perf_counter() - start
+            start = time.perf_counter()
+            scanned = [record for record in order_store.iter_orders()
+                       if record['order']['order_date'] >= since.isoformat()]
+            scan = time.perf_counter() - start
+            queries.append((window, len(found), indexed, scan, found == scanned))
+    return generation, build, queries
+
+def run_ids(args):
+    generation, build, queries = bench_ids(args.orders, args.journaled, threads=args.threads,
+                                           count=args.count)
+    print("Id generation")
+    print_table(["ids", "threads", "per second"],
+                [[label, n, f"{per_second:,.0f}"] for label, n, per_second in generation])
+    print()
+    print(f"Orders since T over {args.orders:,} stored + {args.journaled:,} journaled orders "
+          f"(time index built in {build * 1000:.0f} ms)")
+    print_table(["newest", "orders", "index ms", "scan ms", "same"],
+                [[f"{window:.1%}", found, round(indexed * 1000, 2), round(scan * 1000, 1), same]
+                 for window, found, indexed, scan, same in queries])
+    return 0
+
+def _int_list(text):
+    return [int(part) for part in text.split(",") if part]
+
+def main(argv=None):
+    """Command line entry point: main.py --benchmark <name> [options]"""
+    parser = argparse.ArgumentParser(prog="main.py --benchmark",
+                                     description="AWE Electronics performance benchmarks")
+    commands = parser.add_subparsers(dest="benchmark", required=True)
+
+    checkout = commands.add_parser("checkout", help="concurrent checkout throughput")
+    checkout.add_argument("--threads", type=_int_list, default=[1, 2, 4, 8])
+    checkout.add_argument("--orders", type=int, default=1000)
+    checkout.add_argument("--products", type=int, default=20)
+    checkout.add_argument("--stock", type=int, default=100)
+    checkout.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    checkout.add_argument("--direct", action="store_true",
+                          help="write on each caller's thread instead of the write-behind queue")
+    checkout.set_defaults(run=run_checkout)
+
+    users = commands.add_parser("users", help="login/registration lookups at scale")
+    users.add_argument("--users", type=int, default=1_000_000)
+    users.add_argument("--lookups", type=int, default=100_000)
+    users.add_argument("--scans", type=int, default=20)
+    users.set_defaults(run=run_users)
+
+    formats = commands.add_parser("formats", help="write_json format sizes and speeds")
+    formats.add_argument("--orders", type=_int_list, default=[10_000, 100_000, 1_000_000])
+    formats.add_argument("--formats", type=lambda text: text.split(","),
+                         default=list(JSON_FORMATS))
+    formats.set_defaults(run=run_formats)
+
+    contention = commands.add_parser("contention",
+                                     help="processes updating one data file at once")
+    contention.add_argument("--processes", type=_int_list, default=[1, 2, 4, 8])
+    contention.add_argument("--updates", type=int, default=200)
+    contention.add_argument("--products", type=int, default=200)
+    contention.set_defaults(run=run_contention)
+
+    backup = commands.add_parser("backup", help="full vs incremental backups")
+    backup.add_argument("--orders", type=_int_list, default=[10_000, 100_000])
+    backup.add_argument("--new-orders", type=int, default=100)
+    backup.set_defaults(run=run_backup)
+
+    integrity = commands.add_parser("integrity", help="data integrity check at scale")
+    integrity.add_argument("--orders", type=int, default=100_000)
+    integrity.add_argument("--users", type=int, default=10_000)
+    integrity.add_argument("--products", type=int, default=500)
+    integrity.add_argument("--processes", type=_int_list, default=[1, 3])
+    integrity.set_defaults(run=run_integrity)
+
+    catalogue_layouts = commands.add_parser("catalogue",
+                                            help="product objects vs columnar catalogue")
+    catalogue_layouts.add_argument("--products", type=_int_list, default=[10_000, 100_000])
+    catalogue_layouts.add_argument("--repeats", type=int, default=20)
+    catalogue_layouts.set_defaults(run=run_catalogue)
+
+    models = commands.add_parser("models", help="model memory and hydration rate")
+    models.add_argument("--count", type=int, default=100_000)
+    models.set_defaults(run=run_models)
+
+    money = commands.add_parser("money", help="float dollars vs integer cents")
+    money.add_argument("--orders", type=int, default=100_000)
+    money.add_argument("--lines", type=int, default=500)
+    money.add_argument("--repeats", type=int, default=20)
+    money.set_defaults(run=run_money)
+
+    order_build = commands.add_parser("order-build", help="build and serialize a large order")
+    order_build.add_argument("--lines", type=int, default=500)
+    order_build.add_argument("--repeats", type=int, default=200)
+    order_build.set_defaults(run=run_order_build)
+
+    ids = commands.add_parser("ids", help="time-ordered id generation and date range queries")
+    ids.add_argument("--orders", type=int, default=100_000)
+    ids.add_argument("--journaled", type=int, default=1_000)
+    ids.add_argument("--threads", type=int, default=4)
+    ids.add_argument("--count", type=int, default=100_000)
+    ids.set_defaults(run=run_ids)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
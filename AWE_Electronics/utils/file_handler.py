@@ -1,7 +1,51 @@
+import gzip
 import json
+import lzma
+import marshal
 import os
+import threading
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import datetime
+from types import MappingProxyType
+
+from utils.locks import file_lock
+
+# Process-wide cache of parsed JSON documents, keyed by resolved path.
+# Each entry is validated against the file's stat signature before use.
+_json_cache = {}
+_json_cache_lock = threading.Lock()
+_json_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+# On-disk formats for JSON documents. read_json detects the format from the
+# file itself, so files can be switched one at a time.
+#   pretty  - indented JSON, easy to read and edit by hand
+#   compact - JSON without indentation or spaces after separators
+#   gzip    - compact JSON, gzip compressed
+#   lzma    - compact JSON, xz compressed (smallest, slowest to write)
+#   marshal - Python marshal of plain dicts/lists, for internal snapshots
+JSON_FORMATS = ("pretty", "compact", "gzip", "lzma", "marshal")
+TEXT_JSON_FORMATS = ("pretty", "compact")
+
+# Format used by write_json when none is given
+DEFAULT_JSON_FORMAT = os.environ.get("AWE_JSON_FORMAT", "pretty")
+
+GZIP_MAGIC = b"\x1f\x8b"
+LZMA_MAGIC = b"\xfd7zXZ\x00"
+MARSHAL_MAGIC = b"AWEM\x01"
+
+# Files that must stay plain JSON text (they are streamed or read by offset)
+_text_only_files = set()
+
+# Optimistic attempts update_json makes before holding the lock throughout
+OPTIMISTIC_RETRIES = 1
+
+_update_stats = {"commits": 0, "conflicts": 0, "locked": 0}
+_update_stats_lock = threading.Lock()
+
+# Data files covered by backup_data/restore_data
+BACKUP_FILES = ["users.json", "products.json", "orders.json"]
+BACKUP_DIR = "data/backups"
 
 def ensure_data_directory():
     """Ensure the data directory exists"""
@@ -9,17 +53,123 @@ def ensure_data_directory():
     data_dir.mkdir(exist_ok=True)
     return data_dir
 
-def read_json(filename):
-    """Read JSON data from file with error handling"""
+def file_signature(file_path):
+    """Get a cheap (mtime_ns, size, inode) signature for a file"""
+    st = os.stat(file_path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def _cache_key(filename):
+    """Normalise a filename into a cache key"""
+    return os.path.abspath(filename)
+
+def thaw_json(data):
+    """Deep copy JSON data or a read-only view of it into plain dicts and lists
+
+    Much faster than copy.deepcopy for JSON documents.
+    """
+    if isinstance(data, (dict, MappingProxyType)):
+        return {key: thaw_json(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [thaw_json(value) for value in data]
+    return data
+
+def _freeze_json(data):
+    """Build a read-only view of JSON data (dicts become mapping proxies, lists tuples)"""
+    if isinstance(data, dict):
+        return MappingProxyType({key: _freeze_json(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return tuple(_freeze_json(value) for value in data)
+    return data
+
+def require_text_format(filename):
+    """Make write_json keep a file as plain JSON whatever the default format"""
+    _text_only_files.add(os.path.normpath(filename))
+
+def detect_json_format(raw):
+    """Get the on-disk format from the first bytes of a file
+
+    Plain JSON text is reported as "compact" whether it is indented or not.
+    """
+    if raw.startswith(GZIP_MAGIC):
+        return "gzip"
+    if raw.startswith(LZMA_MAGIC):
+        return "lzma"
+    if raw.startswith(MARSHAL_MAGIC):
+        return "marshal"
+    return "compact"
+
+def dumps_json(data, fmt=None):
+    """Serialize data to bytes in one of JSON_FORMATS"""
+    fmt = fmt or DEFAULT_JSON_FORMAT
+    if fmt == "pretty":
+        return json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8')
+    if fmt == "marshal":
+        return MARSHAL_MAGIC + marshal.dumps(data)
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if fmt == "compact":
+        return text
+    if fmt == "gzip":
+        return gzip.compress(text, compresslevel=6, mtime=0)
+    if fmt == "lzma":
+        return lzma.compress(text, preset=1)
+    raise ValueError(f"Unknown JSON format: {fmt}")
+
+def loads_json(raw):
+    """Parse bytes written by dumps_json in any format"""
+    fmt = detect_json_format(raw)
+    if fmt == "marshal":
+        return marshal.loads(raw[len(MARSHAL_MAGIC):])
+    if fmt == "gzip":
+        raw = gzip.decompress(raw)
+    elif fmt == "lzma":
+        raw = lzma.decompress(raw)
+    return json.loads(raw.decode('utf-8'))
+
+def _load_json_file(file_path):
+    """Parse a JSON file from disk in whatever format it was written"""
+    with open(file_path, 'rb') as file:
+        raw = file.read()
+    data = loads_json(raw) if raw.strip() else None
+    return data if data is not None else []
+
+def read_json(filename, copy=True):
+    """Read JSON data from file with error handling
+
+    Parsed documents are cached per process and re-validated with a stat
+    check, so unchanged files are never re-parsed. By default a private deep
+    copy is returned that the caller may mutate; pass copy=False to get a
+    shared read-only view (dicts are mapping proxies, lists are tuples).
+    """
     try:
         file_path = Path(filename)
-        if not file_path.exists():
+        key = _cache_key(file_path)
+        try:
+            signature = file_signature(file_path)
+        except FileNotFoundError:
             # Return empty list if file doesn't exist
+            invalidate_json_cache(filename)
             return []
         
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            return data if data is not None else []
+        with _json_cache_lock:
+            entry = _json_cache.get(key)
+            if entry is not None and entry["signature"] == signature:
+                _json_cache_stats["hits"] += 1
+            else:
+                entry = None
+        
+        if entry is None:
+            data = _load_json_file(file_path)
+            entry = {"signature": signature, "data": data, "view": None}
+            with _json_cache_lock:
+                _json_cache_stats["misses"] += 1
+                _json_cache[key] = entry
+        
+        if copy:
+            return thaw_json(entry["data"])
+        
+        if entry["view"] is None:
+            entry["view"] = _freeze_json(entry["data"])
+        return entry["view"]
     except json.JSONDecodeError as e:
         print(f"Error reading {filename}: Invalid JSON format - {e}")
         return []
@@ -27,20 +177,338 @@ def read_json(filename):
         print(f"Error reading {filename}: {e}")
         return []
 
-def write_json(filename, data):
-    """Write JSON data to file with error handling"""
+def invalidate_json_cache(filename=None):
+    """Drop one cached document, or the whole cache when no filename is given"""
+    with _json_cache_lock:
+        if filename is None:
+            dropped = len(_json_cache)
+            _json_cache.clear()
+        else:
+            dropped = 1 if _json_cache.pop(_cache_key(filename), None) is not None else 0
+        _json_cache_stats["invalidations"] += dropped
+
+def get_json_cache_stats():
+    """Get hit/miss counters for the JSON document cache"""
+    with _json_cache_lock:
+        stats = dict(_json_cache_stats)
+        stats["entries"] = len(_json_cache)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+# Bytes read per chunk when streaming a JSON array
+JSON_STREAM_CHUNK = 64 * 1024
+
+_json_decoder = json.JSONDecoder()
+
+def _parse_fields(fields):
+    """Split dotted field paths like "order.total" once, up front"""
+    return [tuple(path.split('.')) for path in fields] if fields else None
+
+def project_fields(record, fields):
+    """Copy only the given field paths out of a JSON record
+
+    fields are dotted paths ("order.user_id") or tuples of keys. Paths
+    missing from the record are left out of the result.
+    """
+    if not fields:
+        return record
+    result = {}
+    for path in fields:
+        keys = path.split('.') if isinstance(path, str) else path
+        value = record
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = result
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            target[keys[-1]] = value
+    return result
+
+def iter_json_array(source, fields=None, chunk_size=JSON_STREAM_CHUNK, offsets=False):
+    """Yield the elements of a JSON array file one at a time
+
+    source is a filename or an open text file. The file is read in chunks
+    and decoded incrementally with JSONDecoder.raw_decode, so memory use is
+    bounded by the largest single element rather than the whole file.
+    fields optionally projects each element (see project_fields). A missing
+    or empty file yields nothing, like read_json returning [].
+
+    With offsets=True, (byte_offset, byte_length, element) tuples are
+    yielded so an element can be read back later with a seek. An open file
+    must then be a UTF-8 file opened with newline=''.
+
+    A filename may point at any of JSON_FORMATS. Compressed files are
+    decompressed as they are streamed; marshal files are loaded whole.
+    Offsets are only available for plain JSON text.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        try:
+            with open(source, 'rb') as probe:
+                fmt = detect_json_format(probe.read(8))
+        except FileNotFoundError:
+            return
+        if fmt != "compact" and offsets:
+            raise ValueError(f"{source} is {fmt} data, offsets need plain JSON")
+        if fmt == "marshal":
+            paths = _parse_fields(fields)
+            for element in _load_json_file(source):
+                yield project_fields(element, paths)
+            return
+        opener = {"gzip": gzip.open, "lzma": lzma.open}.get(fmt, open)
+        with opener(source, 'rt', encoding='utf-8', newline='') as file:
+            yield from iter_json_array(file, fields, chunk_size, offsets)
+        return
+
+    paths = _parse_fields(fields)
+    buffer = source.read(chunk_size)
+    pos = 0
+    eof = not buffer
+    # Byte offset of buffer[mark], advanced lazily when offsets are wanted
+    mark = 0
+    mark_bytes = 0
+    # What the next non-whitespace token should be
+    state = "open"  # "open" -> "first" -> "separator" <-> "value"
+
+    while True:
+        # Skip whitespace, reading more when the buffer runs out
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            if offsets:
+                mark_bytes += len(buffer[mark:].encode('utf-8'))
+                mark = 0
+            buffer = source.read(chunk_size)
+            pos = 0
+            eof = not buffer
+        if pos >= len(buffer):
+            if state == "open":
+                return  # empty file
+            raise ValueError("Unexpected end of JSON array")
+
+        char = buffer[pos]
+        if state == "open":
+            if char != '[':
+                raise ValueError("JSON document is not an array")
+            pos += 1
+            state = "first"
+        elif state == "separator":
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"Unexpected {char!r} in JSON array")
+            pos += 1
+            state = "value"
+        elif state == "first" and char == ']':
+            return
+        else:
+            try:
+                value, end = _json_decoder.raw_decode(buffer, pos)
+                # A number may continue in the next chunk ("2" of "2.5"),
+                # so only trust it once the character after it is seen
+                complete = (eof or not isinstance(value, (int, float))
+                            or (end < len(buffer) and buffer[end] in ' \t\r\n,]'))
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if complete:
+                if offsets:
+                    mark_bytes += len(buffer[mark:pos].encode('utf-8'))
+                    start = mark_bytes
+                    mark_bytes += len(buffer[pos:end].encode('utf-8'))
+                    mark = end
+                    yield start, mark_bytes - start, project_fields(value, paths)
+                else:
+                    yield project_fields(value, paths)
+                pos = end
+                state = "separator"
+            else:
+                if offsets:
+                    mark_bytes += len(buffer[mark:pos].encode('utf-8'))
+                    mark = 0
+                # Keep the unparsed tail and at least double it, so a large
+                # element is re-decoded a logarithmic number of times
+                more = source.read(max(chunk_size, len(buffer) - pos))
+                buffer = buffer[pos:] + more
+                pos = 0
+                eof = not more
+
+def write_json(filename, data, fmt=None, durable=True):
+    """Write JSON data to file with error handling
+
+    fmt is one of JSON_FORMATS, DEFAULT_JSON_FORMAT when not given. With
+    durable=False the replace is still atomic but not fsynced, for derived
+    files that can be rebuilt if a crash loses them.
+    """
     try:
         # Ensure directory exists
         file_path = Path(filename)
         file_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent=4, ensure_ascii=False)
+        fmt = fmt or DEFAULT_JSON_FORMAT
+        if fmt not in TEXT_JSON_FORMATS and os.path.normpath(filename) in _text_only_files:
+            fmt = "compact"
+        
+        payload = None if fmt == "pretty" else dumps_json(data, fmt)
+        
+        # Write a temporary file next to the target and swap it in, so
+        # readers see either the old or the new document, never a torn one
+        temp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            if payload is None:
+                # Streamed straight to the file, the document is never held twice
+                with open(temp_path, 'w', encoding='utf-8') as file:
+                    json.dump(data, file, indent=4, ensure_ascii=False)
+                    file.flush()
+                    if durable:
+                        os.fsync(file.fileno())
+            else:
+                with open(temp_path, 'wb') as file:
+                    file.write(payload)
+                    file.flush()
+                    if durable:
+                        os.fsync(file.fileno())
+            invalidate_json_cache(file_path)
+            os.replace(temp_path, file_path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+        if durable:
+            _fsync_directory(file_path.parent)
+        invalidate_json_cache(file_path)
         return True
     except Exception as e:
         print(f"Error writing to {filename}: {e}")
         return False
 
+def _fsync_directory(directory):
+    """Make a rename in directory durable (not supported on Windows)"""
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+# Versioned documents
+
+def _version_path(filename):
+    return str(filename) + ".version"
+
+def read_version(filename):
+    """Get the version number of a document written by update_json (0 if never)"""
+    try:
+        with open(_version_path(filename), 'r', encoding='utf-8') as file:
+            return int(file.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+    except ValueError:
+        return None
+
+def _write_version(filename, version):
+    path = _version_path(filename)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(str(version))
+    os.replace(temp_path, path)
+
+def _commit(filename, data, version, fmt):
+    """Write a document and then its new version, under the document's lock
+
+    Readers take the version before the data, so whoever sees the new
+    version is sure to read the new data too.
+    """
+    if not write_json(filename, data, fmt):
+        return False
+    _write_version(filename, version)
+    return True
+
+def update_json(filename, mutate, fmt=None, retries=OPTIMISTIC_RETRIES, on_commit=None):
+    """Read-modify-write a JSON document as one transaction across processes
+
+    mutate(data) gets a private copy of the document, changes it in place
+    and returns (changed, result). Attempts are optimistic at first: the
+    version and document are read without the lock, and the write only
+    goes ahead, under the lock, if no one bumped the version meanwhile.
+    After `retries` conflicts the whole cycle runs under the lock, so a busy
+    file cannot starve a writer. on_commit(data, result) runs under the
+    lock after a successful write.
+
+    Returns (ok, result); ok is False only if the write failed.
+    """
+    for attempt in range(retries + 1):
+        locked = attempt == retries
+        with file_lock(filename) if locked else nullcontext():
+            # Version before data: a writer bumps it after replacing the file
+            version = read_version(filename)
+            data = read_json(filename)
+            changed, result = mutate(data)
+            if not changed:
+                return True, result
+            with file_lock(filename):
+                if not locked and (version is None or read_version(filename) != version):
+                    with _update_stats_lock:
+                        _update_stats["conflicts"] += 1
+                    continue
+                ok = _commit(filename, data, (version or 0) + 1, fmt)
+                if ok and on_commit:
+                    on_commit(data, result)
+            with _update_stats_lock:
+                _update_stats["commits"] += ok
+                _update_stats["locked"] += locked
+            return ok, result
+
+def apply_updates(filename, updates, fmt=None):
+    """Run several update_json mutations against a document with one write
+
+    updates is a list of (mutate, on_commit) pairs. The mutations run in
+    order on one copy of the document under its lock, and everything they
+    changed is committed with a single write and version bump. Returns one
+    (ok, result) per update, or the exception its mutate raised; a mutate
+    should raise before it changes anything.
+    """
+    with file_lock(filename):
+        version = read_version(filename)
+        data = read_json(filename)
+        results = []
+        changed = False
+        for mutate, _ in updates:
+            try:
+                mutated, result = mutate(data)
+            except Exception as e:
+                results.append(e)
+                continue
+            changed = changed or mutated
+            results.append(result)
+        ok = True
+        if changed:
+            ok = _commit(filename, data, (version or 0) + 1, fmt)
+            if ok:
+                for (_, on_commit), result in zip(updates, results):
+                    if on_commit and not isinstance(result, Exception):
+                        on_commit(data, result)
+    with _update_stats_lock:
+        _update_stats["commits"] += ok and changed
+        _update_stats["locked"] += 1
+    return [result if isinstance(result, Exception) else (ok, result) for result in results]
+
+def replace_json(filename, data, fmt=None):
+    """Overwrite a versioned document wholesale, e.g. when restoring a backup"""
+    with file_lock(filename):
+        return _commit(filename, data, (read_version(filename) or 0) + 1, fmt)
+
+def get_update_stats():
+    """Get commit and conflict counters for update_json in this process"""
+    with _update_stats_lock:
+        return dict(_update_stats)
+
 def initialize_default_data():
     """Initialize default data files if they don't exist"""
     ensure_data_directory()
@@ -179,54 +647,90 @@ def initialize_default_data():
         print("❌ Some data files failed to initialize")
         return False
 
-def backup_data():
-    """Create backup of all data files"""
+def backup_data(compress=True, prune=True):
+    """Create an incremental backup of all data files
+
+    Only chunks that are not in the backup store yet are written, so
+    backing up unchanged data costs a manifest. Returns the backup ID,
+    or None if the backup failed.
+    """
     try:
-        backup_dir = Path("data/backups")
-        backup_dir.mkdir(exist_ok=True)
+        from utils.backup_store import create_backup, prune_backups
+        from utils.write_behind import flush_writes
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Fold journaled orders into orders.json so the backup is complete
+        from utils.order_store import compact_orders
+        flush_writes()
+        compact_orders()
         
-        data_files = ["users.json", "products.json", "orders.json"]
+        data_files = [f"data/{filename}" for filename in BACKUP_FILES]
+        backup_id, stats = create_backup(data_files, compress)
+        if backup_id is None:
+            return None
         
-        for filename in data_files:
-            source_path = Path(f"data/{filename}")
-            if source_path.exists():
-                backup_path = backup_dir / f"{filename.replace('.json', '')}_{timestamp}.json"
-                
-                with open(source_path, 'r', encoding='utf-8') as source:
-                    data = json.load(source)
-                
-                with open(backup_path, 'w', encoding='utf-8') as backup:
-                    json.dump(data, backup, indent=4, ensure_ascii=False)
-                
-                print(f"✅ Backed up {filename} to {backup_path}")
+        print(f"✅ Backup {backup_id}: {stats['files']} files, "
+              f"{stats['unchanged_files']} unchanged, {stats['new_chunks']} new chunks "
+              f"({stats['bytes_written']} bytes written)")
         
-        return True
+        if prune:
+            removed_backups, removed_chunks = prune_backups()
+            if removed_backups or removed_chunks:
+                print(f"🧹 Pruned {removed_backups} old backups and {removed_chunks} chunks")
+        
+        return backup_id
         
     except Exception as e:
         print(f"❌ Backup failed: {e}")
-        return False
+        return None
+
+def _restore_file(filename, data):
+    """Put restored data in place of one data file"""
+    if filename == "orders.json":
+        # Journaled orders are newer than the backup
+        from utils.order_store import replace_orders
+        if not replace_orders(data):
+            return False
+        # Sales aggregates must match the restored orders
+        from utils.storage import JsonStorage
+        JsonStorage().rebuild_sales_aggregates()
+        return True
+    return replace_json(f"data/{filename}", data)
 
 def restore_data(backup_timestamp):
-    """Restore data from backup"""
+    """Restore data from a backup, given its ID (the backup's timestamp)"""
     try:
-        backup_dir = Path("data/backups")
+        from utils.backup_store import load_manifest, read_backup_file
+        from utils.write_behind import flush_writes
+        
+        # Queued writes would land on top of the restored files
+        flush_writes()
+        
+        manifest = load_manifest(backup_timestamp)
+        if manifest is not None:
+            for filename in BACKUP_FILES:
+                if filename not in manifest['files']:
+                    print(f"⚠️ {filename} is not in backup {backup_timestamp}")
+                    continue
+                data = loads_json(read_backup_file(manifest, filename))
+                if not _restore_file(filename, data):
+                    return False
+                print(f"✅ Restored {filename} from backup {backup_timestamp}")
+            return True
+        
+        # Full copies made before backups became incremental
+        backup_dir = Path(BACKUP_DIR)
         if not backup_dir.exists():
             print("❌ No backups directory found")
             return False
         
-        data_files = ["users.json", "products.json", "orders.json"]
-        
-        for filename in data_files:
+        for filename in BACKUP_FILES:
             backup_filename = filename.replace('.json', f'_{backup_timestamp}.json')
             backup_path = backup_dir / backup_filename
             
             if backup_path.exists():
-                with open(backup_path, 'r', encoding='utf-8') as backup:
-                    data = json.load(backup)
-                
-                write_json(f"data/{filename}", data)
+                data = _load_json_file(backup_path)
+                if not _restore_file(filename, data):
+                    return False
                 print(f"✅ Restored {filename} from {backup_filename}")
             else:
                 print(f"⚠️ Backup file {backup_filename} not found")
@@ -238,77 +742,28 @@ def restore_data(backup_timestamp):
         return False
 
 def get_data_stats():
-    """Get statistics about data files"""
-    stats = {}
-    
+    """Get statistics about data files
+
+    Served from counters the storage layer keeps up to date, see
+    utils.stats for the definition of each figure.
+    """
     try:
-        # Users stats
-        users = read_json("data/users.json")
-        stats['users'] = {
-            'total': len(users),
-            'admin': len([u for u in users if u.get('role') == 'admin']),
-            'customers': len([u for u in users if u.get('role') == 'customer'])
-        }
-        
-        # Products stats
-        products = read_json("data/products.json")
-        stats['products'] = {
-            'total': len(products),
-            'in_stock': len([p for p in products if p.get('stock', 0) > 0]),
-            'low_stock': len([p for p in products if 0 < p.get('stock', 0) <= 5]),
-            'out_of_stock': len([p for p in products if p.get('stock', 0) == 0])
-        }
-        
-        # Orders stats
-        orders = read_json("data/orders.json")
-        stats['orders'] = {
-            'total': len(orders),
-            'total_revenue': sum(order.get('order', {}).get('total', 0) for order in orders)
-        }
-        
+        from utils.storage import get_storage
+        return get_storage().data_stats()
     except Exception as e:
         print(f"Error getting stats: {e}")
-    
-    return stats
+        return {}
 
-def validate_data_integrity():
-    """Validate data integrity across all files"""
-    issues = []
-    
+def validate_data_integrity(processes=None):
+    """Validate data integrity across all files, returns a list of issues
+
+    See utils.integrity.check_integrity for the full report.
+    """
     try:
-        # Check users
-        users = read_json("data/users.json")
-        for user in users:
-            if not user.get('username'):
-                issues.append("User found without username")
-            if not user.get('role'):
-                issues.append(f"User {user.get('username', 'unknown')} has no role")
-        
-        # Check products
-        products = read_json("data/products.json")
-        product_ids = []
-        for product in products:
-            pid = product.get('product_id')
-            if not pid:
-                issues.append("Product found without product_id")
-            elif pid in product_ids:
-                issues.append(f"Duplicate product_id: {pid}")
-            else:
-                product_ids.append(pid)
-        
-        # Check orders
-        orders = read_json("data/orders.json")
-        for i, order_data in enumerate(orders):
-            order = order_data.get('order', {})
-            if not order.get('order_id'):
-                issues.append(f"Order {i} has no order_id")
-            if not order.get('user_id'):
-                issues.append(f"Order {i} has no user_id")
-        
+        from utils.integrity import check_integrity
+        return check_integrity(processes)["issues"]
     except Exception as e:
-        issues.append(f"Error during validation: {e}")
-    
-    return issues
+        return [f"Error during validation: {e}"]
 
 # Legacy function names for backward compatibility
 def create_default_data():
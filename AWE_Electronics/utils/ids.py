@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+# Order, invoice and receipt ids use the UUID version 7 layout: 48 bits of
+# Unix time in milliseconds, the version nibble, a 12 bit counter and 62
+# random bits, written as the usual 36 character UUID string. Such strings
+# sort in creation order, so stored records can be searched by time with a
+# binary search on their ids. Ids made before these are random uuid4s and
+# carry no time; sort_key falls back to the record's dates for them.
+ID_VERSION = 7
+COUNTER_BITS = 12
+RANDOM_BITS = 62
+
+_COUNTER_MAX = (1 << COUNTER_BITS) - 1
+_RANDOM_MASK = (1 << RANDOM_BITS) - 1
+_VARIANT = 0b10 << RANDOM_BITS
+
+# Characters of the human-readable document numbers
+_NUMBER_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+NUMBER_CODE_LENGTH = 8
+
+class IdGenerator:
+    """Thread-safe source of time-ordered ids, increasing within a process
+
+    Ids made in the same millisecond take the next counter value. When the
+    counter runs out, or the clock steps back, the last millisecond is
+    carried forward instead, so an id never sorts before an earlier one.
+    """
+
+    def __init__(self, clock=time.time_ns):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._counter = 0
+
+    def next_time(self):
+        """Get the (milliseconds, counter) pair of the next id"""
+        with self._lock:
+            ms = self._clock() // 1_000_000
+            if ms > self._last_ms:
+                self._last_ms = ms
+                self._counter = 0
+            elif self._counter < _COUNTER_MAX:
+                self._counter += 1
+            else:
+                self._last_ms += 1
+                self._counter = 0
+            return self._last_ms, self._counter
+
+    def new_id(self):
+        """Make a new time-ordered id string"""
+        ms, counter = self.next_time()
+        random_bits = int.from_bytes(os.urandom(8), "big") & _RANDOM_MASK
+        value = (ms << 80) | (ID_VERSION << 76) | (counter << 64) | _VARIANT | random_bits
+        digits = f"{value:032x}"
+        return (f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-"
+                f"{digits[16:20]}-{digits[20:]}")
+
+_generator = IdGenerator()
+
+def new_id():
+    """Make a new time-ordered id from the shared generator"""
+    return _generator.new_id()
+
+def is_time_ordered(record_id):
+    """Check if an id carries its creation time (version 7 layout)"""
+    return (isinstance(record_id, str) and len(record_id) == 36
+            and record_id[14] == "7" and record_id[8] == "-")
+
+def id_timestamp_ms(record_id):
+    """Get the Unix time in milliseconds an id was made at, or None for random ids"""
+    if not is_time_ordered(record_id):
+        return None
+    return int(record_id[:8] + record_id[9:13], 16)
+
+def id_counter(record_id):
+    """Get the within-millisecond counter of a time-ordered id"""
+    return int(record_id[15:18], 16)
+
+def id_datetime(record_id):
+    """Get the local time an id was made at, or None for random ids"""
+    ms = id_timestamp_ms(record_id)
+    if ms is None:
+        return None
+    seconds, ms = divmod(ms, 1000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=ms * 1000)
+
+def timestamp_ms(when):
+    """Unix milliseconds of a datetime, an ISO date string or a number of seconds"""
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when)
+    if isinstance(when, datetime):
+        # Whole seconds and milliseconds apart, so float error cannot move it a millisecond
+        return int(when.replace(microsecond=0).timestamp()) * 1000 + when.microsecond // 1000
+    return int(when * 1000)
+
+def iso_time(when):
+    """ISO string of a datetime or ISO date string, as stored in *_date fields"""
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when)
+    return when.isoformat()
+
+def id_floor(when):
+    """Smallest key of anything made at or after when
+
+    The id prefix holding the milliseconds; every time-ordered id made at
+    or after that time sorts at or after it, every earlier one before it.
+    """
+    digits = f"{timestamp_ms(when):012x}"
+    return f"{digits[:8]}-{digits[8:]}"
+
+# Key of old records with a random id and no readable date anywhere. It sorts
+# before every other key, so they count as the oldest records: only a range
+# without a lower bound (e.g. order_store.orders_since(None)) includes them.
+UNDATED_KEY = ""
+
+def sort_key(record_id, *dates):
+    """Time key of a stored document
+
+    Its id if that is time-ordered, else the floor of the first of dates
+    that parses, else UNDATED_KEY.
+    """
+    if is_time_ordered(record_id):
+        return record_id
+    for date in dates:
+        if not date:
+            continue
+        try:
+            return id_floor(date)
+        except (ValueError, TypeError, OverflowError, OSError):
+            continue
+    return UNDATED_KEY
+
+def short_id(record_id):
+    """Short form of an id for display
+
+    The start of a time-ordered id is its timestamp, shared by everything
+    made in the same minute, so those are shortened to their random end.
+    """
+    if is_time_ordered(record_id):
+        return record_id[-8:]
+    return record_id[:8]
+
+def document_number(record_id, prefix):
+    """Human-readable number of a document, e.g. INV-20261018-04J5Z2KG
+
+    For a time-ordered id the date is the id's own and the code encodes the
+    millisecond of the day and the counter, so numbers are unique among the
+    ids of one generator and sort by time within a day. Random ids keep the
+    old form: today's date and the start of the id.
+    """
+    made = id_datetime(record_id)
+    if made is None:
+        return f"{prefix}-{datetime.now():%Y%m%d}-{record_id[:8].upper()}"
+    midnight = made.replace(hour=0, minute=0, second=0, microsecond=0)
+    ms_of_day = id_timestamp_ms(record_id) - timestamp_ms(midnight)
+    value = (ms_of_day << COUNTER_BITS) | id_counter(record_id)
+    code = []
+    for _ in range(NUMBER_CODE_LENGTH):
+        value, digit = divmod(value, len(_NUMBER_DIGITS))
+        code.append(_NUMBER_DIGITS[digit])
+    return f"{prefix}-{made:%Y%m%d}-{''.join(reversed(code))}"
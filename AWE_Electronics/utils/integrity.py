@@ -0,0 +1,207 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.file_handler import iter_json_array
+from utils.storage import USER_FILE, PRODUCT_FILE
+from utils.user_directory import normalize_email
+
+# Orders placed in guest mode (gui/start_gui.py) carry this user_id, which
+# has no users.json entry
+GUEST_USER_IDS = {"Guest User"}
+
+# Messages kept per check in the report; every problem is still counted
+MAX_ISSUES_PER_CHECK = 50
+
+ORDER_CHECK_FIELDS = ["version", "order.order_id", "order.user_id", "order.items",
+                      "invoice.order_id", "invoice.invoice_id",
+                      "receipt.receipt_id", "receipt.order_id", "receipt.invoice_id"]
+
+class _Findings:
+    """Problem counts per check, with the first few messages of each"""
+
+    def __init__(self):
+        self.counts = {}
+        self.messages = {}
+
+    def add(self, check, message):
+        count = self.counts.get(check, 0) + 1
+        self.counts[check] = count
+        if count <= MAX_ISSUES_PER_CHECK:
+            self.messages.setdefault(check, []).append(message)
+
+    def result(self, name, records, started):
+        return {"name": name, "records": records, "counts": self.counts,
+                "messages": self.messages, "seconds": time.perf_counter() - started}
+
+def _scan_users(path=USER_FILE):
+    """One pass over users.json: required fields and duplicate usernames/emails"""
+    started = time.perf_counter()
+    findings = _Findings()
+    usernames = set()
+    emails = set()
+    records = 0
+    for user in iter_json_array(path, fields=["username", "role", "email"]):
+        records += 1
+        username = user.get('username')
+        if not username:
+            findings.add("user_without_username", "User found without username")
+        elif username in usernames:
+            findings.add("duplicate_username", f"Duplicate username: {username}")
+        else:
+            usernames.add(username)
+        if not user.get('role'):
+            findings.add("user_without_role", f"User {username or 'unknown'} has no role")
+        email = normalize_email(user.get('email'))
+        if email:
+            if email in emails:
+                findings.add("duplicate_email", f"Duplicate email: {email}")
+            emails.add(email)
+    result = findings.result("users", records, started)
+    result["ids"] = usernames
+    return result
+
+def _scan_products(path=PRODUCT_FILE):
+    """One pass over products.json: product IDs present and unique, stock valid"""
+    started = time.perf_counter()
+    findings = _Findings()
+    product_ids = set()
+    records = 0
+    for product in iter_json_array(path, fields=["product_id", "stock"]):
+        records += 1
+        pid = product.get('product_id')
+        if not pid:
+            findings.add("product_without_id", "Product found without product_id")
+        elif pid in product_ids:
+            findings.add("duplicate_product_id", f"Duplicate product_id: {pid}")
+        else:
+            product_ids.add(pid)
+        stock = product.get('stock', 0)
+        if not isinstance(stock, (int, float)) or isinstance(stock, bool):
+            findings.add("invalid_stock", f"Product {pid} has non-numeric stock {stock!r}")
+        elif stock < 0:
+            findings.add("negative_stock", f"Product {pid} has negative stock")
+    result = findings.result("products", records, started)
+    result["ids"] = product_ids
+    return result
+
+def _note_reference(references, key, order_id):
+    """Count a reference and remember the first order that made it"""
+    entry = references.get(key)
+    if entry is None:
+        references[key] = [order_id, 1]
+    else:
+        entry[1] += 1
+
+def _scan_orders():
+    """One pass over the order store: ids and invoice/receipt consistency
+
+    User and product references are collected rather than checked, since
+    users.json and products.json may be scanned by another process.
+    """
+    from utils.order_store import iter_orders
+
+    started = time.perf_counter()
+    findings = _Findings()
+    order_ids = set()
+    user_refs = {}
+    product_refs = {}
+    records = 0
+    for i, record in enumerate(iter_orders(fields=ORDER_CHECK_FIELDS)):
+        records += 1
+        order = record.get('order', {})
+        order_id = order.get('order_id')
+        label = order_id or f"#{i}"
+        if not order_id:
+            findings.add("order_without_id", f"Order {i} has no order_id")
+        elif order_id in order_ids:
+            findings.add("duplicate_order_id", f"Duplicate order_id: {order_id}")
+        else:
+            order_ids.add(order_id)
+
+        user_id = order.get('user_id')
+        if not user_id:
+            findings.add("order_without_user", f"Order {label} has no user_id")
+        elif user_id not in GUEST_USER_IDS:
+            _note_reference(user_refs, user_id, label)
+        for item in order.get('items', []):
+            if item.get('product_id'):
+                _note_reference(product_refs, item['product_id'], label)
+            else:
+                findings.add("order_item_without_product",
+                             f"Order {label} has an item without product_id")
+
+        # Version 2 records leave out ids that equal the order's
+        derived = order_id if record.get('version', 1) >= 2 else None
+        # Projection drops a document that has none of the fields asked for,
+        # so an empty one here means no invoice_id or receipt_id
+        invoice = record.get('invoice', {})
+        receipt = record.get('receipt', {})
+        if not invoice.get('invoice_id'):
+            findings.add("order_without_invoice", f"Order {label} has no invoice_id")
+        if not receipt.get('receipt_id'):
+            findings.add("order_without_receipt", f"Order {label} has no receipt_id")
+        if invoice.get('order_id', derived) not in (None, order_id):
+            findings.add("invoice_order_mismatch",
+                         f"Invoice of order {label} refers to order {invoice.get('order_id')}")
+        if receipt.get('order_id', derived) not in (None, order_id):
+            findings.add("receipt_order_mismatch",
+                         f"Receipt of order {label} refers to order {receipt.get('order_id')}")
+        invoice_id = invoice.get('invoice_id')
+        if receipt.get('invoice_id') not in (None, invoice_id):
+            findings.add("receipt_invoice_mismatch",
+                         f"Receipt of order {label} refers to invoice {receipt.get('invoice_id')}, "
+                         f"not {invoice_id}")
+    result = findings.result("orders", records, started)
+    result["user_refs"] = user_refs
+    result["product_refs"] = product_refs
+    return result
+
+def _check_references(findings, references, known, check, kind):
+    """Report referenced ids that do not exist"""
+    for key, (first_order, count) in references.items():
+        if key not in known:
+            findings.add(check, f"{count} order(s) refer to unknown {kind} {key!r} "
+                                f"(first: order {first_order})")
+
+def check_integrity(processes=None):
+    """Validate the data files and the references between them
+
+    Each file is streamed once and checked against hash sets. With
+    processes > 1 the users, products and orders scans run in a process
+    pool. Returns a report dict: "ok", "issue_count", per-check "counts",
+    the first messages of each check in "issues", and per-file record
+    counts and timings.
+    """
+    started = time.perf_counter()
+    scans = (_scan_users, _scan_products, _scan_orders)
+    if processes and processes > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(scans))) as pool:
+            users, products, orders = [f.result() for f in [pool.submit(scan) for scan in scans]]
+    else:
+        users, products, orders = [scan() for scan in scans]
+
+    references = _Findings()
+    _check_references(references, orders["user_refs"], users["ids"],
+                      "order_unknown_user", "user")
+    _check_references(references, orders["product_refs"], products["ids"],
+                      "order_unknown_product", "product")
+
+    counts = {}
+    issues = []
+    for part in (users["counts"], products["counts"], orders["counts"], references.counts):
+        counts.update(part)
+    for part in (users["messages"], products["messages"], orders["messages"],
+                 references.messages):
+        for messages in part.values():
+            issues.extend(messages)
+    issue_count = sum(counts.values())
+    return {
+        "ok": issue_count == 0,
+        "issue_count": issue_count,
+        "counts": counts,
+        "issues": issues,
+        "files": {scan["name"]: {"records": scan["records"], "seconds": round(scan["seconds"], 4)}
+                  for scan in (users, products, orders)},
+        "processes": processes or 1,
+        "seconds": round(time.perf_counter() - started, 4)
+    }
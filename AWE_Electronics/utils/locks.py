@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Number of locks product IDs are spread over for in-process locking
+LOCK_STRIPES = 64
+
+_held = threading.local()
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive cross-process lock on <path>.lock
+
+    The lock is advisory: every process touching the file must take it.
+    It is reentrant within a thread, so a locked section can call other
+    functions that lock the same file.
+    """
+    lock_path = os.path.abspath(str(path) + ".lock")
+    depths = getattr(_held, "depths", None)
+    if depths is None:
+        depths = _held.depths = {}
+    if depths.get(lock_path):
+        depths[lock_path] += 1
+        try:
+            yield
+        finally:
+            depths[lock_path] -= 1
+        return
+
+    Path(lock_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a+') as handle:
+        _lock_handle(handle)
+        depths[lock_path] = 1
+        try:
+            yield
+        finally:
+            depths[lock_path] = 0
+            _unlock_handle(handle)
+
+def _lock_handle(handle):
+    """Block until the OS-level lock on an open lock file is ours"""
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        return
+    handle.seek(0)
+    while True:
+        try:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK gives up after ~10 seconds, keep waiting
+            time.sleep(0.05)
+
+def _unlock_handle(handle):
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+class LockStripes:
+    """Fixed pool of locks that keys (such as product IDs) are hashed onto
+
+    Two operations on different keys usually get different locks and can
+    run at the same time, without keeping one lock per key around.
+    """
+
+    def __init__(self, stripes=LOCK_STRIPES):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def _indexes(self, keys):
+        """Stripe indexes for a set of keys in a fixed global order"""
+        return sorted({hash(key) % len(self._locks) for key in keys})
+
+    @contextmanager
+    def hold(self, keys):
+        """Hold the locks for every key, acquired in order to avoid deadlock"""
+        acquired = []
+        try:
+            for index in self._indexes(keys):
+                self._locks[index].acquire()
+                acquired.append(index)
+            yield
+        finally:
+            for index in reversed(acquired):
+                self._locks[index].release()
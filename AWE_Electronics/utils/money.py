@@ -0,0 +1,188 @@
+import operator
+from decimal import Decimal, ROUND_HALF_UP
+
+try:
+    import numpy
+except ImportError:  # Line items are summed in plain Python instead
+    numpy = None
+
+# Money is held and stored as whole cents. Prices stay dollars (they are
+# what the catalogue edits and displays) and are converted once per line.
+CURRENCY = "AUD"
+
+# Orders with at least this many lines are summed with NumPy when available;
+# below it the conversion to arrays costs more than the loop
+VECTOR_SUM_MIN_LINES = 256
+
+# Money fields of stored documents. Records store <field>_cents ints;
+# records written before that store <field> as float dollars, which
+# stored_cents still reads.
+MONEY_FIELDS = ("total", "amount", "subtotal", "tax_amount", "total_amount",
+                "amount_paid", "discount_amount", "refund_amount")
+
+_ONE = Decimal(1)
+
+def to_cents(amount):
+    """Convert dollars (float, int, str or Money) to whole cents, rounding half up"""
+    if type(amount) is float:
+        scaled = amount * 100
+        cents = round(scaled)
+        # Prices with at most two decimals land next to a whole cent; only
+        # amounts near a half cent need the exact decimal rounding below
+        if -0.49 < scaled - cents < 0.49:
+            return cents
+    elif isinstance(amount, Money):
+        return amount.cents
+    elif isinstance(amount, int):
+        return amount * 100
+    # Through the shortest repr, so 1.005 is 1.005 and not 1.00499999...
+    return int((Decimal(str(amount)) * 100).quantize(_ONE, ROUND_HALF_UP))
+
+def from_cents(cents):
+    """Convert cents to float dollars, for display and float-expecting callers"""
+    return cents / 100
+
+def format_money(cents):
+    """Format cents as $1234.56"""
+    return f"${cents / 100:.2f}"
+
+def percent_of(cents, rate):
+    """rate (e.g. 0.10) of an amount in cents, rounded half up to a cent"""
+    return int((Decimal(cents) * Decimal(str(rate))).quantize(_ONE, ROUND_HALF_UP))
+
+def average_cents(total_cents, count):
+    """Mean of count amounts totalling total_cents, rounded half up to a cent (0 if none)"""
+    if not count:
+        return 0
+    return int((Decimal(total_cents) / count).quantize(_ONE, ROUND_HALF_UP))
+
+def line_total_cents(item):
+    """Cents of one line item: unit price times quantity"""
+    return to_cents(item.get('price', 0)) * item.get('quantity', 0)
+
+def sum_line_items(prices_cents, quantities):
+    """Sum of price * quantity over parallel sequences of ints, exactly"""
+    if numpy is not None and len(prices_cents) >= VECTOR_SUM_MIN_LINES:
+        return int(numpy.dot(numpy.asarray(prices_cents, dtype=numpy.int64),
+                             numpy.asarray(quantities, dtype=numpy.int64)))
+    return sum(map(operator.mul, prices_cents, quantities))
+
+def items_total_cents(items):
+    """Total of a list of line items ({price, quantity}) in cents"""
+    return sum_line_items([to_cents(item.get('price', 0)) for item in items],
+                          [item.get('quantity', 0) for item in items])
+
+def stored_cents(document, field, default=0):
+    """Read a money field of a stored document as cents, from either format"""
+    cents = document.get(field + "_cents")
+    if cents is not None:
+        return cents
+    amount = document.get(field)
+    if amount is None:
+        return default
+    return to_cents(amount)
+
+def cents_fields(document):
+    """Copy of a document with legacy float money fields converted to cents"""
+    converted = {}
+    for key, value in document.items():
+        if key in MONEY_FIELDS and value is not None and key + "_cents" not in document:
+            converted[key + "_cents"] = to_cents(value)
+        elif key not in MONEY_FIELDS:
+            converted[key] = value
+    return converted
+
+def money_property(field):
+    """Float dollars attribute backed by a <field>_cents attribute
+
+    Keeps attributes like invoice.total_amount working for display code
+    while the arithmetic happens on the ints.
+    """
+    slot = field + "_cents"
+
+    def get(self):
+        return getattr(self, slot) / 100
+
+    def set(self, amount):
+        setattr(self, slot, to_cents(amount))
+
+    return property(get, set, doc=f"{field} in dollars (stored as {slot})")
+
+class Money:
+    """An amount of whole cents in one currency"""
+
+    __slots__ = ("cents", "currency")
+
+    def __init__(self, cents=0, currency=CURRENCY):
+        self.cents = int(cents)
+        self.currency = currency
+
+    @classmethod
+    def from_dollars(cls, amount, currency=CURRENCY):
+        return cls(to_cents(amount), currency)
+
+    def _check(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        if other.currency != self.currency:
+            raise ValueError(f"Cannot combine {self.currency} and {other.currency}")
+        return other
+
+    def __add__(self, other):
+        if isinstance(other, int) and other == 0:
+            # So that sum() works without a start value
+            return self
+        other = self._check(other)
+        if other is NotImplemented:
+            return other
+        return Money(self.cents + other.cents, self.currency)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = self._check(other)
+        if other is NotImplemented:
+            return other
+        return Money(self.cents - other.cents, self.currency)
+
+    def __mul__(self, quantity):
+        if not isinstance(quantity, int):
+            return NotImplemented
+        return Money(self.cents * quantity, self.currency)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-self.cents, self.currency)
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.cents == other.cents and self.currency == other.currency
+        return NotImplemented
+
+    def __lt__(self, other):
+        other = self._check(other)
+        if other is NotImplemented:
+            return other
+        return self.cents < other.cents
+
+    def __le__(self, other):
+        other = self._check(other)
+        if other is NotImplemented:
+            return other
+        return self.cents <= other.cents
+
+    def __hash__(self):
+        return hash((self.cents, self.currency))
+
+    def __bool__(self):
+        return self.cents != 0
+
+    def __float__(self):
+        return self.cents / 100
+
+    def __str__(self):
+        return format_money(self.cents)
+
+    def __repr__(self):
+        return f"Money({self.cents}, '{self.currency}')"
@@ -0,0 +1,276 @@
+import bisect
+import heapq
+import itertools
+import json
+import os
+
+from utils.file_handler import loads_json, write_json, iter_json_array, file_signature
+from utils.ids import sort_key
+from utils.order_records import RECORD_DATE_FIELDS, record_dates
+
+# Internal snapshot, stored in the binary marshal format
+ORDER_INDEX_FILE = "data/orders_by_user.idx"
+
+# Bumped when the stored layout or the time keys change, to rebuild old files
+ORDER_INDEX_VERSION = 2
+
+def _signature_or_none(path):
+    try:
+        return list(file_signature(path))
+    except FileNotFoundError:
+        return None
+
+def _read_range(handle, offset, length):
+    handle.seek(offset)
+    return json.loads(handle.read(length))
+
+def _record_key(record):
+    """Time key of a stored record, see utils.ids.sort_key"""
+    return sort_key(record.get('order', {}).get('order_id'), *record_dates(record))
+
+class Timeline:
+    """Record locations sorted by time key, for binary searches by date
+
+    keys and locations are parallel lists. Records arrive in time order,
+    so adding one is an append; one that arrives late (another process's
+    clock, a merged backup) is inserted in its place.
+    """
+
+    def __init__(self, keys=None, locations=None):
+        self.keys = keys if keys is not None else []
+        self.locations = locations if locations is not None else []
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Build from (key, location) pairs in file order"""
+        keys = [key for key, _ in entries]
+        if any(keys[i] > keys[i + 1] for i in range(len(keys) - 1)):
+            entries = sorted(entries, key=lambda entry: entry[0])
+            keys = [key for key, _ in entries]
+        return cls(keys, [location for _, location in entries])
+
+    def add(self, key, location):
+        if not self.keys or key >= self.keys[-1]:
+            self.keys.append(key)
+            self.locations.append(location)
+            return
+        position = bisect.bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.locations.insert(position, location)
+
+    def between(self, start_key, end_key=None):
+        """(key, location) pairs with start_key <= key < end_key, oldest first"""
+        first = bisect.bisect_left(self.keys, start_key)
+        last = len(self.keys) if end_key is None else bisect.bisect_left(self.keys, end_key)
+        return zip(self.keys[first:last], self.locations[first:last])
+
+    def newest_first(self):
+        """(key, location) pairs, newest first"""
+        return zip(reversed(self.keys), reversed(self.locations))
+
+    def __len__(self):
+        return len(self.keys)
+
+class OrderIndex:
+    """Secondary indexes from user_id, and from time, to the location of orders
+
+    A location is (source, offset, length): the byte range of the record in
+    orders.json ("snapshot") or in the order journal ("journal"). The
+    snapshot part is persisted in orders_by_user.idx together with the
+    signature of the orders.json it describes, and is rebuilt when that file
+    is rewritten (compaction, restore). The journal part is re-read from the
+    journal, which compaction keeps small, and appends made by save_order
+    are recorded as they happen. The time index is a Timeline of the same
+    locations keyed by each order's time-ordered id (see utils.ids), so
+    date ranges are found by binary search.
+
+    Not thread safe on its own - order_store calls it under its store lock.
+    """
+
+    def __init__(self, order_file, journal_file, index_file=ORDER_INDEX_FILE):
+        self.order_file = order_file
+        self.journal_file = journal_file
+        self.index_file = index_file
+        self._snapshot_signature = None
+        self._snapshot = None
+        self._journal = {}
+        self._snapshot_timeline = Timeline()
+        self._journal_timeline = Timeline()
+        self._journal_inode = None
+        self._journal_bytes = 0
+
+    # Snapshot part
+
+    def _load_snapshot(self, signature):
+        """Load the persisted index if it matches orders.json, else rebuild it"""
+        stored = self._read_index_file()
+        if (isinstance(stored, dict) and stored.get('snapshot') == signature
+                and stored.get('version') == ORDER_INDEX_VERSION
+                and isinstance(stored.get('users'), dict)
+                and isinstance(stored.get('timeline'), list)):
+            self._snapshot = stored['users']
+            keys, offsets = stored['timeline']
+            self._snapshot_timeline = Timeline(keys, offsets)
+        else:
+            self._snapshot, self._snapshot_timeline = self._scan_snapshot()
+            timeline = [self._snapshot_timeline.keys, self._snapshot_timeline.locations]
+            write_json(self.index_file, {'version': ORDER_INDEX_VERSION, 'snapshot': signature,
+                                         'users': self._snapshot, 'timeline': timeline},
+                       fmt="marshal")
+        self._snapshot_signature = signature
+
+    def _read_index_file(self):
+        """Read the persisted index, or None if it is missing or unreadable"""
+        try:
+            with open(self.index_file, 'rb') as file:
+                return loads_json(file.read())
+        except (OSError, ValueError, EOFError):
+            return None
+
+    def _scan_snapshot(self):
+        """Index every record in orders.json by user_id and by time"""
+        by_user = {}
+        by_time = []
+        records = iter_json_array(self.order_file, offsets=True,
+                                  fields=["order.user_id", "order.order_id", *RECORD_DATE_FIELDS])
+        for offset, length, record in records:
+            user_id = record.get('order', {}).get('user_id')
+            by_user.setdefault(user_id, []).append((offset, length))
+            by_time.append((_record_key(record), (offset, length)))
+        return by_user, Timeline.from_entries(by_time)
+
+    # Journal part
+
+    def _scan_journal(self):
+        """Index journal records appended since the last scan"""
+        try:
+            journal = open(self.journal_file, 'rb')
+        except FileNotFoundError:
+            self._journal = {}
+            self._journal_timeline = Timeline()
+            self._journal_inode = None
+            self._journal_bytes = 0
+            return
+        with journal:
+            st = os.fstat(journal.fileno())
+            if st.st_ino != self._journal_inode or st.st_size < self._journal_bytes:
+                # Journal was compacted away and started again
+                self._journal = {}
+                self._journal_timeline = Timeline()
+                self._journal_inode = st.st_ino
+                self._journal_bytes = 0
+            journal.seek(self._journal_bytes)
+            offset = self._journal_bytes
+            for line in journal:
+                if not line.endswith(b"\n"):
+                    # Write still in progress
+                    break
+                self._add_journal_line(line, offset)
+                offset += len(line)
+            self._journal_bytes = offset
+
+    def _add_journal_line(self, line, offset):
+        if not line.strip():
+            return
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            return
+        user_id = record.get('order', {}).get('user_id')
+        self._journal.setdefault(user_id, []).append((offset, len(line)))
+        self._journal_timeline.add(_record_key(record), (offset, len(line)))
+
+    def refresh(self):
+        """Bring the index up to date with orders.json and the journal"""
+        signature = _signature_or_none(self.order_file)
+        if self._snapshot is None or signature != self._snapshot_signature:
+            if signature is None:
+                self._snapshot = {}
+                self._snapshot_timeline = Timeline()
+                self._snapshot_signature = None
+            else:
+                self._load_snapshot(signature)
+            # Compaction moves journal records into the snapshot
+            self._journal_inode = None
+        self._scan_journal()
+
+    def record_append(self, line, offset):
+        """Index a line save_order just appended to the journal at offset"""
+        if self._snapshot is None or offset != self._journal_bytes:
+            # Not in step with the journal, the next refresh will catch up
+            return
+        self._add_journal_line(line, offset)
+        self._journal_bytes = offset + len(line)
+
+    def invalidate(self):
+        """Force a reload on the next lookup"""
+        self._snapshot = None
+        self._journal_inode = None
+
+    def locations(self, user_id):
+        """Locations of a user's orders, oldest first"""
+        self.refresh()
+        snapshot = [("snapshot",) + location for location in self._snapshot.get(user_id, ())]
+        journal = [("journal",) + location for location in self._journal.get(user_id, ())]
+        return snapshot + journal
+
+    def count(self, user_id):
+        """Number of orders placed by a user"""
+        self.refresh()
+        return len(self._snapshot.get(user_id, ())) + len(self._journal.get(user_id, ()))
+
+    def between(self, start_key, end_key=None):
+        """Locations of orders with start_key <= time key < end_key, oldest first
+
+        Keys are time-ordered ids or id prefixes (utils.ids.id_floor), so
+        this is a binary search in each part rather than a scan.
+        """
+        self.refresh()
+        snapshot = (((key, "snapshot") + location)
+                    for key, location in self._snapshot_timeline.between(start_key, end_key))
+        journal = (((key, "journal") + location)
+                   for key, location in self._journal_timeline.between(start_key, end_key))
+        return [entry[1:] for entry in heapq.merge(snapshot, journal, key=lambda entry: entry[0])]
+
+    def newest(self, start=0, limit=None):
+        """Locations of all orders newest first, skipping start and taking up to limit
+
+        Both timelines are merged lazily from their newest end, so a page
+        costs its position plus its size, not the number of orders.
+        """
+        self.refresh()
+        snapshot = (((key, "snapshot") + location)
+                    for key, location in self._snapshot_timeline.newest_first())
+        journal = (((key, "journal") + location)
+                   for key, location in self._journal_timeline.newest_first())
+        merged = heapq.merge(snapshot, journal, key=lambda entry: entry[0], reverse=True)
+        stop = None if limit is None else start + limit
+        return [entry[1:] for entry in itertools.islice(merged, start, stop)]
+
+    def total(self):
+        """Number of orders"""
+        self.refresh()
+        return len(self._snapshot_timeline) + len(self._journal_timeline)
+
+    def tag(self):
+        """[number of orders, newest time key], to tell if derived data is current"""
+        timelines = (self._snapshot_timeline, self._journal_timeline)
+        total = self.total()
+        newest = max((timeline.keys[-1] for timeline in timelines if timeline.keys), default=None)
+        return [total, newest]
+
+    def read(self, locations):
+        """Read the records at the given locations"""
+        handles = {}
+        try:
+            records = []
+            for source, offset, length in locations:
+                handle = handles.get(source)
+                if handle is None:
+                    path = self.order_file if source == "snapshot" else self.journal_file
+                    handle = handles[source] = open(path, 'rb')
+                records.append(_read_range(handle, offset, length))
+            return records
+        finally:
+            for handle in handles.values():
+                handle.close()
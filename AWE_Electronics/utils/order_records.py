@@ -0,0 +1,146 @@
+from datetime import datetime
+
+from utils.money import MONEY_FIELDS, stored_cents, cents_fields
+
+# Version 1 records hold {"order", "invoice", "receipt"}, and the invoice and
+# receipt each repeat the order's items and shipping details. Version 2
+# records keep the full order once and store the invoice and receipt as
+# deltas: their ids, dates and status plus any field that differs from what
+# follows from the order. record["order"] is the same in both versions.
+ORDER_RECORD_VERSION = 2
+
+def record_version(record):
+    """Get the format version of a stored order record"""
+    return record.get('version', 1)
+
+def is_order_record(data):
+    """Check if data is a whole stored record rather than one of its documents"""
+    return isinstance(data, dict) and 'order' in data
+
+def stored_date(document, key):
+    """Get a stored date field, or now for documents saved without it"""
+    if key in document:
+        return document[key]
+    return datetime.now().isoformat()
+
+# Where a record's date can be found, best first. Old records may lack the
+# order date but still have the invoice or payment date.
+RECORD_DATE_FIELDS = ("order.order_date", "invoice.invoice_date", "receipt.payment_date")
+
+def record_dates(record):
+    """The dates of a stored record in RECORD_DATE_FIELDS order, None where missing"""
+    dates = []
+    for path in RECORD_DATE_FIELDS:
+        document, key = path.split(".")
+        dates.append((record.get(document) or {}).get(key))
+    return dates
+
+def record_date(record):
+    """Best known date of a stored record, or None if it has none"""
+    return next((date for date in record_dates(record) if date), None)
+
+def _derived_invoice(order):
+    """Invoice fields that follow from the order"""
+    total = stored_cents(order, 'total')
+    return {
+        "order_id": order.get('order_id'),
+        "user_id": order.get('user_id'),
+        "amount_cents": total,
+        "subtotal_cents": total,
+        "tax_amount_cents": 0,
+        "total_amount_cents": total,
+        "items": order.get('items', []),
+        "shipping_info": order.get('shipping', {})
+    }
+
+def _derived_receipt(order, invoice):
+    """Receipt fields that follow from the order and its invoice"""
+    return {
+        "invoice_id": invoice.get('invoice_id'),
+        "order_id": invoice.get('order_id'),
+        "user_id": invoice.get('user_id'),
+        "payment_method": order.get('payment_method'),
+        "amount_paid_cents": stored_cents(invoice, 'total_amount'),
+        "items": order.get('items', []),
+        "subtotal_cents": stored_cents(invoice, 'subtotal'),
+        "tax_amount_cents": stored_cents(invoice, 'tax_amount'),
+        "total_amount_cents": stored_cents(invoice, 'total_amount'),
+        "shipping_info": order.get('shipping', {})
+    }
+
+def _delta(document, derived):
+    """Fields of document that cannot be derived"""
+    return {key: value for key, value in document.items()
+            if key not in derived or derived[key] != value}
+
+def _expand(delta, derived):
+    document = dict(derived)
+    for key in MONEY_FIELDS:
+        # A float amount in a delta written before amounts were cents wins
+        # over the derived cents
+        if key in delta:
+            document.pop(key + "_cents", None)
+    document.update(delta)
+    return document
+
+def pack_record(order, invoice, receipt):
+    """Build a version 2 record from order, invoice and receipt dicts"""
+    return {
+        "version": ORDER_RECORD_VERSION,
+        "order": order,
+        "invoice": _delta(invoice, _derived_invoice(order)),
+        "receipt": _delta(receipt, _derived_receipt(order, invoice))
+    }
+
+def compact_record(record):
+    """Convert a stored record to version 2 where that loses nothing
+
+    Old records whose invoice or receipt lack some of the derivable fields
+    are returned unchanged, since expanding them would add those fields.
+    Float dollar amounts are converted to cents on the way.
+    """
+    if record_version(record) >= ORDER_RECORD_VERSION:
+        return record
+    order = cents_fields(record.get('order', {}))
+    invoice = cents_fields(record.get('invoice', {}))
+    receipt = cents_fields(record.get('receipt', {}))
+    if (set(record) - {'order', 'invoice', 'receipt'}
+            or not set(_derived_invoice(order)) <= set(invoice)
+            or not set(_derived_receipt(order, invoice)) <= set(receipt)):
+        return record
+    return pack_record(order, invoice, receipt)
+
+def expand_invoice(record):
+    """Get the full invoice document from a record of any version"""
+    if record_version(record) < 2:
+        return record.get('invoice', {})
+    return _expand(record.get('invoice', {}), _derived_invoice(record['order']))
+
+def expand_receipt(record):
+    """Get the full receipt document from a record of any version"""
+    if record_version(record) < 2:
+        return record.get('receipt', {})
+    invoice = expand_invoice(record)
+    return _expand(record.get('receipt', {}), _derived_receipt(record['order'], invoice))
+
+def expand_record(record):
+    """Convert a stored record of any version to the version 1 layout"""
+    if record_version(record) < 2:
+        return record
+    return {
+        "order": record['order'],
+        "invoice": expand_invoice(record),
+        "receipt": expand_receipt(record)
+    }
+
+def hydrate_record(record):
+    """Build (Order, Invoice, Receipt) objects from a stored record of any version"""
+    from models.order import Order
+    from models.invoice import Invoice
+    from models.receipt import Receipt
+
+    return Order.from_dict(record['order']), Invoice.from_dict(record), Receipt.from_dict(record)
+
+def hydrate_records(records):
+    """Build (Order, Invoice, Receipt) objects for each of a list of stored records"""
+    return [hydrate_record(record) for record in records]
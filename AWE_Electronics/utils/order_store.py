@@ -0,0 +1,346 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+from utils import file_handler
+from utils.file_handler import (read_json, write_json, iter_json_array, project_fields,
+                                invalidate_json_cache, require_text_format)
+from utils.locks import file_lock
+from utils.ids import id_floor, UNDATED_KEY
+from utils.order_index import OrderIndex
+from utils.order_records import compact_record
+
+ORDER_FILE = "data/orders.json"
+JOURNAL_FILE = "data/orders.journal"
+COMPACTING_FILE = "data/orders.journal.compacting"
+MIGRATING_FILE = "data/orders.json.migrating"
+
+# When enabled, checkouts append one JSON line to the journal instead of
+# rewriting orders.json. The snapshot is folded together by compact_orders().
+JOURNAL_MODE = True
+
+# Compact once the journal grows past this many bytes
+COMPACT_THRESHOLD_BYTES = 1024 * 1024
+
+# _store_lock serialises threads, the orders.json file lock other processes
+# (a journal append must not land in a journal that is being compacted)
+_store_lock = threading.RLock()
+_compactor = None
+_index = OrderIndex(ORDER_FILE, JOURNAL_FILE)
+
+# The order index reads records from orders.json by byte offset
+require_text_format(ORDER_FILE)
+
+def _iter_journal(path):
+    """Yield order records from a JSON-lines journal file"""
+    try:
+        with open(path, 'r', encoding='utf-8') as journal:
+            for line_number, line in enumerate(journal, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final write after a crash - skip it
+                    print(f"Skipping unreadable journal entry {path}:{line_number}")
+    except FileNotFoundError:
+        return
+
+def _last_order_id(records):
+    """Get the order_id of the last record in a sequence"""
+    for record in reversed(records):
+        return record.get('order', {}).get('order_id')
+    return None
+
+def _recover_compaction():
+    """Finish or discard a compaction that was interrupted part way"""
+    if not Path(COMPACTING_FILE).exists():
+        return
+    pending = list(_iter_journal(COMPACTING_FILE))
+    snapshot = read_json(ORDER_FILE, copy=False)
+    if pending and _last_order_id(snapshot) != _last_order_id(pending):
+        # Snapshot was never replaced, fold the pending records in now
+        write_json(ORDER_FILE, list(read_json(ORDER_FILE)) + pending)
+    os.remove(COMPACTING_FILE)
+
+def save_order(record):
+    """Persist one order/invoice/receipt record"""
+    return append_orders([record])
+
+def append_orders(records):
+    """Persist several order records with a single durable write"""
+    if not JOURNAL_MODE:
+        with _store_lock, file_lock(ORDER_FILE):
+            orders = load_orders()
+            orders.extend(records)
+            if not write_json(ORDER_FILE, orders):
+                return False
+            _discard_journal()
+        return True
+
+    lines = [(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+             for record in records]
+    with _store_lock, file_lock(ORDER_FILE):
+        Path(JOURNAL_FILE).parent.mkdir(parents=True, exist_ok=True)
+        with open(JOURNAL_FILE, 'ab') as journal:
+            offset = journal.tell()
+            journal.write(b"".join(lines))
+            journal.flush()
+            os.fsync(journal.fileno())
+        for line in lines:
+            _index.record_append(line, offset)
+            offset += len(line)
+    return True
+
+def replace_orders(orders):
+    """Replace every stored order, e.g. when restoring a backup"""
+    with _store_lock, file_lock(ORDER_FILE):
+        if not write_json(ORDER_FILE, orders):
+            return False
+        _discard_journal()
+    return True
+
+def _discard_journal():
+    """Remove journal files once their records live in the snapshot"""
+    for path in (COMPACTING_FILE, JOURNAL_FILE):
+        if Path(path).exists():
+            os.remove(path)
+
+def _iter_journal_handle(journal, limit, fields=None):
+    """Yield records from an open binary journal, stopping after limit bytes"""
+    read = 0
+    for line in journal:
+        read += len(line)
+        if read > limit:
+            # Appended after the iteration started
+            return
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            print(f"Skipping unreadable journal entry in {JOURNAL_FILE}")
+            continue
+        yield project_fields(record, fields)
+
+def iter_orders(fields=None):
+    """Stream all orders: the snapshot followed by journaled records
+
+    Records are decoded one at a time, so memory stays flat however long
+    the order history gets. fields optionally limits each record to the
+    given dotted paths, e.g. ["order.user_id", "order.total"].
+    """
+    with _store_lock, file_lock(ORDER_FILE):
+        _recover_compaction()
+        # Open both files under the lock so they describe the same moment;
+        # compaction renames the journal away, which leaves this handle valid
+        try:
+            snapshot = open(ORDER_FILE, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            snapshot = None
+        try:
+            journal = open(JOURNAL_FILE, 'rb')
+            journal_limit = os.fstat(journal.fileno()).st_size
+        except FileNotFoundError:
+            journal = None
+
+    try:
+        if snapshot is not None:
+            yield from iter_json_array(snapshot, fields)
+        if journal is not None:
+            yield from _iter_journal_handle(journal, journal_limit, fields)
+    finally:
+        if snapshot is not None:
+            snapshot.close()
+        if journal is not None:
+            journal.close()
+
+def load_orders():
+    """Load all orders as a mutable list"""
+    with _store_lock, file_lock(ORDER_FILE):
+        _recover_compaction()
+        orders = read_json(ORDER_FILE)
+        orders.extend(_iter_journal(JOURNAL_FILE))
+    return orders
+
+def count_orders():
+    """Count all orders using the order index"""
+    with _store_lock, file_lock(ORDER_FILE):
+        _recover_compaction()
+        return _index.total()
+
+def recent_orders(start=0, limit=None, fields=None):
+    """Get a page of all orders, newest first, using the order index
+
+    Only the records of the page are read, so the cost of a page does not
+    grow with the order history.
+    """
+    with _store_lock, file_lock(ORDER_FILE):
+        _recover_compaction()
+        records = _index.read(_index.newest(start, limit))
+    return [project_fields(record, fields) for record in records]
+
+def user_orders(user_id, start=0, limit=None, fields=None):
+    """Get one customer's orders, newest first, using the per-user index
+
+    start and limit select a page. Only that customer's records are read,
+    so the cost does not grow with other customers' orders.
+    """
+    with _store_lock, file_lock(ORDER_FILE):
+        _recover_compaction()
+        locations = _index.locations(user_id)
+        locations.reverse()
+        stop = None if limit is None else start + limit
+        records = _index.read(locations[start:stop])
+    return [project_fields(record, fields) for record in records]
+
+def orders_since(since, until=None, fields=None):
+    """Get the orders placed at or after since (and before until), oldest first
+
+    since and until are datetimes, ISO date strings or None for no bound.
+    Order ids are time-ordered, so the range is found by binary search in
+    the order index and only the matching records are read. Old orders
+    with random ids are placed by their order, invoice or payment date;
+    those with none of them count as older than any date, so they are
+    only returned when since is None.
+    """
+    start_key = UNDATED_KEY if since is None else id_floor(since)
+    end_key = None if until is None else id_floor(until)
+    with _store_lock, file_lock(ORDER_FILE):
+        _recover_compaction()
+        records = _index.read(_index.between(start_key, end_key))
+    return [project_fields(record, fields) for record in records]
+
+def order_tag():
+    """What data derived from the orders must match to be current
+
+    [number of orders, newest order's time key], read from the order index
+    rather than the orders. Compaction does not change it, appends and
+    restores do.
+    """
+    with _store_lock, file_lock(ORDER_FILE):
+        _recover_compaction()
+        return _index.tag()
+
+def count_user_orders(user_id):
+    """Count one customer's orders using the per-user index"""
+    with _store_lock, file_lock(ORDER_FILE):
+        _recover_compaction()
+        return _index.count(user_id)
+
+def journal_size():
+    """Get the current journal size in bytes"""
+    try:
+        return os.path.getsize(JOURNAL_FILE)
+    except OSError:
+        return 0
+
+def compact_orders():
+    """Fold the journal into the orders.json snapshot"""
+    with _store_lock, file_lock(ORDER_FILE):
+        _recover_compaction()
+        if not Path(JOURNAL_FILE).exists():
+            return False
+
+        # Move the journal aside so the merge works on a fixed set of records
+        os.replace(JOURNAL_FILE, COMPACTING_FILE)
+        pending = list(_iter_journal(COMPACTING_FILE))
+        if pending:
+            orders = read_json(ORDER_FILE)
+            orders.extend(pending)
+            if not write_json(ORDER_FILE, orders):
+                # Put the records back in front of anything new
+                _restore_journal()
+                return False
+        os.remove(COMPACTING_FILE)
+        # Re-index the new snapshot here rather than on a customer's click
+        _index.refresh()
+        return True
+
+def _dump_element(record):
+    """Dump a record the way write_json nests it inside the orders list"""
+    if file_handler.DEFAULT_JSON_FORMAT != "pretty":
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+    text = json.dumps(record, indent=4, ensure_ascii=False)
+    return "\n".join("    " + line for line in text.split("\n"))
+
+def migrate_order_records():
+    """Rewrite stored orders in the compact version 2 record format
+
+    The journal is compacted first, then orders.json is streamed record by
+    record into a new file that replaces it, so memory use stays flat.
+    Returns (converted, total).
+    """
+    with _store_lock, file_lock(ORDER_FILE):
+        compact_orders()
+        converted = total = 0
+        with open(MIGRATING_FILE, 'w', encoding='utf-8') as migrating:
+            migrating.write("[")
+            for record in iter_json_array(ORDER_FILE):
+                packed = compact_record(record)
+                if packed is not record:
+                    converted += 1
+                migrating.write(",\n" if total else "\n")
+                migrating.write(_dump_element(packed))
+                total += 1
+            migrating.write("\n]" if total else "]")
+            migrating.flush()
+            os.fsync(migrating.fileno())
+        if converted:
+            os.replace(MIGRATING_FILE, ORDER_FILE)
+            invalidate_json_cache(ORDER_FILE)
+            _index.refresh()
+        else:
+            os.remove(MIGRATING_FILE)
+    return converted, total
+
+def _restore_journal():
+    """Move a compacting journal back after a failed snapshot write"""
+    if Path(JOURNAL_FILE).exists():
+        with open(COMPACTING_FILE, 'a', encoding='utf-8') as compacting:
+            with open(JOURNAL_FILE, 'r', encoding='utf-8') as journal:
+                compacting.write(journal.read())
+    os.replace(COMPACTING_FILE, JOURNAL_FILE)
+
+class OrderCompactor(threading.Thread):
+    """Background thread that compacts the order journal periodically"""
+
+    def __init__(self, interval=30.0, threshold_bytes=COMPACT_THRESHOLD_BYTES):
+        super().__init__(name="order-compactor", daemon=True)
+        self.interval = interval
+        self.threshold_bytes = threshold_bytes
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                if journal_size() >= self.threshold_bytes:
+                    compact_orders()
+            except Exception as e:
+                print(f"Order compaction failed: {e}")
+
+    def stop(self, compact=True):
+        """Stop the compactor, optionally doing a final compaction"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=self.interval)
+        if compact:
+            compact_orders()
+
+def start_compactor(interval=30.0, threshold_bytes=COMPACT_THRESHOLD_BYTES):
+    """Start the shared background compactor if it is not running"""
+    global _compactor
+    if _compactor is None or not _compactor.is_alive():
+        _compactor = OrderCompactor(interval, threshold_bytes)
+        _compactor.start()
+    return _compactor
+
+def stop_compactor(compact=True):
+    """Stop the shared background compactor"""
+    global _compactor
+    if _compactor is not None:
+        _compactor.stop(compact)
+        _compactor = None
@@ -0,0 +1,149 @@
+import base64
+import hashlib
+import hmac
+import os
+import statistics
+import time
+
+from utils.file_handler import read_json, write_json
+
+PASSWORD_POLICY_FILE = "data/password_policy.json"
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# Used until `python main.py --calibrate-passwords` writes a policy tuned
+# for the machine. scrypt needs OpenSSL 1.1+, otherwise PBKDF2 is used.
+if hasattr(hashlib, "scrypt"):
+    DEFAULT_POLICY = {"algorithm": "scrypt", "n": 2 ** 14, "r": 8, "p": 1}
+else:
+    DEFAULT_POLICY = {"algorithm": "pbkdf2_sha256", "iterations": 600_000}
+
+# Target time for one verification when calibrating
+DEFAULT_TARGET_MS = 250
+
+def _b64encode(data):
+    return base64.b64encode(data).decode('ascii')
+
+def _b64decode(text):
+    return base64.b64decode(text.encode('ascii'))
+
+def get_policy():
+    """Get the hashing algorithm and cost parameters for new hashes"""
+    policy = read_json(PASSWORD_POLICY_FILE)
+    return policy if isinstance(policy, dict) and policy.get("algorithm") else DEFAULT_POLICY
+
+def save_policy(policy):
+    """Store the hashing policy picked by calibration"""
+    return write_json(PASSWORD_POLICY_FILE, policy)
+
+def _derive(password, salt, policy):
+    """Run the key derivation function described by a policy"""
+    data = password.encode('utf-8')
+    if policy["algorithm"] == "scrypt":
+        n, r, p = policy["n"], policy["r"], policy["p"]
+        return hashlib.scrypt(data, salt=salt, n=n, r=r, p=p, dklen=HASH_BYTES,
+                              maxmem=128 * r * (n + p + 2) + 1024 * 1024)
+    if policy["algorithm"] == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", data, salt, policy["iterations"], dklen=HASH_BYTES)
+    raise ValueError(f"Unknown password hash algorithm: {policy['algorithm']}")
+
+def _encode(policy, salt, digest):
+    if policy["algorithm"] == "scrypt":
+        params = [policy["n"], policy["r"], policy["p"]]
+    else:
+        params = [policy["iterations"]]
+    return "$".join([policy["algorithm"], *map(str, params), _b64encode(salt), _b64encode(digest)])
+
+def _decode(stored):
+    """Split a stored hash into (policy, salt, digest), or None if it is not a hash"""
+    parts = stored.split("$") if isinstance(stored, str) else []
+    try:
+        if parts and parts[0] == "scrypt" and len(parts) == 6:
+            policy = {"algorithm": "scrypt", "n": int(parts[1]), "r": int(parts[2]),
+                      "p": int(parts[3])}
+        elif parts and parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            policy = {"algorithm": "pbkdf2_sha256", "iterations": int(parts[1])}
+        else:
+            return None
+        return policy, _b64decode(parts[-2]), _b64decode(parts[-1])
+    except ValueError:
+        return None
+
+def is_password_hash(stored):
+    """Check if a stored password is a hash rather than legacy plaintext"""
+    return _decode(stored) is not None
+
+def hash_password(password, policy=None):
+    """Hash a password with a fresh random salt"""
+    policy = policy or get_policy()
+    salt = os.urandom(SALT_BYTES)
+    return _encode(policy, salt, _derive(password, salt, policy))
+
+def _weaker_than(policy, current):
+    """Check if a stored hash should be redone with the current policy"""
+    if policy["algorithm"] != current["algorithm"]:
+        return True
+    if policy["algorithm"] == "scrypt":
+        return (policy["n"], policy["r"], policy["p"]) < (current["n"], current["r"], current["p"])
+    return policy["iterations"] < current["iterations"]
+
+def verify_password(password, stored):
+    """Check a password against a stored value
+
+    Returns (matches, needs_upgrade). needs_upgrade is True for legacy
+    plaintext records and hashes made with a cheaper policy than the
+    current one, so the caller can re-hash after a successful login.
+    """
+    if not stored:
+        return False, False
+    decoded = _decode(stored)
+    if decoded is None:
+        # Legacy plaintext record
+        matches = hmac.compare_digest(password.encode('utf-8'), str(stored).encode('utf-8'))
+        return matches, matches
+    policy, salt, digest = decoded
+    matches = hmac.compare_digest(_derive(password, salt, policy), digest)
+    return matches, matches and _weaker_than(policy, get_policy())
+
+def _time_policy(policy, rounds=3):
+    """Median time in seconds for one hash with a policy"""
+    salt = os.urandom(SALT_BYTES)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        _derive("calibration-password", salt, policy)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def calibrate(target_ms=DEFAULT_TARGET_MS, algorithm=None):
+    """Pick cost parameters so one verification takes about target_ms here
+
+    Returns (policy, measured_ms). The policy is not saved.
+    """
+    algorithm = algorithm or DEFAULT_POLICY["algorithm"]
+    target = target_ms / 1000.0
+
+    if algorithm == "scrypt":
+        # Cost doubles with n, pick the power of two closest to the target
+        best = None
+        n = 2 ** 10
+        while n <= 2 ** 20:
+            policy = {"algorithm": "scrypt", "n": n, "r": 8, "p": 1}
+            elapsed = _time_policy(policy)
+            if best is None or abs(elapsed - target) < abs(best[1] - target):
+                best = (policy, elapsed)
+            if elapsed >= target:
+                break
+            n *= 2
+        return best[0], best[1] * 1000
+
+    if algorithm == "pbkdf2_sha256":
+        # Cost is linear in the iteration count
+        sample = {"algorithm": "pbkdf2_sha256", "iterations": 50_000}
+        per_iteration = _time_policy(sample) / sample["iterations"]
+        iterations = max(10_000, int(round(target / per_iteration, -3)))
+        policy = {"algorithm": "pbkdf2_sha256", "iterations": iterations}
+        return policy, _time_policy(policy) * 1000
+
+    raise ValueError(f"Unknown password hash algorithm: {algorithm}")
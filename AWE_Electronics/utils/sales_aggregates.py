@@ -0,0 +1,86 @@
+import copy
+import heapq
+from datetime import datetime
+
+from utils.file_handler import read_json, write_json
+from utils.money import stored_cents, items_total_cents, to_cents
+
+SALES_FILE = "data/sales_aggregates.json"
+
+# The checkout path saves the aggregates at most this often. The file is
+# tagged with the orders it covers, so a save lost to a crash is noticed
+# and rebuilt rather than trusted.
+SAVE_INTERVAL_SECONDS = 5.0
+
+def empty_aggregates():
+    """Aggregates for a store with no orders"""
+    return {
+        "order_count": 0,
+        "total_revenue_cents": 0,
+        "items_sold": 0,
+        "products": {},        # product_id -> {name, qty, revenue_cents}
+        "last_order_id": None,
+        "updated": None,
+        "orders_tag": None     # order_store.order_tag() of the orders counted
+    }
+
+def order_total_cents(order):
+    """Order total in cents as stored, falling back to the sum of its lines"""
+    total = stored_cents(order, 'total', None)
+    if total is None:
+        total = items_total_cents(order.get('items', []))
+    return total
+
+def apply_order(aggregates, record):
+    """Fold one order/invoice/receipt record into the aggregates in O(items)"""
+    order = record.get('order', {})
+    products = aggregates["products"]
+
+    aggregates["order_count"] += 1
+    # Whole cents, so the running sums stay exact however many orders there are
+    aggregates["total_revenue_cents"] += order_total_cents(order)
+    for item in order.get('items', []):
+        pid = item.get('product_id', 'Unknown')
+        qty = item.get('quantity', 0)
+        entry = products.get(pid)
+        if entry is None:
+            entry = products[pid] = {"name": item.get('name', 'Unknown'), "qty": 0,
+                                     "revenue_cents": 0}
+        entry["qty"] += qty
+        entry["revenue_cents"] += to_cents(item.get('price', 0)) * qty
+        aggregates["items_sold"] += qty
+
+    aggregates["last_order_id"] = order.get('order_id')
+    aggregates["updated"] = datetime.now().isoformat()
+    return aggregates
+
+def build_aggregates(records):
+    """Compute aggregates from scratch over every order record"""
+    aggregates = empty_aggregates()
+    for record in records:
+        apply_order(aggregates, record)
+    return aggregates
+
+def top_products(aggregates, limit=10):
+    """Best selling products by revenue as (product_id, entry) pairs"""
+    by_revenue = lambda item: item[1]["revenue_cents"]
+    if limit is None:
+        return sorted(aggregates["products"].items(), key=by_revenue, reverse=True)
+    return heapq.nlargest(limit, aggregates["products"].items(), key=by_revenue)
+
+# JSON file persistence
+
+def load_aggregates(filename=SALES_FILE):
+    """Load stored aggregates, or None if they have never been built"""
+    data = read_json(filename)
+    # Aggregates summed in float dollars are rebuilt once, in cents
+    return data if isinstance(data, dict) and "total_revenue_cents" in data else None
+
+def save_aggregates(aggregates, filename=SALES_FILE):
+    """Store aggregates next to the order data"""
+    # Derived data checked against its orders_tag on load: atomic, no fsync
+    return write_json(filename, aggregates, fmt="compact", durable=False)
+
+def copy_aggregates(aggregates):
+    """Copy for callers, so later orders do not change it under them"""
+    return copy.deepcopy(aggregates)
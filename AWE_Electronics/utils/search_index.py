@@ -0,0 +1,179 @@
+import heapq
+import re
+from bisect import bisect_left, insort
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Relevance weight of a match in each indexed field
+FIELD_WEIGHTS = {
+    "product_id": 4,
+    "name": 3,
+    "category": 2,
+    "description": 1,
+}
+
+# Relevance multiplier by how a query word matched a token
+EXACT_MATCH = 3
+PREFIX_MATCH = 2
+SUBSTRING_MATCH = 1
+
+def tokenize(text):
+    """Split text into lower-case alphanumeric tokens"""
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+def trigrams(token):
+    """Get the set of 3-character substrings of a token"""
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+class ProductSearchIndex:
+    """Inverted index over product name, category, product_id and description
+
+    Each token maps to the products containing it (with the best field
+    weight). A sorted vocabulary answers prefix queries with a binary
+    search, and a trigram index over the vocabulary finds tokens that
+    contain a query word anywhere. Multi-word queries use AND semantics and
+    results are ranked by field weight and match quality.
+    """
+
+    def __init__(self, products=()):
+        self.rebuild(products)
+
+    def clear(self):
+        """Remove every product from the index"""
+        self._postings = {}      # token -> {product_id: field weight}
+        self._vocabulary = []    # sorted list of tokens
+        self._trigrams = {}      # trigram -> set of tokens
+        self._doc_tokens = {}    # product_id -> set of tokens
+        self._order = {}         # product_id -> insertion sequence
+        self._next_seq = 0
+
+    def rebuild(self, products):
+        """Index a whole catalogue from scratch, sorting the vocabulary once"""
+        self.clear()
+        for product in products:
+            self._add(product, keep_sorted=False)
+        self._vocabulary.sort()
+
+    def __len__(self):
+        return len(self._doc_tokens)
+
+    def __contains__(self, product_id):
+        return product_id in self._doc_tokens
+
+    def _field_tokens(self, product):
+        """Map each token of a product to its best field weight"""
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(getattr(product, field, "") or ""):
+                if weights.get(token, 0) < weight:
+                    weights[token] = weight
+        return weights
+
+    def add(self, product):
+        """Index a product (re-indexes it if already present)"""
+        self._add(product, keep_sorted=True)
+
+    def _add(self, product, keep_sorted):
+        product_id = product.product_id
+        if product_id in self._doc_tokens:
+            self.remove(product_id)
+
+        weights = self._field_tokens(product)
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                if keep_sorted:
+                    insort(self._vocabulary, token)
+                else:
+                    self._vocabulary.append(token)
+                for gram in trigrams(token):
+                    self._trigrams.setdefault(gram, set()).add(token)
+            postings[product_id] = weight
+
+        self._doc_tokens[product_id] = set(weights)
+        self._order[product_id] = self._next_seq
+        self._next_seq += 1
+
+    def update(self, product, old_product_id=None):
+        """Re-index a product after it was edited"""
+        if old_product_id is not None and old_product_id != product.product_id:
+            self.remove(old_product_id)
+        self.add(product)
+
+    def remove(self, product_id):
+        """Remove a product from the index"""
+        tokens = self._doc_tokens.pop(product_id, None)
+        if tokens is None:
+            return False
+        self._order.pop(product_id, None)
+        for token in tokens:
+            postings = self._postings[token]
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[token]
+                index = bisect_left(self._vocabulary, token)
+                del self._vocabulary[index]
+                for gram in trigrams(token):
+                    gram_tokens = self._trigrams[gram]
+                    gram_tokens.discard(token)
+                    if not gram_tokens:
+                        del self._trigrams[gram]
+        return True
+
+    def _matching_tokens(self, word):
+        """Find vocabulary tokens matching a query word, with match quality"""
+        matches = {}
+
+        # Prefix matches (including the exact token) via binary search
+        index = bisect_left(self._vocabulary, word)
+        while index < len(self._vocabulary) and self._vocabulary[index].startswith(word):
+            token = self._vocabulary[index]
+            matches[token] = EXACT_MATCH if token == word else PREFIX_MATCH
+            index += 1
+
+        # Substring matches via the trigram index
+        if len(word) >= 3:
+            candidates = None
+            for gram in sorted(trigrams(word), key=lambda g: len(self._trigrams.get(g, ()))):
+                gram_tokens = self._trigrams.get(gram)
+                if not gram_tokens:
+                    return matches
+                candidates = set(gram_tokens) if candidates is None else candidates & gram_tokens
+                if not candidates:
+                    return matches
+            for token in candidates:
+                if token not in matches and word in token:
+                    matches[token] = SUBSTRING_MATCH
+
+        return matches
+
+    def _score_word(self, word):
+        """Score every product matching one query word"""
+        scores = {}
+        for token, quality in self._matching_tokens(word).items():
+            for product_id, weight in self._postings[token].items():
+                score = weight * quality
+                if scores.get(product_id, 0) < score:
+                    scores[product_id] = score
+        return scores
+
+    def search(self, query, limit=None):
+        """Return product IDs matching every word of the query, best first"""
+        words = tokenize(query)
+        if not words:
+            return []
+
+        # Score the rarest word first so the AND narrows down quickly
+        word_scores = sorted((self._score_word(word) for word in set(words)), key=len)
+        totals = dict(word_scores[0])
+        for scores in word_scores[1:]:
+            if not totals:
+                break
+            totals = {pid: total + scores[pid] for pid, total in totals.items() if pid in scores}
+
+        order = self._order
+        rank_key = lambda pid: (-totals[pid], order[pid])
+        if limit is not None:
+            return heapq.nsmallest(limit, totals, key=rank_key)
+        return sorted(totals, key=rank_key)
@@ -0,0 +1,206 @@
+import threading
+from contextlib import contextmanager
+
+from utils.file_handler import read_json, write_json, read_version, iter_json_array, file_signature
+from utils.locks import file_lock
+from utils.money import average_cents, from_cents
+
+STATS_FILE = "data/stats.json"
+
+# One definition of stock status for the whole app: out of stock at 0,
+# low on stock from 1 up to LOW_STOCK_THRESHOLD, in stock above it
+LOW_STOCK_THRESHOLD = 5
+
+def stock_bucket(stock, threshold=LOW_STOCK_THRESHOLD):
+    """Get the stock bucket name for a stock level"""
+    if stock <= 0:
+        return "out_of_stock"
+    if stock <= threshold:
+        return "low_stock"
+    return "in_stock"
+
+# How each bucket is shown, in the customer and admin views alike
+STOCK_STATUS_LABELS = {"out_of_stock": "Out of Stock", "low_stock": "Low Stock",
+                       "in_stock": "In Stock"}
+STOCK_STATUS_ICONS = {"out_of_stock": "❌", "low_stock": "⚠️", "in_stock": "✅"}
+
+def stock_status_text(stock):
+    """Icon and label of a stock level, such as ⚠️ Low Stock"""
+    bucket = stock_bucket(stock)
+    return f"{STOCK_STATUS_ICONS[bucket]} {STOCK_STATUS_LABELS[bucket]}"
+
+# Counters per section. in_stock is derived (total - out_of_stock), so
+# only the buckets that need counting are stored.
+
+def empty_product_counts():
+    return {"total": 0, "low_stock": 0, "out_of_stock": 0}
+
+def empty_user_counts():
+    return {"total": 0, "admin": 0, "customers": 0}
+
+def stock_change(old_stock, new_stock):
+    """Counter update for a product whose stock went from old to new
+
+    None stands for "no such product", so adding a product is
+    stock_change(None, stock) and deleting one stock_change(stock, None).
+    """
+    def change(counts):
+        for stock, sign in ((old_stock, -1), (new_stock, 1)):
+            if stock is None:
+                continue
+            counts["total"] += sign
+            bucket = stock_bucket(stock)
+            if bucket != "in_stock":
+                counts[bucket] += sign
+    return change
+
+def role_change(old_role, new_role):
+    """Counter update for a user whose role went from old to new (None: no user)"""
+    def change(counts):
+        for role, sign in ((old_role, -1), (new_role, 1)):
+            if role is None:
+                continue
+            counts["total"] += sign
+            if role == "admin":
+                counts["admin"] += sign
+            elif role == "customer":
+                counts["customers"] += sign
+    return change
+
+def _count_products(filename):
+    counts = empty_product_counts()
+    for product in iter_json_array(filename, fields=["stock"]):
+        stock_change(None, product.get('stock', 0))(counts)
+    return counts
+
+def _count_users(filename):
+    counts = empty_user_counts()
+    for user in iter_json_array(filename, fields=["role"]):
+        role_change(None, user.get('role', ''))(counts)
+    return counts
+
+_COUNTERS = {"products": _count_products, "users": _count_users}
+
+def _file_tag(filename):
+    """What the counters of a file are valid for: its update_json version and signature"""
+    try:
+        return [read_version(filename)] + list(file_signature(filename))
+    except FileNotFoundError:
+        return None
+
+class StatsRegistry:
+    """Dashboard counters kept up to date by every write instead of recounted
+
+    Each section ("products", "users") counts one data file and is tagged
+    with that file's version and signature. Storage commits to the file
+    inside tracking(section) and reports each committed change with
+    note(section, change), so the counters move along with the data. A
+    section whose tag no longer matches the file (another process wrote
+    it, a restore, a hand edit) is recounted from the file once. Sections
+    are saved to stats.json when read and on close, so a new process
+    starts without recounting; the tag makes a stale save harmless.
+    """
+
+    def __init__(self, files, stats_file=STATS_FILE):
+        self.files = files
+        self.stats_file = stats_file
+        self._lock = threading.Lock()
+        self._sections = None
+        self._dirty = False
+        self._tracking = threading.local()
+
+    def _load(self):
+        if self._sections is None:
+            stored = read_json(self.stats_file)
+            self._sections = stored if isinstance(stored, dict) else {}
+
+    def counts(self, name):
+        """Current counters of a section, recounting only if they went stale"""
+        filename = self.files[name]
+        tag = _file_tag(filename)
+        with self._lock:
+            self._load()
+            section = self._sections.get(name)
+            fresh = tag is not None and section is not None and section.get("tag") == tag
+            counts = dict(section["counts"]) if fresh else None
+        if fresh:
+            # Commits only touch memory, the counters are saved when read
+            self.save()
+            return counts
+        # Under the file lock, so no tracked commit is half way through
+        with file_lock(filename):
+            tag = _file_tag(filename)
+            counts = _COUNTERS[name](filename)
+            with self._lock:
+                self._sections[name] = {"tag": tag, "counts": counts}
+                self._dirty = True
+        self.save()
+        return dict(counts)
+
+    @contextmanager
+    def tracking(self, name):
+        """Wrap a commit to a section's file; must be entered under the file's lock"""
+        filename = self.files[name]
+        before = _file_tag(filename)
+        changes = []
+        self._tracking.changes = (name, changes)
+        try:
+            yield
+        finally:
+            self._tracking.changes = None
+            after = _file_tag(filename)
+            with self._lock:
+                self._load()
+                section = self._sections.get(name)
+                if after != before:
+                    if section is not None and section.get("tag") == before:
+                        for change in changes:
+                            change(section["counts"])
+                        section["tag"] = after
+                    else:
+                        # Counters were already behind, recount on the next read
+                        self._sections.pop(name, None)
+                    self._dirty = True
+
+    def note(self, name, change):
+        """Report a change that was just committed inside tracking(name)"""
+        active = getattr(self._tracking, "changes", None)
+        if active is not None and active[0] == name:
+            active[1].append(change)
+            return
+        # Committed outside tracking: the counters cannot follow it
+        with self._lock:
+            self._load()
+            if self._sections.pop(name, None) is not None:
+                self._dirty = True
+
+    def save(self):
+        """Write the counters to stats.json if they changed"""
+        with self._lock:
+            if not self._dirty:
+                return True
+            sections = {name: {"tag": section["tag"], "counts": dict(section["counts"])}
+                        for name, section in self._sections.items()}
+            self._dirty = False
+        # Derived data: atomic, but not worth an fsync
+        return write_json(self.stats_file, sections, fmt="compact", durable=False)
+
+def data_stats(user_counts, product_counts, order_count, total_revenue_cents):
+    """Build the get_data_stats / dashboard report from the counters"""
+    average = average_cents(total_revenue_cents, order_count)
+    return {
+        'users': dict(user_counts),
+        'products': {
+            'total': product_counts["total"],
+            'in_stock': product_counts["total"] - product_counts["out_of_stock"],
+            'low_stock': product_counts["low_stock"],
+            'out_of_stock': product_counts["out_of_stock"]
+        },
+        'orders': {
+            'total': order_count,
+            'total_revenue_cents': total_revenue_cents,
+            'total_revenue': total_revenue_cents / 100,
+            'average_order_value_cents': average,
+            'average_order_value': from_cents(average)
+        }
+    }
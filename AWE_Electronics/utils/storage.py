@@ -0,0 +1,946 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from utils.file_handler import (read_json, thaw_json, file_signature, project_fields,
+                                update_json, apply_updates)
+from utils.locks import file_lock
+from utils import order_store
+from utils.order_records import compact_record, record_date
+from utils.money import stored_cents, from_cents
+from utils.ids import iso_time
+from utils.user_directory import UserDirectory, normalize_email
+from utils.passwords import verify_password, hash_password
+from utils.write_behind import get_write_queue, flush_writes, completed, chain
+from utils.stats import (StatsRegistry, stock_change, role_change, data_stats,
+                         LOW_STOCK_THRESHOLD)
+from utils.sales_aggregates import (SALES_FILE, SAVE_INTERVAL_SECONDS, empty_aggregates,
+                                    apply_order, build_aggregates, load_aggregates,
+                                    save_aggregates, copy_aggregates)
+
+USER_FILE = "data/users.json"
+PRODUCT_FILE = "data/products.json"
+SQLITE_FILE = "data/awe_electronics.db"
+
+# Storage backend used by controllers and GUIs: "json" or "sqlite".
+# Can be overridden with the AWE_STORAGE_BACKEND environment variable.
+STORAGE_BACKEND = os.environ.get("AWE_STORAGE_BACKEND", "json").lower()
+
+# JSON backend: product and order writes go through the write-behind queue,
+# so mutations arriving together share one durable write. Set
+# AWE_WRITE_BEHIND=0 to write on the caller's thread instead.
+WRITE_BEHIND = os.environ.get("AWE_WRITE_BEHIND", "1") != "0"
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def check_login(store, user, password):
+    """Verify a password against a user record, upgrading weak or plaintext hashes
+
+    Returns the user record on success, None otherwise. Slow by design (a
+    key derivation function), so GUIs should call it off the Tk thread.
+    """
+    if user is None:
+        return None
+    matches, needs_upgrade = verify_password(password, user.get('password'))
+    if not matches:
+        return None
+    if needs_upgrade:
+        user['password'] = hash_password(password)
+        store.update_user(user)
+    return user
+
+PRODUCT_COLUMNS = ("product_id", "name", "price", "category", "stock", "description")
+USER_COLUMNS = ("username", "password", "email", "role")
+
+class JsonStorage:
+    """Repository backed by the users/products/orders JSON files"""
+
+    name = "json"
+
+    def __init__(self, user_file=USER_FILE, product_file=PRODUCT_FILE):
+        self.user_file = user_file
+        self.product_file = product_file
+        self.users = UserDirectory(user_file)
+        self.stats = StatsRegistry({"products": product_file, "users": user_file})
+        # Sales aggregates in memory, saved every SAVE_INTERVAL_SECONDS at most
+        self._sales = None
+        self._sales_dirty = False
+        self._sales_saved_at = 0.0
+
+    # Users
+
+    def load_users(self):
+        """Load all user records"""
+        return read_json(self.user_file)
+
+    def get_user(self, username):
+        """Get a copy of a user record by username"""
+        return self.users.get_user(username)
+
+    def username_exists(self, username):
+        """Check if a username is taken"""
+        return self.users.username_exists(username)
+
+    def email_exists(self, email):
+        """Check if an email is already registered, ignoring case"""
+        return self.users.email_exists(email)
+
+    def authenticate(self, username, password):
+        """Get the user record if the credentials match, else None"""
+        return check_login(self, self.users.get_user(username), password)
+
+    def add_user(self, user):
+        """Add a new user, returns False if the username is taken"""
+        def add(users):
+            if self.users.username_exists(user['username']):
+                return False, False
+            users.append(user)
+            return True, True
+
+        def on_commit(users, added):
+            self.users.record_write(user)
+            self.stats.note("users", role_change(None, user.get('role')))
+
+        with file_lock(self.user_file), self.stats.tracking("users"):
+            ok, added = update_json(self.user_file, add, on_commit=on_commit)
+        return ok and added
+
+    def update_user(self, user):
+        """Replace an existing user record"""
+        old_users = []
+
+        def update(users):
+            # Also brings the directory up to date with the data just read
+            if not self.users.username_exists(user['username']):
+                return False, False
+            for i, existing in enumerate(users):
+                if existing.get('username') == user['username']:
+                    old_users[:] = [existing]
+                    users[i] = user
+                    return True, True
+            return False, False
+
+        def on_commit(users, updated):
+            self.users.record_write(user, old_users[0])
+            self.stats.note("users", role_change(old_users[0].get('role'), user.get('role')))
+
+        with file_lock(self.user_file), self.stats.tracking("users"):
+            ok, updated = update_json(self.user_file, update, on_commit=on_commit)
+        return ok and updated
+
+    # Products
+
+    def products_version(self):
+        """Get a token that changes whenever the product data changes"""
+        try:
+            return file_signature(self.product_file)
+        except FileNotFoundError:
+            return None
+
+    def load_products(self):
+        """Load all product records (read-only)"""
+        # Writes replace the file atomically, so no lock is needed to read
+        return read_json(self.product_file, copy=False)
+
+    def get_product(self, product_id):
+        """Get a copy of a product record by ID"""
+        for product in self.load_products():
+            if product.get('product_id') == product_id:
+                return thaw_json(product)
+        return None
+
+    def add_product(self, product, on_version=None):
+        """Add a new product, returns False if the ID is taken"""
+        def add(products, changes):
+            if any(p.get('product_id') == product['product_id'] for p in products):
+                return False, False
+            products.append(product)
+            changes.append(stock_change(None, product.get('stock', 0)))
+            return True, True
+
+        ok, added = self._update_products(add, on_version).result()
+        return ok and added
+
+    def update_product(self, product_id, product, on_version=None):
+        """Replace the product stored under product_id"""
+        def update(products, changes):
+            for i, existing in enumerate(products):
+                if existing.get('product_id') == product_id:
+                    products[i] = product
+                    changes.append(stock_change(existing.get('stock', 0), product.get('stock', 0)))
+                    return True, True
+            return False, False
+
+        ok, updated = self._update_products(update, on_version).result()
+        return ok and updated
+
+    def update_stock(self, product_id, stock, wait=True, on_version=None):
+        """Set a product's stock, returns the old stock or None if not found
+
+        With wait=False the write is left to the write-behind queue and a
+        Future of the old stock is returned instead.
+        """
+        def update(products, changes):
+            for product in products:
+                if product.get('product_id') == product_id:
+                    old_stock = product.get('stock', 0)
+                    product['stock'] = stock
+                    changes.append(stock_change(old_stock, stock))
+                    return True, old_stock
+            return False, None
+
+        future = chain(self._update_products(update, on_version), lambda done: done[1] if done[0] else None)
+        return future.result() if wait else future
+
+    def _update_products(self, mutate, on_version=None):
+        """Queue a mutation of products.json, returns a Future of (ok, result)
+
+        mutate(products, changes) works like an update_json mutate, and
+        appends a utils.stats change for every product whose stock it
+        adds, alters or removes so the dashboard counters follow.
+        on_version(before, after) is called with the products_version the
+        mutation was applied to and the one its write produced.
+        """
+        changes = []
+        read_version = []
+
+        def tracked(products):
+            # update_json may run the mutation again after a conflict
+            del changes[:]
+            # Only committed if the file is still the one read here
+            read_version[:] = [self.products_version()]
+            return mutate(products, changes)
+
+        def on_commit(products, result):
+            for change in changes:
+                self.stats.note("products", change)
+            if on_version is not None:
+                # Still under the file lock, so no one else has written since
+                on_version(read_version[0], self.products_version())
+
+        if not WRITE_BEHIND:
+            with file_lock(self.product_file), self.stats.tracking("products"):
+                return completed(update_json(self.product_file, tracked, on_commit=on_commit))
+        return get_write_queue().submit(self.product_file, (tracked, on_commit),
+                                        self._commit_products)
+
+    def _commit_products(self, updates):
+        """Apply a batch of queued product mutations with one write"""
+        with file_lock(self.product_file), self.stats.tracking("products"):
+            return apply_updates(self.product_file, updates)
+
+    def delete_product(self, product_id, on_version=None):
+        """Delete a product, returns False if it was not found"""
+        def delete(products, changes):
+            remaining = [p for p in products if p.get('product_id') != product_id]
+            if len(remaining) == len(products):
+                return False, False
+            for p in products:
+                if p.get('product_id') == product_id:
+                    changes.append(stock_change(p.get('stock', 0), None))
+            products[:] = remaining
+            return True, True
+
+        ok, deleted = self._update_products(delete, on_version).result()
+        return ok and deleted
+
+    def reserve_stock(self, quantities, on_version=None):
+        """Take stock for several products at once, all or nothing
+
+        quantities maps product_id to the quantity wanted. The check and
+        the decrement are one update_json transaction on products.json, so
+        concurrent checkouts in any process cannot oversell. Returns (True,
+        new stock levels) or (False, available stock of the products that
+        fell short); nothing is changed on failure.
+        """
+        def reserve(products, changes):
+            by_id = {p.get('product_id'): p for p in products}
+            shortages = {}
+            for product_id, quantity in quantities.items():
+                product = by_id.get(product_id)
+                available = product.get('stock', 0) if product else 0
+                if available < quantity:
+                    shortages[product_id] = available
+            if shortages:
+                return False, (False, shortages)
+
+            for product_id, quantity in quantities.items():
+                product = by_id[product_id]
+                changes.append(stock_change(product['stock'], product['stock'] - quantity))
+                product['stock'] -= quantity
+            return True, (True, {pid: by_id[pid]['stock'] for pid in quantities})
+
+        ok, result = self._update_products(reserve, on_version).result()
+        return result if ok else (False, {})
+
+    def release_stock(self, quantities, on_version=None):
+        """Give back stock taken by reserve_stock, returns the new levels"""
+        def release(products, changes):
+            levels = {}
+            for product in products:
+                product_id = product.get('product_id')
+                if product_id in quantities:
+                    old_stock = product.get('stock', 0)
+                    product['stock'] = old_stock + quantities[product_id]
+                    changes.append(stock_change(old_stock, product['stock']))
+                    levels[product_id] = product['stock']
+            return bool(levels), levels
+
+        ok, levels = self._update_products(release, on_version).result()
+        return levels
+
+    # Orders
+
+    def save_order(self, record, wait=True):
+        """Persist one order/invoice/receipt record and update the sales aggregates
+
+        With wait=False a Future of the result is returned instead of
+        waiting for the write-behind queue to make the order durable.
+        """
+        if WRITE_BEHIND:
+            future = get_write_queue().submit(order_store.ORDER_FILE, record, self._commit_orders)
+        else:
+            future = completed(self._commit_orders([record])[0])
+        return future.result() if wait else future
+
+    def _commit_orders(self, records):
+        """Append a batch of orders and fold them into the sales aggregates"""
+        with file_lock(SALES_FILE):
+            aggregates = self._current_sales()
+            if not order_store.append_orders(records):
+                return [False] * len(records)
+            for record in records:
+                apply_order(aggregates, record)
+            aggregates["orders_tag"] = order_store.order_tag()
+            self._sales_dirty = True
+            self._save_sales(force=False)
+        return [True] * len(records)
+
+    def _current_sales(self):
+        """Aggregates covering every stored order; call under file_lock(SALES_FILE)
+
+        The in-memory copy, else the saved file, is used if its orders_tag
+        matches the order store. Otherwise orders were stored that it does
+        not count (a crash before the save, another process, a restore) and
+        it is rebuilt from the orders.
+        """
+        tag = order_store.order_tag()
+        if self._sales is not None and self._sales.get("orders_tag") == tag:
+            return self._sales
+        aggregates = load_aggregates()
+        if aggregates is None or aggregates.get("orders_tag") != tag:
+            aggregates = build_aggregates(self.iter_orders(fields=["order"]))
+            aggregates["orders_tag"] = tag
+            self._sales_dirty = True
+        else:
+            self._sales_dirty = False
+        self._sales = aggregates
+        return aggregates
+
+    def _save_sales(self, force=True):
+        """Write the aggregates if they changed, unless saved recently and not forced"""
+        if not self._sales_dirty or self._sales is None:
+            return True
+        now = time.monotonic()
+        if not force and now - self._sales_saved_at < SAVE_INTERVAL_SECONDS:
+            return True
+        self._sales_dirty = False
+        self._sales_saved_at = now
+        return save_aggregates(self._sales)
+
+    def iter_orders(self, fields=None):
+        """Stream all order records, optionally projected to dotted field paths"""
+        return order_store.iter_orders(fields)
+
+    def count_orders(self):
+        """Count all orders"""
+        return order_store.count_orders()
+
+    def get_user_orders(self, user_id, start=0, limit=None, fields=None):
+        """Get a page of one customer's orders, newest first"""
+        return order_store.user_orders(user_id, start, limit, fields)
+
+    def get_recent_orders(self, start=0, limit=None, fields=None):
+        """Get a page of all orders, newest first"""
+        return order_store.recent_orders(start, limit, fields)
+
+    def migrate_order_records(self):
+        """Convert stored orders to the compact record format, returns (converted, total)"""
+        return order_store.migrate_order_records()
+
+    def count_user_orders(self, user_id):
+        """Count one customer's orders"""
+        return order_store.count_user_orders(user_id)
+
+    def orders_since(self, since, until=None, fields=None):
+        """Get the orders placed at or after since (and before until), oldest first"""
+        return order_store.orders_since(since, until, fields)
+
+    def sales_aggregates(self):
+        """Get revenue, order count and per-product sales without reading orders"""
+        with file_lock(SALES_FILE):
+            aggregates = self._current_sales()
+            # Unsaved orders are written when the aggregates are read
+            self._save_sales()
+            return copy_aggregates(aggregates)
+
+    def rebuild_sales_aggregates(self):
+        """Recompute the sales aggregates from every stored order"""
+        with file_lock(SALES_FILE):
+            aggregates = build_aggregates(self.iter_orders(fields=["order"]))
+            aggregates["orders_tag"] = order_store.order_tag()
+            self._sales = aggregates
+            self._sales_dirty = True
+            self._save_sales()
+            return copy_aggregates(aggregates)
+
+    def data_stats(self):
+        """User, product and order counts from maintained counters, without scanning files"""
+        sales = self.sales_aggregates()
+        return data_stats(self.stats.counts("users"), self.stats.counts("products"),
+                          sales["order_count"], sales["total_revenue_cents"])
+
+    def close(self):
+        """Write out queued mutations and counters and stop the journal compactor"""
+        flush_writes()
+        self.stats.save()
+        with file_lock(SALES_FILE):
+            self._save_sales()
+        order_store.stop_compactor()
+
+class SqliteStorage:
+    """Repository backed by a SQLite database in WAL mode"""
+
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL,
+            email TEXT,
+            role TEXT NOT NULL,
+            extra TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+        CREATE INDEX IF NOT EXISTS idx_users_email_lower ON users(lower(email));
+
+        CREATE TABLE IF NOT EXISTS products (
+            product_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            price REAL NOT NULL,
+            category TEXT NOT NULL,
+            stock INTEGER NOT NULL,
+            description TEXT NOT NULL DEFAULT '',
+            extra TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE INDEX IF NOT EXISTS idx_products_category ON products(category);
+        CREATE INDEX IF NOT EXISTS idx_products_stock ON products(stock);
+
+        -- Bumped by every change to products, from any connection or process
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO data_versions (name, version) VALUES ('products', 0);
+        CREATE TRIGGER IF NOT EXISTS products_inserted AFTER INSERT ON products BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'products';
+        END;
+        CREATE TRIGGER IF NOT EXISTS products_updated AFTER UPDATE ON products BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'products';
+        END;
+        CREATE TRIGGER IF NOT EXISTS products_deleted AFTER DELETE ON products BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'products';
+        END;
+
+        CREATE TABLE IF NOT EXISTS orders (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id TEXT UNIQUE,
+            user_id TEXT,
+            order_date TEXT,
+            total REAL NOT NULL DEFAULT 0,
+            record TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_orders_user ON orders(user_id);
+        CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(order_date);
+
+        CREATE TABLE IF NOT EXISTS sales_totals (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            order_count INTEGER NOT NULL,
+            total_revenue_cents INTEGER NOT NULL,
+            items_sold INTEGER NOT NULL,
+            last_order_id TEXT,
+            updated TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS sales_by_product (
+            product_id TEXT PRIMARY KEY,
+            name TEXT,
+            qty INTEGER NOT NULL,
+            revenue_cents INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, db_path=SQLITE_FILE):
+        self.db_path = db_path
+        self._local = threading.local()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as conn:
+            self._drop_float_sales_tables(conn)
+            conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _drop_float_sales_tables(conn):
+        """Drop sales tables that summed float dollars; they are rebuilt in cents"""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sales_totals)")}
+        if "total_revenue" in columns:
+            conn.execute("DROP TABLE sales_totals")
+            conn.execute("DROP TABLE IF EXISTS sales_by_product")
+
+    def _connection(self):
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _split(record, columns):
+        """Split a record into column values and a JSON blob of the rest"""
+        values = [record.get(column) for column in columns]
+        extra = {k: v for k, v in record.items() if k not in columns}
+        return values, json.dumps(extra, ensure_ascii=False)
+
+    @staticmethod
+    def _join(row, columns):
+        """Rebuild a record from a row written by _split"""
+        record = {column: row[column] for column in columns}
+        record.update(json.loads(row["extra"]))
+        return record
+
+    # Users
+
+    def _user_values(self, user):
+        values, extra = self._split(user, USER_COLUMNS)
+        return (*values, extra)
+
+    def load_users(self):
+        """Load all user records"""
+        rows = self._connection().execute("SELECT * FROM users ORDER BY rowid")
+        return [self._join(row, USER_COLUMNS) for row in rows]
+
+    def get_user(self, username):
+        """Get a user record by username"""
+        row = self._connection().execute(
+            "SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        return self._join(row, USER_COLUMNS) if row else None
+
+    def username_exists(self, username):
+        """Check if a username is taken"""
+        return self._connection().execute(
+            "SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+    def email_exists(self, email):
+        """Check if an email is already registered, ignoring case"""
+        return self._connection().execute(
+            "SELECT 1 FROM users WHERE lower(email) = ?",
+            (normalize_email(email),)).fetchone() is not None
+
+    def authenticate(self, username, password):
+        """Get the user record if the credentials match, else None"""
+        return check_login(self, self.get_user(username), password)
+
+    def add_user(self, user):
+        """Add a new user, returns False if the username is taken"""
+        try:
+            with self._connection() as conn:
+                conn.execute("INSERT INTO users (username, password, email, role, extra) "
+                             "VALUES (?, ?, ?, ?, ?)", self._user_values(user))
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def update_user(self, user):
+        """Replace an existing user record"""
+        values = self._user_values(user)
+        with self._connection() as conn:
+            cursor = conn.execute("UPDATE users SET password = ?, email = ?, role = ?, extra = ? "
+                                  "WHERE username = ?", (*values[1:], values[0]))
+        return cursor.rowcount > 0
+
+    # Products
+
+    def products_version(self):
+        """Get a token that changes whenever the products change
+
+        The data_versions counter is kept by triggers in the database, so
+        every thread's connection and every process reads the same value.
+        """
+        return self._read_version(self._connection())
+
+    @staticmethod
+    def _read_version(conn):
+        return conn.execute("SELECT version FROM data_versions WHERE name = 'products'").fetchone()[0]
+
+    def _begin_write(self, conn):
+        """Open a write transaction on conn, returns the products version it starts from
+
+        BEGIN IMMEDIATE takes the write lock before the version is read, so
+        no other connection can commit between the read and this write.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        return self._read_version(conn)
+
+    def _report_version(self, conn, before, on_version):
+        """Call on_version(before, after) for the write open in conn's transaction"""
+        if on_version is not None:
+            on_version(before, self._read_version(conn))
+
+    def _product_values(self, product):
+        values, extra = self._split(product, PRODUCT_COLUMNS)
+        product_id, name, price, category, stock, description = values
+        return (product_id, name, float(price), category, int(stock), description or "", extra)
+
+    def load_products(self):
+        """Load all product records"""
+        rows = self._connection().execute("SELECT * FROM products ORDER BY rowid")
+        return [self._join(row, PRODUCT_COLUMNS) for row in rows]
+
+    def get_product(self, product_id):
+        """Get a product record by ID"""
+        row = self._connection().execute(
+            "SELECT * FROM products WHERE product_id = ?", (product_id,)).fetchone()
+        return self._join(row, PRODUCT_COLUMNS) if row else None
+
+    def add_product(self, product, on_version=None):
+        """Add a new product, returns False if the ID is taken"""
+        try:
+            with self._connection() as conn:
+                before = self._begin_write(conn)
+                conn.execute("INSERT INTO products (product_id, name, price, category, stock, "
+                             "description, extra) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             self._product_values(product))
+                self._report_version(conn, before, on_version)
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def update_product(self, product_id, product, on_version=None):
+        """Replace the product stored under product_id"""
+        with self._connection() as conn:
+            before = self._begin_write(conn)
+            cursor = conn.execute("UPDATE products SET product_id = ?, name = ?, price = ?, "
+                                  "category = ?, stock = ?, description = ?, extra = ? "
+                                  "WHERE product_id = ?",
+                                  (*self._product_values(product), product_id))
+            if cursor.rowcount > 0:
+                self._report_version(conn, before, on_version)
+        return cursor.rowcount > 0
+
+    def update_stock(self, product_id, stock, wait=True, on_version=None):
+        """Set a product's stock, returns the old stock or None if not found
+
+        SQLite commits straight away; wait=False just wraps the result in a
+        Future to match JsonStorage.
+        """
+        with self._connection() as conn:
+            before = self._begin_write(conn)
+            row = conn.execute("SELECT stock FROM products WHERE product_id = ?",
+                               (product_id,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE products SET stock = ? WHERE product_id = ?",
+                             (int(stock), product_id))
+                self._report_version(conn, before, on_version)
+        old_stock = row["stock"] if row is not None else None
+        return old_stock if wait else completed(old_stock)
+
+    def reserve_stock(self, quantities, on_version=None):
+        """Take stock for several products at once, all or nothing
+
+        Each line is a conditional decrement (stock >= quantity) inside one
+        write transaction, so SQLite serializes competing checkouts and a
+        short line rolls back the lines already taken. Returns (True, new
+        stock levels) or (False, available stock of the products that fell
+        short).
+        """
+        conn = self._connection()
+        shortages = {}
+        with conn:
+            before = self._begin_write(conn)
+            for product_id, quantity in quantities.items():
+                cursor = conn.execute("UPDATE products SET stock = stock - ? "
+                                      "WHERE product_id = ? AND stock >= ?",
+                                      (quantity, product_id, quantity))
+                if cursor.rowcount == 0:
+                    row = conn.execute("SELECT stock FROM products WHERE product_id = ?",
+                                       (product_id,)).fetchone()
+                    shortages[product_id] = row["stock"] if row else 0
+            if shortages:
+                conn.rollback()
+                return False, shortages
+            levels = self._stock_levels(conn, quantities)
+            self._report_version(conn, before, on_version)
+        return True, levels
+
+    def release_stock(self, quantities, on_version=None):
+        """Give back stock taken by reserve_stock, returns the new levels"""
+        with self._connection() as conn:
+            before = self._begin_write(conn)
+            conn.executemany("UPDATE products SET stock = stock + ? WHERE product_id = ?",
+                             [(quantity, pid) for pid, quantity in quantities.items()])
+            self._report_version(conn, before, on_version)
+            return self._stock_levels(conn, quantities)
+
+    @staticmethod
+    def _stock_levels(conn, product_ids):
+        """Get the current stock of several products"""
+        product_ids = list(product_ids)
+        placeholders = ", ".join("?" * len(product_ids))
+        rows = conn.execute(f"SELECT product_id, stock FROM products "
+                            f"WHERE product_id IN ({placeholders})", product_ids)
+        return {row["product_id"]: row["stock"] for row in rows}
+
+    def delete_product(self, product_id, on_version=None):
+        """Delete a product, returns False if it was not found"""
+        with self._connection() as conn:
+            before = self._begin_write(conn)
+            cursor = conn.execute("DELETE FROM products WHERE product_id = ?", (product_id,))
+            if cursor.rowcount > 0:
+                self._report_version(conn, before, on_version)
+        return cursor.rowcount > 0
+
+    # Orders
+
+    @staticmethod
+    def _order_values(record):
+        order = record.get('order', {})
+        # Old records without an order date are dated by their invoice or payment
+        return (order.get('order_id'), order.get('user_id'), record_date(record),
+                from_cents(stored_cents(order, 'total')), json.dumps(record, ensure_ascii=False))
+
+    def save_order(self, record, wait=True):
+        """Persist one order/invoice/receipt record and update the sales aggregates"""
+        with self._connection() as conn:
+            conn.execute("INSERT INTO orders (order_id, user_id, order_date, total, record) "
+                         "VALUES (?, ?, ?, ?, ?)", self._order_values(record))
+            self._apply_sales(conn, record)
+        return True if wait else completed(True)
+
+    def _apply_sales(self, conn, record):
+        """Fold one order into the sales tables, in the order's transaction"""
+        delta = apply_order(empty_aggregates(), record)
+        cursor = conn.execute("UPDATE sales_totals SET order_count = order_count + 1, "
+                              "total_revenue_cents = total_revenue_cents + ?, "
+                              "items_sold = items_sold + ?, "
+                              "last_order_id = ?, updated = ? WHERE id = 1",
+                              (delta["total_revenue_cents"], delta["items_sold"],
+                               delta["last_order_id"], delta["updated"]))
+        if cursor.rowcount == 0:
+            # Aggregates were never built for this database
+            self._rebuild_sales(conn)
+            return
+        conn.executemany("INSERT INTO sales_by_product (product_id, name, qty, revenue_cents) "
+                         "VALUES (?, ?, ?, ?) ON CONFLICT(product_id) DO UPDATE SET "
+                         "qty = qty + excluded.qty, "
+                         "revenue_cents = revenue_cents + excluded.revenue_cents",
+                         [(pid, entry["name"], entry["qty"], entry["revenue_cents"])
+                          for pid, entry in delta["products"].items()])
+
+    def _rebuild_sales(self, conn):
+        """Recompute the sales tables from the orders table"""
+        rows = conn.execute("SELECT record FROM orders ORDER BY seq")
+        aggregates = build_aggregates(json.loads(row["record"]) for row in rows)
+        conn.execute("DELETE FROM sales_by_product")
+        conn.execute("INSERT OR REPLACE INTO sales_totals (id, order_count, total_revenue_cents, "
+                     "items_sold, last_order_id, updated) VALUES (1, ?, ?, ?, ?, ?)",
+                     (aggregates["order_count"], aggregates["total_revenue_cents"],
+                      aggregates["items_sold"], aggregates["last_order_id"],
+                      aggregates["updated"]))
+        conn.executemany("INSERT INTO sales_by_product (product_id, name, qty, revenue_cents) "
+                         "VALUES (?, ?, ?, ?)",
+                         [(pid, entry["name"], entry["qty"], entry["revenue_cents"])
+                          for pid, entry in aggregates["products"].items()])
+        return aggregates
+
+    def iter_orders(self, fields=None):
+        """Iterate over all order records in insertion order"""
+        for row in self._connection().execute("SELECT record FROM orders ORDER BY seq"):
+            yield project_fields(json.loads(row["record"]), fields)
+
+    def iter_user_orders(self, user_id, fields=None):
+        """Iterate over one customer's orders using the user_id index"""
+        rows = self._connection().execute(
+            "SELECT record FROM orders WHERE user_id = ? ORDER BY seq", (user_id,))
+        for row in rows:
+            yield project_fields(json.loads(row["record"]), fields)
+
+    def get_user_orders(self, user_id, start=0, limit=None, fields=None):
+        """Get a page of one customer's orders, newest first"""
+        rows = self._connection().execute(
+            "SELECT record FROM orders WHERE user_id = ? ORDER BY seq DESC LIMIT ? OFFSET ?",
+            (user_id, -1 if limit is None else limit, start))
+        return [project_fields(json.loads(row["record"]), fields) for row in rows]
+
+    def get_recent_orders(self, start=0, limit=None, fields=None):
+        """Get a page of all orders, newest first, using idx_orders_date"""
+        # Undated old orders have a NULL date and come last, as in order_store
+        rows = self._connection().execute(
+            "SELECT record FROM orders ORDER BY order_date DESC, seq DESC LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, start))
+        return [project_fields(json.loads(row["record"]), fields) for row in rows]
+
+    def migrate_order_records(self):
+        """Convert stored orders to the compact record format, returns (converted, total)"""
+        converted = total = 0
+        last_seq = 0
+        with self._connection() as conn:
+            while True:
+                # Batches keep memory flat without updating rows under an open cursor
+                rows = conn.execute("SELECT seq, record FROM orders WHERE seq > ? "
+                                    "ORDER BY seq LIMIT 500", (last_seq,)).fetchall()
+                if not rows:
+                    break
+                for row in rows:
+                    total += 1
+                    record = json.loads(row["record"])
+                    packed = compact_record(record)
+                    if packed is not record:
+                        conn.execute("UPDATE orders SET record = ? WHERE seq = ?",
+                                     (json.dumps(packed, ensure_ascii=False), row["seq"]))
+                        converted += 1
+                last_seq = rows[-1]["seq"]
+        return converted, total
+
+    def orders_since(self, since, until=None, fields=None):
+        """Get the orders placed at or after since (and before until), oldest first"""
+        # order_date is the time of the order's id, so the date index finds the same
+        # range. Undated old orders have a NULL date, which sorts first and
+        # only matches when since is None, as in order_store.
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("order_date >= ?")
+            params.append(iso_time(since))
+        if until is not None:
+            conditions.append("order_date < ?" if since is not None
+                              else "(order_date < ? OR order_date IS NULL)")
+            params.append(iso_time(until))
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        rows = self._connection().execute(
+            "SELECT record FROM orders" + where + " ORDER BY order_date, seq", params)
+        return [project_fields(json.loads(row["record"]), fields) for row in rows]
+
+    def count_user_orders(self, user_id):
+        """Count one customer's orders"""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM orders WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def count_orders(self):
+        """Count all orders"""
+        return self._connection().execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def sales_aggregates(self):
+        """Get revenue, order count and per-product sales without reading orders"""
+        conn = self._connection()
+        totals = conn.execute("SELECT * FROM sales_totals WHERE id = 1").fetchone()
+        if totals is None:
+            return self.rebuild_sales_aggregates()
+        aggregates = {key: totals[key] for key in ("order_count", "total_revenue_cents", "items_sold",
+                                                   "last_order_id", "updated")}
+        aggregates["products"] = {
+            row["product_id"]: {"name": row["name"], "qty": row["qty"],
+                                "revenue_cents": row["revenue_cents"]}
+            for row in conn.execute("SELECT * FROM sales_by_product")
+        }
+        return aggregates
+
+    def rebuild_sales_aggregates(self):
+        """Recompute the sales aggregates from every stored order"""
+        with self._connection() as conn:
+            return self._rebuild_sales(conn)
+
+    def data_stats(self):
+        """User, product and order counts; the stock counts use idx_products_stock"""
+        conn = self._connection()
+        count = lambda sql, *args: conn.execute(sql, args).fetchone()[0]
+        users = {
+            "total": count("SELECT COUNT(*) FROM users"),
+            "admin": count("SELECT COUNT(*) FROM users WHERE role = 'admin'"),
+            "customers": count("SELECT COUNT(*) FROM users WHERE role = 'customer'")
+        }
+        products = {
+            "total": count("SELECT COUNT(*) FROM products"),
+            "low_stock": count("SELECT COUNT(*) FROM products WHERE stock > 0 AND stock <= ?",
+                               LOW_STOCK_THRESHOLD),
+            "out_of_stock": count("SELECT COUNT(*) FROM products WHERE stock <= 0")
+        }
+        totals = conn.execute("SELECT order_count, total_revenue_cents FROM sales_totals "
+                              "WHERE id = 1").fetchone()
+        if totals is None:
+            sales = self.rebuild_sales_aggregates()
+            totals = (sales["order_count"], sales["total_revenue_cents"])
+        return data_stats(users, products, totals[0], totals[1])
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+def get_storage():
+    """Get the configured storage backend (shared per process)"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_BACKEND == "sqlite":
+                _storage = SqliteStorage()
+            elif STORAGE_BACKEND == "json":
+                _storage = JsonStorage()
+            else:
+                raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+        return _storage
+
+def reset_storage():
+    """Close and forget the shared storage, e.g. after the data directory moved"""
+    global _storage
+    with _storage_lock:
+        if _storage is not None:
+            _storage.close()
+        _storage = None
+
+def migrate_json_to_sqlite(db_path=SQLITE_FILE):
+    """Copy users, products and orders from the JSON files into SQLite
+
+    Existing rows with the same key are replaced, so the migration can be
+    re-run safely. Returns the number of records migrated per table.
+    """
+    source = JsonStorage()
+    target = SqliteStorage(db_path)
+    counts = {}
+    with target._connection() as conn:
+        users = [target._user_values(u) for u in source.load_users() if u.get('username')]
+        conn.executemany("INSERT OR REPLACE INTO users (username, password, email, role, extra) "
+                         "VALUES (?, ?, ?, ?, ?)", users)
+        counts['users'] = len(users)
+
+        products = [target._product_values(p) for p in source.load_products()
+                    if p.get('product_id')]
+        conn.executemany("INSERT OR REPLACE INTO products (product_id, name, price, category, "
+                         "stock, description, extra) VALUES (?, ?, ?, ?, ?, ?, ?)", products)
+        counts['products'] = len(products)
+
+        before = conn.total_changes
+        conn.executemany("INSERT OR REPLACE INTO orders (order_id, user_id, order_date, total, "
+                         "record) VALUES (?, ?, ?, ?, ?)",
+                         (target._order_values(record) for record in order_store.iter_orders()))
+        counts['orders'] = conn.total_changes - before
+        target._rebuild_sales(conn)
+    target.close()
+    return counts
@@ -0,0 +1,123 @@
+import threading
+
+from utils.file_handler import read_json, thaw_json, file_signature
+from utils.passwords import verify_password
+
+USER_FILE = "data/users.json"
+
+def normalize_email(email):
+    """Canonical form of an email address for uniqueness checks"""
+    return (email or "").strip().lower()
+
+class UserDirectory:
+    """Hash indexes over users.json for O(1) login and registration checks
+
+    Keeps username -> record and lower-cased email -> username maps. Every
+    lookup does a cheap stat of users.json and the indexes are rebuilt only
+    when the file changed, including changes made by other processes.
+    Writes made through JsonStorage update the indexes in place instead.
+    """
+
+    _UNLOADED = object()
+
+    def __init__(self, user_file=USER_FILE):
+        self.user_file = user_file
+        self._lock = threading.Lock()
+        self._signature = self._UNLOADED
+        self._by_username = {}
+        self._by_email = {}
+
+    def _current_signature(self):
+        try:
+            return file_signature(self.user_file)
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self):
+        """Rebuild the indexes if users.json changed since they were built"""
+        signature = self._current_signature()
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            by_username = {}
+            by_email = {}
+            users = read_json(self.user_file, copy=False) if signature is not None else ()
+            for user in users:
+                username = user.get('username')
+                if username is None:
+                    continue
+                by_username[username] = user
+                email = normalize_email(user.get('email'))
+                if email:
+                    by_email.setdefault(email, username)
+            self._by_username = by_username
+            self._by_email = by_email
+            self._signature = signature
+
+    def __len__(self):
+        self._refresh()
+        return len(self._by_username)
+
+    def get_user(self, username):
+        """Get a copy of a user record by username"""
+        self._refresh()
+        user = self._by_username.get(username)
+        return thaw_json(user) if user is not None else None
+
+    def username_exists(self, username):
+        """Check if a username is taken"""
+        self._refresh()
+        return username in self._by_username
+
+    def email_exists(self, email):
+        """Check if an email is registered, ignoring case"""
+        self._refresh()
+        return normalize_email(email) in self._by_email
+
+    def username_for_email(self, email):
+        """Get the username registered with an email, ignoring case"""
+        self._refresh()
+        return self._by_email.get(normalize_email(email))
+
+    def authenticate(self, username, password):
+        """Get a copy of the user record if the credentials match, else None"""
+        self._refresh()
+        user = self._by_username.get(username)
+        if user is None or not verify_password(password, user.get('password'))[0]:
+            return None
+        return thaw_json(user)
+
+    def record_write(self, user, old_user=None):
+        """Update the indexes after users.json was written with this user
+
+        Must be called under the users.json file lock, for a write based on
+        data read after the last lookup (update_json's on_commit), so the
+        indexes and their file signature stay in step.
+        """
+        with self._lock:
+            user = thaw_json(user)
+            self._by_username[user['username']] = user
+            email = normalize_email(user.get('email'))
+            if old_user is not None:
+                old_email = normalize_email(old_user.get('email'))
+                if old_email != email and self._by_email.get(old_email) == user['username']:
+                    # Older data may hold the address twice, hand it to the next holder
+                    self._by_email.pop(old_email)
+                    self._index_email(old_email)
+            if email:
+                self._by_email.setdefault(email, user['username'])
+            self._signature = self._current_signature()
+
+    def _index_email(self, email):
+        """Map email to the first user in file order that has it, if any"""
+        for username, user in self._by_username.items():
+            if normalize_email(user.get('email')) == email:
+                self._by_email[email] = username
+                return
+
+    def invalidate(self):
+        """Force a rebuild on the next lookup"""
+        with self._lock:
+            self._signature = self._UNLOADED
@@ -0,0 +1,172 @@
+import atexit
+import threading
+import time
+from concurrent.futures import Future
+
+# Extra time the writer waits after the first queued mutation so that others
+# can join its write (seconds). Mutations queued while the previous write
+# was being made durable always share the next one, which is enough under
+# load; a fixed wait only slowed a single GUI user down.
+GROUP_COMMIT_WINDOW = 0
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def completed(result):
+    """Get a future that already holds result, for code paths that write directly"""
+    future = Future()
+    future.set_result(result)
+    return future
+
+def chain(future, fn):
+    """Get a future for fn(result) once future is done"""
+    chained = Future()
+
+    def done(source):
+        try:
+            chained.set_result(fn(source.result()))
+        except Exception as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(done)
+    return chained
+
+class WriteBehindQueue:
+    """Single writer thread that group-commits queued mutations
+
+    submit(target, op, commit) queues op and returns a Future. The writer
+    takes everything queued while it was busy (plus GROUP_COMMIT_WINDOW),
+    groups it by target in arrival order and makes one call to
+    commit(ops) per target. commit must make the whole group durable with
+    a single write and return one result per op; a result that is an
+    exception is raised from that op's future. Callers that need
+    durability wait on the future, the others carry on straight away.
+    """
+
+    def __init__(self, window=GROUP_COMMIT_WINDOW):
+        self.window = window
+        self._cond = threading.Condition()
+        self._pending = []
+        self._busy = False
+        self._closed = False
+        self._thread = None
+        self._stats = {"mutations": 0, "batches": 0, "writes": 0}
+
+    def submit(self, target, op, commit):
+        """Queue op for target and return a Future for its result"""
+        if threading.current_thread() is self._thread:
+            # Called from a commit callback: waiting on the queue would deadlock
+            return self._run_inline(target, op, commit)
+        with self._cond:
+            if not self._closed:
+                future = Future()
+                self._pending.append((target, op, commit, future))
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="write-behind",
+                                                    daemon=True)
+                    self._thread.start()
+                self._cond.notify_all()
+                return future
+        return self._run_inline(target, op, commit)
+
+    def _run_inline(self, target, op, commit):
+        future = Future()
+        self._commit_group([(op, future)], commit)
+        return future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+            if self.window:
+                # Let concurrent callers join this batch
+                time.sleep(self.window)
+            with self._cond:
+                batch, self._pending = self._pending, []
+                self._busy = True
+            try:
+                self._commit_batch(batch)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _commit_batch(self, batch):
+        groups = {}
+        for target, op, commit, future in batch:
+            groups.setdefault(target, (commit, []))[1].append((op, future))
+        with self._cond:
+            self._stats["mutations"] += len(batch)
+            self._stats["batches"] += 1
+        for commit, entries in groups.values():
+            self._commit_group(entries, commit)
+
+    def _commit_group(self, entries, commit):
+        try:
+            results = commit([op for op, _ in entries])
+        except Exception as e:
+            print(f"Error committing queued writes: {e}")
+            results = [e] * len(entries)
+        with self._cond:
+            self._stats["writes"] += 1
+        for (_, future), result in zip(entries, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is written, returns False on timeout"""
+        if threading.current_thread() is self._thread:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Flush and stop the writer thread; later submits write directly"""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        return flushed
+
+    def stats(self):
+        """Get mutation, batch and write counters"""
+        with self._cond:
+            return dict(self._stats)
+
+def get_write_queue():
+    """Get the shared write-behind queue (one writer thread per process)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = WriteBehindQueue()
+        return _queue
+
+def flush_writes(timeout=None):
+    """Wait until all queued mutations are durable"""
+    with _queue_lock:
+        queue = _queue
+    return queue.flush(timeout) if queue is not None else True
+
+def shutdown_writes(timeout=None):
+    """Flush queued mutations and stop the writer thread, e.g. on exit"""
+    global _queue
+    with _queue_lock:
+        queue, _queue = _queue, None
+    return queue.close(timeout) if queue is not None else True
+
+# The writer is a daemon thread, make sure nothing queued is lost at exit
+atexit.register(shutdown_writes)